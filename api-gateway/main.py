@@ -1,6 +1,6 @@
 from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import httpx
 import uuid
 import json
@@ -20,6 +20,8 @@ app.add_middleware(
 
 # Configuration des URLs des services
 MCP_HUB_URL = os.getenv("MCP_HUB_URL", "http://mcp-hub:8001")
+# Appels directs au serveur d'exécution pour les prédictions synchrones (sans passer par le hub)
+EXECUTION_MCP_SERVER_URL = os.getenv("EXECUTION_MCP_SERVER_URL", "http://execution-mcp-server:8004")
 
 # Client HTTP asynchrone avec timeout augmenté
 http_client = httpx.AsyncClient(timeout=30.0)
@@ -217,6 +219,60 @@ async def update_deployment(deployment_id: str, deployment_data: dict):
             raise HTTPException(status_code=404, detail=f"Déploiement {deployment_id} non trouvé")
         raise HTTPException(status_code=500, detail=f"Erreur lors de la communication avec le MCP Hub: {str(e)}")
 
+@app.post("/deployments/{deployment_id}/predict")
+async def predict(deployment_id: str, request: Request):
+    # Le corps est relayé tel quel : ni enveloppe MCP ni resérialisation
+    try:
+        body = await request.body()
+        response = await http_client.post(
+            f"{EXECUTION_MCP_SERVER_URL}/deployments/{deployment_id}/predict",
+            content=body,
+            headers={"Content-Type": "application/json"}
+        )
+        return Response(content=response.content, status_code=response.status_code, media_type="application/json")
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la communication avec l'Execution MCP Server: {str(e)}")
+
+@app.get("/deployments/{deployment_id}/shadow-metrics")
+async def get_shadow_metrics(deployment_id: str):
+    try:
+        mcp_message = create_mcp_message("get_shadow_metrics", {"deployment_id": deployment_id})
+        response = await http_client.post(f"{MCP_HUB_URL}/process", json=mcp_message)
+        result = await process_mcp_response(response)
+        return result
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la communication avec le MCP Hub: {str(e)}")
+
+@app.get("/deployments/{deployment_id}/scaling")
+async def get_deployment_scaling(deployment_id: str):
+    try:
+        mcp_message = create_mcp_message("get_deployment_scaling", {"deployment_id": deployment_id})
+        response = await http_client.post(f"{MCP_HUB_URL}/process", json=mcp_message)
+        result = await process_mcp_response(response)
+        return result
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la communication avec le MCP Hub: {str(e)}")
+
+@app.get("/deployments/{deployment_id}/result-cache")
+async def get_deployment_result_cache(deployment_id: str):
+    try:
+        mcp_message = create_mcp_message("get_result_cache_stats", {"deployment_id": deployment_id})
+        response = await http_client.post(f"{MCP_HUB_URL}/process", json=mcp_message)
+        result = await process_mcp_response(response)
+        return result
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la communication avec le MCP Hub: {str(e)}")
+
+@app.get("/result-cache/stats")
+async def get_result_cache_stats():
+    try:
+        mcp_message = create_mcp_message("get_result_cache_stats", {})
+        response = await http_client.post(f"{MCP_HUB_URL}/process", json=mcp_message)
+        result = await process_mcp_response(response)
+        return result
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la communication avec le MCP Hub: {str(e)}")
+
 @app.delete("/deployments/{deployment_id}")
 async def delete_deployment(deployment_id: str):
     try:
@@ -269,6 +325,51 @@ async def create_execution(execution_data: dict):
     except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la communication avec le MCP Hub: {str(e)}")
 
+@app.post("/executions/batch")
+async def create_executions_batch(batch_data: dict):
+    try:
+        mcp_message = create_mcp_message("create_executions_batch", {"batch": batch_data})
+        response = await http_client.post(f"{MCP_HUB_URL}/process", json=mcp_message)
+        result = await process_mcp_response(response)
+        return result
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la communication avec le MCP Hub: {str(e)}")
+
+@app.post("/executions/stream")
+async def stream_execution(request: Request):
+    # Les événements SSE sont relayés au fur et à mesure, sans attendre la fin de la génération
+    try:
+        body = await request.body()
+        upstream_request = http_client.build_request(
+            "POST",
+            f"{EXECUTION_MCP_SERVER_URL}/executions/stream",
+            content=body,
+            headers={"Content-Type": "application/json"},
+            # Pas de délai de lecture : l'intervalle entre deux tokens n'est pas borné
+            timeout=httpx.Timeout(30.0, read=None)
+        )
+        upstream = await http_client.send(upstream_request, stream=True)
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la communication avec l'Execution MCP Server: {str(e)}")
+    
+    if upstream.status_code != 200:
+        content = await upstream.aread()
+        await upstream.aclose()
+        return Response(content=content, status_code=upstream.status_code, media_type="application/json")
+    
+    async def relay():
+        try:
+            async for chunk in upstream.aiter_raw():
+                yield chunk
+        finally:
+            await upstream.aclose()
+    
+    return StreamingResponse(
+        relay(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/executions/{execution_id}/cancel")
 async def cancel_execution(execution_id: str):
     try:
@@ -326,6 +427,52 @@ async def get_dataset(dataset_id: str):
             raise HTTPException(status_code=404, detail=f"Dataset {dataset_id} non trouvé")
         raise HTTPException(status_code=500, detail=f"Erreur lors de la communication avec le MCP Hub: {str(e)}")
 
+@app.get("/datasets/{dataset_id}/preview")
+async def preview_dataset(dataset_id: str, rows: int = 20):
+    try:
+        mcp_message = create_mcp_message("preview_data", {"dataset_id": dataset_id, "rows": rows})
+        response = await http_client.post(f"{MCP_HUB_URL}/process", json=mcp_message)
+        result = await process_mcp_response(response, "preview")
+        return result
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la communication avec le MCP Hub: {str(e)}")
+
+@app.post("/datasets/{dataset_id}/append")
+async def append_dataset(dataset_id: str, append_data: dict):
+    try:
+        append_data["dataset_id"] = dataset_id
+        mcp_message = create_mcp_message("append_data", append_data)
+        response = await http_client.post(f"{MCP_HUB_URL}/process", json=mcp_message)
+        result = await process_mcp_response(response)
+        return result
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la communication avec le MCP Hub: {str(e)}")
+
+@app.get("/datasets/{dataset_id}/versions")
+async def get_dataset_versions(dataset_id: str):
+    try:
+        mcp_message = create_mcp_message("list_dataset_versions", {"dataset_id": dataset_id})
+        response = await http_client.post(f"{MCP_HUB_URL}/process", json=mcp_message)
+        result = await process_mcp_response(response)
+        return result
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la communication avec le MCP Hub: {str(e)}")
+
+@app.get("/datasets/{dataset_id}/versions/{version}")
+async def get_dataset_version(dataset_id: str, version: int):
+    try:
+        mcp_message = create_mcp_message("get_dataset_version", {"dataset_id": dataset_id, "version": version})
+        response = await http_client.post(f"{MCP_HUB_URL}/process", json=mcp_message)
+        result = await process_mcp_response(
+            response,
+            "version",
+            404,
+            f"Version {version} du dataset {dataset_id} non trouvée"
+        )
+        return result
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la communication avec le MCP Hub: {str(e)}")
+
 @app.post("/datasets")
 async def create_dataset(dataset_data: dict):
     try:
@@ -336,6 +483,47 @@ async def create_dataset(dataset_data: dict):
     except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la communication avec le MCP Hub: {str(e)}")
 
+# Routes pour le ramasse-miettes du stockage
+@app.post("/storage/gc")
+async def run_garbage_collection(gc_data: dict = None):
+    try:
+        mcp_message = create_mcp_message("run_garbage_collection", gc_data or {})
+        response = await http_client.post(f"{MCP_HUB_URL}/process", json=mcp_message)
+        result = await process_mcp_response(response)
+        return result
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la communication avec le MCP Hub: {str(e)}")
+
+@app.get("/storage/gc")
+async def get_gc_status(limit: int = 10):
+    try:
+        mcp_message = create_mcp_message("get_gc_status", {"limit": limit})
+        response = await http_client.post(f"{MCP_HUB_URL}/process", json=mcp_message)
+        result = await process_mcp_response(response)
+        return result
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la communication avec le MCP Hub: {str(e)}")
+
+@app.get("/storage/gc/{run_id}")
+async def get_gc_run(run_id: str):
+    try:
+        mcp_message = create_mcp_message("get_gc_status", {"run_id": run_id})
+        response = await http_client.post(f"{MCP_HUB_URL}/process", json=mcp_message)
+        result = await process_mcp_response(response, "run", 404, f"Passage {run_id} non trouvé")
+        return result
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la communication avec le MCP Hub: {str(e)}")
+
+@app.get("/storage/indexes")
+async def analyze_indexes(ensure: bool = False):
+    try:
+        mcp_message = create_mcp_message("analyze_indexes", {"ensure": ensure})
+        response = await http_client.post(f"{MCP_HUB_URL}/process", json=mcp_message)
+        result = await process_mcp_response(response)
+        return result
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la communication avec le MCP Hub: {str(e)}")
+
 # Routes pour les opérations complexes
 @app.post("/operations/chain")
 async def chain_operations(operations_data: dict):
@@ -0,0 +1,69 @@
+"""
+Validation des lignes ajoutées à un dataset existant.
+
+Les nouvelles lignes (CSV) sont analysées avec les types du schéma stocké : les
+colonnes doivent être les mêmes et dans le même ordre (les partitions d'une
+version sont lues ensemble par Spark, par position), et chaque valeur doit
+pouvoir être convertie dans le type de sa colonne.
+"""
+
+from typing import Any, Dict, List
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+
+class AppendValidationError(ValueError):
+    """Lignes ajoutées incompatibles avec le schéma du dataset"""
+
+
+def schema_from_json(schema_json: List[Dict[str, Any]]) -> pa.Schema:
+    fields = []
+    for field in schema_json:
+        try:
+            field_type = pa.type_for_alias(field["type"])
+        except ValueError:
+            # Type non reconnu : la colonne est relue comme texte
+            field_type = pa.string()
+        fields.append(pa.field(field["name"], field_type, field.get("nullable", True)))
+    return pa.schema(fields)
+
+
+def parse_append_rows(data: bytes, schema_json: List[Dict[str, Any]]) -> pa.Table:
+    """Analyse le CSV ajouté avec les types stockés ; lève AppendValidationError sinon"""
+    schema = schema_from_json(schema_json)
+    if not data.strip():
+        raise AppendValidationError("Appended data is empty")
+
+    header_line = data.split(b"\n", 1)[0].rstrip(b"\r")
+    try:
+        header = next(iter(pa_csv.read_csv(
+            pa.py_buffer(header_line + b"\n"),
+            read_options=pa_csv.ReadOptions(autogenerate_column_names=True)
+        ).to_pylist()), {})
+    except pa.ArrowInvalid as e:
+        raise AppendValidationError(f"Cannot parse header: {str(e)}")
+    columns = [str(value) for value in header.values()]
+    if columns != schema.names:
+        missing = [name for name in schema.names if name not in columns]
+        unexpected = [name for name in columns if name not in schema.names]
+        details = []
+        if missing:
+            details.append(f"missing columns {missing}")
+        if unexpected:
+            details.append(f"unexpected columns {unexpected}")
+        if not details:
+            details.append(f"expected column order {schema.names}")
+        raise AppendValidationError(f"Columns do not match the dataset schema: {'; '.join(details)}")
+
+    # Les colonnes sans type connu (entièrement vides jusqu'ici) restent inférées
+    column_types = {field.name: field.type for field in schema if not pa.types.is_null(field.type)}
+    try:
+        table = pa_csv.read_csv(pa.py_buffer(data), convert_options=pa_csv.ConvertOptions(column_types=column_types))
+    except pa.ArrowInvalid as e:
+        raise AppendValidationError(f"Rows do not match the dataset schema: {str(e)}")
+
+    for field in schema:
+        if not field.nullable and table.column(field.name).null_count:
+            raise AppendValidationError(f"Column {field.name} does not accept empty values")
+    return table
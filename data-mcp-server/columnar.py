@@ -0,0 +1,252 @@
+"""
+Conversion des datasets tabulaires en format colonnaire (Parquet ou Arrow IPC).
+
+Le CSV source est lu en flux par blocs Arrow, écrit dans un fichier temporaire
+par groupes de lignes puis envoyé à MinIO. Le schéma, le nombre de lignes et les
+statistiques par colonne (valeurs nulles, min, max) sont calculés pendant la
+même passe. Le fichier d'origine est conservé.
+"""
+
+import io
+import os
+import tempfile
+from typing import Any, Callable, Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+SUPPORTED_FORMATS = {
+    "parquet": {"extension": "parquet", "content_type": "application/vnd.apache.parquet"},
+    "arrow": {"extension": "arrow", "content_type": "application/vnd.apache.arrow.file"},
+}
+
+DEFAULT_ROW_GROUP_ROWS = 128 * 1024
+DEFAULT_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+class ColumnarConversionError(ValueError):
+    """Format demandé inconnu ou fichier source non convertible"""
+
+
+class MinioRangeFile(io.RawIOBase):
+    """
+    Fichier en lecture seule adossé à un objet MinIO : chaque lecture devient un
+    GET partiel (Range), avec une petite lecture anticipée. Permet à pyarrow de
+    ne lire que le pied de page et les groupes de lignes nécessaires.
+    """
+
+    def __init__(self, minio_client, bucket: str, object_name: str, size: Optional[int] = None,
+                 read_ahead: int = 1024 * 1024):
+        self.minio_client = minio_client
+        self.bucket = bucket
+        self.object_name = object_name
+        self.size = size if size is not None else minio_client.stat_object(bucket, object_name).size
+        self.read_ahead = read_ahead
+        self.bytes_read = 0
+        self._position = 0
+        self._buffer = b""
+        self._buffer_start = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._position = offset
+        elif whence == io.SEEK_CUR:
+            self._position += offset
+        elif whence == io.SEEK_END:
+            self._position = self.size + offset
+        self._position = max(0, min(self._position, self.size))
+        return self._position
+
+    def _fetch(self, offset: int, length: int) -> bytes:
+        response = self.minio_client.get_object(self.bucket, self.object_name, offset=offset, length=length)
+        try:
+            data = response.read()
+        finally:
+            response.close()
+            response.release_conn()
+        self.bytes_read += len(data)
+        return data
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.size - self._position
+        size = min(size, self.size - self._position)
+        if size <= 0:
+            return b""
+        buffer_end = self._buffer_start + len(self._buffer)
+        if not (self._buffer_start <= self._position and self._position + size <= buffer_end):
+            fetch_length = min(max(size, self.read_ahead), self.size - self._position)
+            self._buffer = self._fetch(self._position, fetch_length)
+            self._buffer_start = self._position
+        start = self._position - self._buffer_start
+        data = self._buffer[start:start + size]
+        self._position += len(data)
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+class ColumnStatsAccumulator:
+    """Statistiques par colonne calculées bloc par bloc (nulls, min, max)"""
+
+    def __init__(self):
+        self.columns: Dict[str, Dict[str, Any]] = {}
+
+    def update(self, batch: pa.RecordBatch):
+        for name, column in zip(batch.schema.names, batch.columns):
+            stats = self.columns.setdefault(name, {"null_count": 0, "min": None, "max": None})
+            stats["null_count"] += column.null_count
+            if column.null_count == len(column):
+                continue
+            try:
+                min_max = pc.min_max(column)
+            except (pa.ArrowNotImplementedError, pa.ArrowInvalid, TypeError):
+                continue
+            low, high = min_max["min"].as_py(), min_max["max"].as_py()
+            if low is not None and (stats["min"] is None or low < stats["min"]):
+                stats["min"] = low
+            if high is not None and (stats["max"] is None or high > stats["max"]):
+                stats["max"] = high
+
+    def result(self) -> Dict[str, Dict[str, Any]]:
+        # Les valeurs temporelles sont stockées en ISO 8601 dans le document
+        return {
+            name: {key: value.isoformat() if hasattr(value, "isoformat") else value for key, value in stats.items()}
+            for name, stats in self.columns.items()
+        }
+
+
+def columnar_object_name(source_path: str, fmt: str) -> str:
+    base, _ = os.path.splitext(source_path)
+    return f"{base}.{SUPPORTED_FORMATS[fmt]['extension']}"
+
+
+def schema_to_json(schema: pa.Schema) -> List[Dict[str, Any]]:
+    return [{"name": field.name, "type": str(field.type), "nullable": field.nullable} for field in schema]
+
+
+def iter_csv_batches(minio_client, bucket: str, object_name: str, block_size: int = DEFAULT_BLOCK_SIZE):
+    """Lit un CSV MinIO en flux sous forme de RecordBatch Arrow"""
+    response = minio_client.get_object(bucket, object_name)
+    try:
+        reader = pa_csv.open_csv(
+            io.BufferedReader(_ResponseReader(response)),
+            read_options=pa_csv.ReadOptions(block_size=block_size)
+        )
+        for batch in reader:
+            yield batch
+    finally:
+        response.close()
+        response.release_conn()
+
+
+class _ResponseReader(io.RawIOBase):
+    def __init__(self, raw):
+        self.raw = raw
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.raw.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def convert_to_columnar(
+    minio_client,
+    bucket: str,
+    source_path: str,
+    fmt: str = "parquet",
+    row_group_rows: int = DEFAULT_ROW_GROUP_ROWS,
+    batch_callbacks: Optional[List[Callable[[pa.RecordBatch], None]]] = None,
+    temp_dir: Optional[str] = None,
+    output_path: Optional[str] = None
+) -> Dict[str, Any]:
+    """Convertit un CSV stocké dans MinIO et retourne les métadonnées colonnaires"""
+    if fmt not in SUPPORTED_FORMATS:
+        raise ColumnarConversionError(f"Unsupported columnar format: {fmt}")
+
+    output_path = output_path or columnar_object_name(source_path, fmt)
+    stats = ColumnStatsAccumulator()
+    row_count = 0
+    schema = None
+    writer = None
+
+    with tempfile.NamedTemporaryFile(suffix=f".{fmt}", dir=temp_dir) as temp_file:
+        try:
+            for batch in iter_csv_batches(minio_client, bucket, source_path):
+                if writer is None:
+                    schema = batch.schema
+                    if fmt == "parquet":
+                        writer = pq.ParquetWriter(temp_file.name, schema, compression="snappy")
+                    else:
+                        writer = pa.ipc.new_file(temp_file.name, schema)
+                if fmt == "parquet":
+                    writer.write_batch(batch, row_group_size=row_group_rows)
+                else:
+                    # Lots bornés pour pouvoir lire le premier lot sans charger tout le fichier
+                    for offset in range(0, batch.num_rows, row_group_rows):
+                        writer.write_batch(batch.slice(offset, row_group_rows))
+                row_count += batch.num_rows
+                stats.update(batch)
+                for callback in batch_callbacks or []:
+                    callback(batch)
+        except pa.ArrowInvalid as e:
+            raise ColumnarConversionError(f"Cannot parse {source_path} as CSV: {str(e)}")
+        finally:
+            if writer is not None:
+                writer.close()
+
+        if schema is None:
+            raise ColumnarConversionError(f"{source_path} contains no rows")
+
+        row_groups = pq.ParquetFile(temp_file.name).num_row_groups if fmt == "parquet" else None
+        file_size = os.path.getsize(temp_file.name)
+        minio_client.fput_object(
+            bucket,
+            output_path,
+            temp_file.name,
+            content_type=SUPPORTED_FORMATS[fmt]["content_type"]
+        )
+
+    return {
+        "format": fmt,
+        "file_path": output_path,
+        "file_size": file_size,
+        "schema": schema_to_json(schema),
+        "row_count": row_count,
+        "row_groups": row_groups,
+        "column_stats": stats.result()
+    }
+
+
+def iter_columnar_batches(minio_client, bucket: str, columnar: Dict[str, Any], batch_size: int,
+                          columns: Optional[List[str]] = None):
+    """Lit une copie colonnaire par lots, en ne récupérant que les colonnes demandées"""
+    source = MinioRangeFile(minio_client, bucket, columnar["file_path"], size=columnar.get("file_size"))
+    if columnar.get("format") == "parquet":
+        parquet_file = pq.ParquetFile(source)
+        for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+            yield batch, source.bytes_read
+    else:
+        reader = pa.ipc.open_file(source)
+        for index in range(reader.num_record_batches):
+            batch = reader.get_batch(index)
+            if columns:
+                batch = batch.select(columns)
+            yield batch, source.bytes_read
@@ -0,0 +1,119 @@
+"""
+Aperçu rapide d'un dataset : seules les premières lignes sont lues.
+
+Pour un CSV, l'objet MinIO est lu par GET partiels (Range) de taille croissante
+jusqu'à obtenir assez de lignes complètes. Pour une copie colonnaire, seul le
+pied de page et le premier groupe de lignes sont récupérés. Le coût ne dépend
+donc que du nombre de lignes demandé, pas de la taille du dataset.
+"""
+
+import math
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from columnar import MinioRangeFile, schema_to_json
+
+DEFAULT_INITIAL_RANGE = 64 * 1024
+DEFAULT_MAX_RANGE = 16 * 1024 * 1024
+
+
+class PreviewError(ValueError):
+    """Fichier illisible ou en-tête trop volumineux pour un aperçu"""
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    return value
+
+
+def table_preview(table: pa.Table, rows: int) -> Dict[str, Any]:
+    head = table.slice(0, rows)
+    return {
+        "schema": schema_to_json(head.schema),
+        "rows": [{name: _json_value(value) for name, value in row.items()} for row in head.to_pylist()],
+        "row_count": head.num_rows
+    }
+
+
+def _fetch_range(minio_client, bucket: str, object_name: str, offset: int, length: int) -> bytes:
+    response = minio_client.get_object(bucket, object_name, offset=offset, length=length)
+    try:
+        return response.read()
+    finally:
+        response.close()
+        response.release_conn()
+
+
+def preview_csv(minio_client, bucket: str, object_name: str, rows: int, file_size: Optional[int] = None,
+                initial_range: int = DEFAULT_INITIAL_RANGE, max_range: int = DEFAULT_MAX_RANGE) -> Dict[str, Any]:
+    """Lit l'en-tête et les premières lignes d'un CSV par GET partiels successifs"""
+    if file_size is None:
+        file_size = minio_client.stat_object(bucket, object_name).size
+
+    head = b""
+    length = initial_range
+    while True:
+        # Seuls les octets manquants sont demandés à chaque agrandissement
+        fetch_length = min(length, file_size) - len(head)
+        if fetch_length > 0:
+            head += _fetch_range(minio_client, bucket, object_name, len(head), fetch_length)
+        complete = len(head) >= file_size
+        # Ne garder que des lignes complètes tant que la fin du fichier n'est pas atteinte
+        usable = head if complete else head[:head.rfind(b"\n") + 1]
+        if usable and (complete or usable.count(b"\n") > rows):
+            try:
+                table = pa_csv.read_csv(pa.py_buffer(usable))
+                if complete or table.num_rows >= rows:
+                    break
+            except pa.ArrowInvalid as e:
+                # Une valeur entre guillemets peut contenir un saut de ligne coupé
+                if complete:
+                    raise PreviewError(f"Cannot parse {object_name} as CSV: {str(e)}")
+        if complete:
+            raise PreviewError(f"{object_name} contains no rows")
+        if length >= max_range:
+            raise PreviewError(f"Could not read {rows} rows from the first {max_range} bytes of {object_name}")
+        length = min(length * 2, max_range)
+
+    preview = table_preview(table, rows)
+    preview["bytes_read"] = len(head)
+    return preview
+
+
+def preview_columnar(minio_client, bucket: str, columnar: Dict[str, Any], rows: int) -> Dict[str, Any]:
+    """Lit les premières lignes du premier groupe de lignes (Parquet) ou du premier lot (Arrow)"""
+    source = MinioRangeFile(minio_client, bucket, columnar["file_path"], size=columnar.get("file_size"),
+                            read_ahead=64 * 1024)
+    if columnar.get("format") == "parquet":
+        parquet_file = pq.ParquetFile(source)
+        if parquet_file.num_row_groups:
+            table = parquet_file.read_row_group(0)
+        else:
+            table = parquet_file.schema_arrow.empty_table()
+    else:
+        reader = pa.ipc.open_file(source)
+        batches: List[pa.RecordBatch] = []
+        collected = 0
+        for index in range(reader.num_record_batches):
+            if collected >= rows:
+                break
+            batch = reader.get_batch(index)
+            batches.append(batch)
+            collected += batch.num_rows
+        table = pa.Table.from_batches(batches, schema=reader.schema)
+
+    preview = table_preview(table, rows)
+    preview["bytes_read"] = source.bytes_read
+    return preview
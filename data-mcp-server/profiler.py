@@ -0,0 +1,330 @@
+"""
+Profilage incrémental des datasets tabulaires.
+
+Le profil est calculé en une seule passe, bloc par bloc, pendant l'ingestion :
+type de chaque colonne, valeurs nulles, min/max, moyenne/écart-type (fusion de
+Chan), nombre approximatif de valeurs distinctes (HyperLogLog) et quantiles
+approchés (esquisse KLL). Toutes les structures sont fusionnables et
+sérialisables, ce qui permet de compléter un profil sans relire les données.
+"""
+
+import base64
+import math
+import random
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+PROFILE_QUANTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+
+
+class HyperLogLog:
+    """Compteur de cardinalité approximative (erreur standard ~1.04/sqrt(2^p))"""
+
+    def __init__(self, precision: int = 12, registers: Optional[np.ndarray] = None):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = registers if registers is not None else np.zeros(self.m, dtype=np.uint8)
+
+    def update_hashes(self, hashes: np.ndarray):
+        if hashes.size == 0:
+            return
+        hashes = hashes.astype(np.uint64, copy=False)
+        indexes = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        remaining_bits = 64 - self.precision
+        rest = hashes & np.uint64((1 << remaining_bits) - 1)
+        # Rang = position du premier bit à 1 dans les bits restants
+        ranks = np.full(rest.shape, remaining_bits + 1, dtype=np.int64)
+        nonzero = rest > 0
+        _, exponents = np.frexp(rest[nonzero].astype(np.float64))
+        ranks[nonzero] = remaining_bits - (exponents - 1)
+        np.maximum.at(self.registers, indexes, np.minimum(ranks, 255).astype(np.uint8))
+
+    def merge(self, other: "HyperLogLog"):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        raw = alpha * self.m * self.m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * self.m and zeros:
+            # Correction pour les petites cardinalités (comptage linéaire)
+            return int(round(self.m * math.log(self.m / zeros)))
+        return int(round(raw))
+
+    def to_state(self) -> Dict[str, Any]:
+        return {"p": self.precision, "registers": base64.b64encode(self.registers.tobytes()).decode("ascii")}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "HyperLogLog":
+        registers = np.frombuffer(base64.b64decode(state["registers"]), dtype=np.uint8).copy()
+        return cls(state["p"], registers)
+
+
+class KLLSketch:
+    """Esquisse de quantiles KLL : O(k) valeurs conservées quel que soit le volume"""
+
+    def __init__(self, k: int = 200, levels: Optional[List[np.ndarray]] = None, count: int = 0):
+        self.k = k
+        self.levels: List[np.ndarray] = levels or [np.empty(0, dtype=np.float64)]
+        self.count = count
+        self._random = random.Random(0x5EED)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(int(math.ceil(self.k * (2.0 / 3.0) ** depth)), 2)
+
+    def update_many(self, values: np.ndarray):
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+        self.count += int(values.size)
+        self.levels[0] = np.concatenate([self.levels[0], values.astype(np.float64)])
+        self._compress()
+
+    def _compress(self):
+        # Compaction paresseuse : seul le niveau le plus bas saturé est compacté,
+        # tant que la taille totale dépasse la capacité totale de l'esquisse
+        while sum(items.size for items in self.levels) > sum(self._capacity(h) for h in range(len(self.levels))):
+            for level, items in enumerate(self.levels):
+                if items.size >= self._capacity(level):
+                    self._compact(level)
+                    break
+
+    def _compact(self, level: int):
+        if level + 1 == len(self.levels):
+            self.levels.append(np.empty(0, dtype=np.float64))
+        items = np.sort(self.levels[level])
+        # Un nombre impair d'éléments laisse le dernier au niveau courant
+        leftover = items[-1:] if items.size % 2 else items[:0]
+        paired = items[:items.size - leftover.size]
+        promoted = paired[self._random.randint(0, 1)::2]
+        self.levels[level] = leftover
+        self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+
+    def merge(self, other: "KLLSketch"):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0, dtype=np.float64))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self._compress()
+
+    def quantiles(self, fractions: List[float]) -> Dict[str, Optional[float]]:
+        values = np.concatenate(self.levels) if self.levels else np.empty(0)
+        if values.size == 0:
+            return {f"p{int(round(q * 100)):02d}": None for q in fractions}
+        weights = np.concatenate([np.full(items.size, 2 ** level, dtype=np.float64)
+                                  for level, items in enumerate(self.levels)])
+        order = np.argsort(values)
+        values, cumulative = values[order], np.cumsum(weights[order])
+        total = cumulative[-1]
+        result = {}
+        for q in fractions:
+            index = int(np.searchsorted(cumulative, q * total, side="left"))
+            result[f"p{int(round(q * 100)):02d}"] = float(values[min(index, values.size - 1)])
+        return result
+
+    def to_state(self) -> Dict[str, Any]:
+        return {"k": self.k, "count": self.count, "levels": [items.tolist() for items in self.levels]}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "KLLSketch":
+        levels = [np.asarray(items, dtype=np.float64) for items in state["levels"]]
+        return cls(state["k"], levels, state["count"])
+
+
+def _kind_of(series: pd.Series) -> str:
+    if pd.api.types.is_bool_dtype(series):
+        return "boolean"
+    if pd.api.types.is_integer_dtype(series):
+        return "integer"
+    if pd.api.types.is_float_dtype(series):
+        return "float"
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "datetime"
+    return "string"
+
+
+def _merge_kinds(left: Optional[str], right: str) -> str:
+    if left is None or left == right:
+        return right
+    if {left, right} <= {"integer", "float"}:
+        return "float"
+    return "string"
+
+
+class ColumnProfiler:
+    """Statistiques d'une colonne, mises à jour bloc par bloc"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.kind: Optional[str] = None
+        self.count = 0
+        self.null_count = 0
+        self.minimum = None
+        self.maximum = None
+        # Moyenne et variance par fusion de Chan (numériquement stable)
+        self.numeric_count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.hll = HyperLogLog()
+        self.kll = KLLSketch()
+
+    def update(self, series: pd.Series):
+        self.count += len(series)
+        nulls = int(series.isna().sum())
+        self.null_count += nulls
+        non_null = series.dropna()
+        if non_null.empty:
+            return
+        self.kind = _merge_kinds(self.kind, _kind_of(non_null))
+
+        self.hll.update_hashes(pd.util.hash_pandas_object(non_null, index=False).to_numpy())
+
+        if self.kind in ("integer", "float"):
+            values = non_null.to_numpy(dtype=np.float64)
+            self._update_moments(values)
+            self.kll.update_many(values)
+            low, high = values.min(), values.max()
+            if self.kind == "integer":
+                self._update_range(int(low), int(high))
+            else:
+                self._update_range(float(low), float(high))
+        elif self.kind == "datetime":
+            self._update_range(non_null.min().isoformat(), non_null.max().isoformat())
+        elif self.kind == "boolean":
+            self._update_range(bool(non_null.min()), bool(non_null.max()))
+
+    def _update_range(self, low, high):
+        try:
+            if self.minimum is None or low < self.minimum:
+                self.minimum = low
+            if self.maximum is None or high > self.maximum:
+                self.maximum = high
+        except TypeError:
+            # Types incompatibles entre blocs (colonne devenue texte)
+            self.minimum = self.maximum = None
+
+    def _update_moments(self, values: np.ndarray):
+        n_b = values.size
+        mean_b = float(values.mean())
+        m2_b = float(((values - mean_b) ** 2).sum())
+        n_a = self.numeric_count
+        total = n_a + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / total
+        self.m2 += m2_b + delta * delta * n_a * n_b / total
+        self.numeric_count = total
+
+    def merge(self, other: "ColumnProfiler"):
+        self.count += other.count
+        self.null_count += other.null_count
+        if other.kind is not None:
+            self.kind = _merge_kinds(self.kind, other.kind)
+        if other.minimum is not None:
+            self._update_range(other.minimum, other.maximum)
+        if other.numeric_count:
+            n_a, n_b = self.numeric_count, other.numeric_count
+            total = n_a + n_b
+            delta = other.mean - self.mean
+            self.mean += delta * n_b / total
+            self.m2 += other.m2 + delta * delta * n_a * n_b / total
+            self.numeric_count = total
+        self.hll.merge(other.hll)
+        self.kll.merge(other.kll)
+
+    def summary(self) -> Dict[str, Any]:
+        summary = {
+            "type": self.kind or "unknown",
+            "count": self.count,
+            "null_count": self.null_count,
+            "distinct_approx": self.hll.estimate(),
+            "min": self.minimum,
+            "max": self.maximum,
+        }
+        if self.kind in ("integer", "float") and self.numeric_count:
+            summary["mean"] = self.mean
+            summary["std"] = math.sqrt(self.m2 / self.numeric_count)
+            summary["quantiles"] = self.kll.quantiles(PROFILE_QUANTILES)
+        return summary
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "count": self.count,
+            "null_count": self.null_count,
+            "min": self.minimum,
+            "max": self.maximum,
+            "numeric_count": self.numeric_count,
+            "mean": self.mean,
+            "m2": self.m2,
+            "hll": self.hll.to_state(),
+            "kll": self.kll.to_state(),
+        }
+
+    @classmethod
+    def from_state(cls, name: str, state: Dict[str, Any]) -> "ColumnProfiler":
+        column = cls(name)
+        column.kind = state["kind"]
+        column.count = state["count"]
+        column.null_count = state["null_count"]
+        column.minimum = state["min"]
+        column.maximum = state["max"]
+        column.numeric_count = state["numeric_count"]
+        column.mean = state["mean"]
+        column.m2 = state["m2"]
+        column.hll = HyperLogLog.from_state(state["hll"])
+        column.kll = KLLSketch.from_state(state["kll"])
+        return column
+
+
+class DatasetProfiler:
+    """Profil complet d'un dataset, alimenté par des DataFrames ou des lots Arrow"""
+
+    def __init__(self):
+        self.columns: Dict[str, ColumnProfiler] = {}
+        self.row_count = 0
+
+    def update(self, chunk: pd.DataFrame):
+        self.row_count += len(chunk)
+        for name in chunk.columns:
+            column = self.columns.get(name)
+            if column is None:
+                column = self.columns[name] = ColumnProfiler(name)
+            column.update(chunk[name])
+
+    def update_arrow(self, batch):
+        self.update(batch.to_pandas())
+
+    def merge(self, other: "DatasetProfiler"):
+        self.row_count += other.row_count
+        for name, column in other.columns.items():
+            if name in self.columns:
+                self.columns[name].merge(column)
+            else:
+                self.columns[name] = column
+
+    def profile(self) -> Dict[str, Any]:
+        return {
+            "row_count": self.row_count,
+            "column_count": len(self.columns),
+            "columns": {name: column.summary() for name, column in self.columns.items()},
+        }
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "row_count": self.row_count,
+            "columns": {name: column.to_state() for name, column in self.columns.items()},
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "DatasetProfiler":
+        profiler = cls()
+        profiler.row_count = state["row_count"]
+        profiler.columns = {
+            name: ColumnProfiler.from_state(name, column_state)
+            for name, column_state in state["columns"].items()
+        }
+        return profiler
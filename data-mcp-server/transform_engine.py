@@ -0,0 +1,595 @@
+"""
+Moteur de transformation de datasets pour le Data MCP Server.
+
+Le fichier source est lu en flux depuis MinIO par blocs de lignes, chaque bloc
+traverse un pipeline d'opérateurs vectorisés (pandas), puis le résultat est
+réécrit en flux vers MinIO en upload multipart. La mémoire utilisée dépend de
+la taille des blocs et des parts, pas de la taille du fichier.
+
+Les opérateurs qui ont besoin de statistiques globales (scale, one_hot sans
+catégories explicites) sont ajustés lors de passes de lecture préalables.
+
+Les types des colonnes sont fixés pour tout le fichier (schéma stocké du
+dataset, sinon types du premier bloc) afin qu'un même fichier ne change pas de
+types d'un bloc à l'autre. Les expressions `expr` de filter et derive sont
+limitées à des colonnes du dataset, des constantes, l'arithmétique et les
+comparaisons : ni appels, ni attributs, ni variables locales (`@`).
+"""
+
+import ast
+import io
+import re
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from columnar import iter_columnar_batches
+
+# Taille des blocs lus et des parts envoyées à MinIO
+DEFAULT_CHUNK_ROWS = 50000
+DEFAULT_PART_SIZE = 16 * 1024 * 1024
+
+
+class TransformError(ValueError):
+    """Pipeline de transformation invalide ou inapplicable aux données"""
+
+
+# Opérateurs du pipeline
+class Operator:
+    needs_fit = False
+
+    def __init__(self, spec: Dict[str, Any]):
+        self.spec = spec
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        raise NotImplementedError
+
+    # Passes d'ajustement (uniquement pour les opérateurs avec needs_fit)
+    def observe(self, df: pd.DataFrame):
+        pass
+
+    def finalize(self):
+        self.needs_fit = False
+
+    def describe(self) -> Dict[str, Any]:
+        return dict(self.spec)
+
+    def _require_columns(self, df: pd.DataFrame, columns: List[str]):
+        missing = [c for c in columns if c not in df.columns]
+        if missing:
+            raise TransformError(f"{self.spec['type']}: unknown columns {missing}")
+
+
+FILTER_OPS = {
+    "==": lambda s, v: s == v,
+    "!=": lambda s, v: s != v,
+    ">": lambda s, v: s > v,
+    ">=": lambda s, v: s >= v,
+    "<": lambda s, v: s < v,
+    "<=": lambda s, v: s <= v,
+    "in": lambda s, v: s.isin(v),
+    "not_in": lambda s, v: ~s.isin(v),
+    "is_null": lambda s, v: s.isna(),
+    "not_null": lambda s, v: s.notna(),
+}
+
+
+EXPRESSION_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd, ast.Invert,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow, ast.BitAnd, ast.BitOr,
+    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn,
+    ast.Name, ast.Load, ast.Constant, ast.List, ast.Tuple
+)
+BACKTICK_NAME = re.compile(r"`([^`]*)`")
+
+
+def expression_columns(expr: Any, op_type: str) -> List[str]:
+    """
+    Vérifie qu'une expression pandas (query/eval) n'utilise que des noms de
+    colonnes, des constantes, l'arithmétique et les comparaisons ; retourne
+    les colonnes référencées (à contrôler contre celles du dataset).
+    """
+    if not isinstance(expr, str):
+        raise TransformError(f"{op_type}: 'expr' must be a string")
+    # Les noms de colonnes entre accents graves (espaces...) deviennent des identifiants
+    quoted = {}
+    def substitute(match):
+        placeholder = f"__column_{len(quoted)}"
+        quoted[placeholder] = match.group(1)
+        return placeholder
+    try:
+        tree = ast.parse(BACKTICK_NAME.sub(substitute, expr), mode="eval")
+    except SyntaxError:
+        raise TransformError(f"{op_type}: invalid expression '{expr}'")
+    columns = []
+    for node in ast.walk(tree):
+        if not isinstance(node, EXPRESSION_NODES):
+            raise TransformError(f"{op_type}: '{type(node).__name__}' is not allowed in expression '{expr}'")
+        if isinstance(node, ast.Name):
+            name = quoted.get(node.id, node.id)
+            if name not in columns:
+                columns.append(name)
+    return columns
+
+
+class FilterOperator(Operator):
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.expr = spec.get("expr")
+        if self.expr:
+            self.expr_columns = expression_columns(self.expr, "filter")
+        else:
+            if "column" not in spec:
+                raise TransformError("filter: 'expr' or 'column' is required")
+            if spec.get("op", "==") not in FILTER_OPS:
+                raise TransformError(f"filter: unsupported op '{spec.get('op')}'")
+
+    def apply(self, df):
+        if self.expr:
+            self._require_columns(df, self.expr_columns)
+            return df.query(self.expr)
+        self._require_columns(df, [self.spec["column"]])
+        mask = FILTER_OPS[self.spec.get("op", "==")](df[self.spec["column"]], self.spec.get("value"))
+        return df[mask.fillna(False)]
+
+
+class SelectOperator(Operator):
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.columns = spec.get("columns") or []
+        if not self.columns:
+            raise TransformError("select: 'columns' is required")
+
+    def apply(self, df):
+        self._require_columns(df, self.columns)
+        return df[self.columns]
+
+
+CAST_TYPES = {
+    "int": "Int64",
+    "integer": "Int64",
+    "float": "float64",
+    "double": "float64",
+    "str": "string",
+    "string": "string",
+    "bool": "boolean",
+    "boolean": "boolean",
+    "category": "category",
+}
+
+
+class CastOperator(Operator):
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.columns = spec.get("columns") or {}
+        if not self.columns:
+            raise TransformError("cast: 'columns' mapping is required")
+        for column, target in self.columns.items():
+            if target not in CAST_TYPES and target != "datetime":
+                raise TransformError(f"cast: unsupported type '{target}' for column '{column}'")
+
+    def apply(self, df):
+        self._require_columns(df, list(self.columns))
+        df = df.copy()
+        for column, target in self.columns.items():
+            if target == "datetime":
+                df[column] = pd.to_datetime(df[column], errors="coerce")
+            elif target in ("int", "integer", "float", "double"):
+                df[column] = pd.to_numeric(df[column], errors="coerce").astype(CAST_TYPES[target])
+            else:
+                df[column] = df[column].astype(CAST_TYPES[target])
+        return df
+
+
+class FillnaOperator(Operator):
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.values = spec.get("values")
+        if self.values is None:
+            if "value" not in spec:
+                raise TransformError("fillna: 'values' or 'value' is required")
+            columns = spec.get("columns")
+            self.values = {c: spec["value"] for c in columns} if columns else spec["value"]
+
+    def apply(self, df):
+        if isinstance(self.values, dict):
+            self._require_columns(df, list(self.values))
+        return df.fillna(self.values)
+
+
+class ScaleOperator(Operator):
+    """Standardisation (z-score) ou min-max, avec statistiques fournies ou calculées"""
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.columns = spec.get("columns") or []
+        self.method = spec.get("method", "standard")
+        if not self.columns:
+            raise TransformError("scale: 'columns' is required")
+        if self.method not in ("standard", "minmax"):
+            raise TransformError(f"scale: unsupported method '{self.method}'")
+        self.params = dict(spec.get("params") or {})
+        self.needs_fit = any(c not in self.params for c in self.columns)
+        # Accumulateurs de la passe d'ajustement
+        self._count = {c: 0 for c in self.columns}
+        self._sum = {c: 0.0 for c in self.columns}
+        self._sum_sq = {c: 0.0 for c in self.columns}
+        self._min = {c: np.inf for c in self.columns}
+        self._max = {c: -np.inf for c in self.columns}
+
+    def observe(self, df):
+        self._require_columns(df, self.columns)
+        for column in self.columns:
+            values = pd.to_numeric(df[column], errors="coerce").dropna().to_numpy(dtype="float64")
+            if values.size == 0:
+                continue
+            self._count[column] += values.size
+            self._sum[column] += values.sum()
+            self._sum_sq[column] += np.square(values).sum()
+            self._min[column] = min(self._min[column], values.min())
+            self._max[column] = max(self._max[column], values.max())
+
+    def finalize(self):
+        for column in self.columns:
+            if column in self.params:
+                continue
+            n = self._count[column]
+            mean = self._sum[column] / n if n else 0.0
+            variance = max(self._sum_sq[column] / n - mean * mean, 0.0) if n else 0.0
+            self.params[column] = {
+                "mean": mean,
+                "std": float(np.sqrt(variance)),
+                "min": float(self._min[column]) if n else 0.0,
+                "max": float(self._max[column]) if n else 0.0,
+            }
+        super().finalize()
+
+    def apply(self, df):
+        self._require_columns(df, self.columns)
+        df = df.copy()
+        for column in self.columns:
+            values = pd.to_numeric(df[column], errors="coerce").astype("float64")
+            params = self.params[column]
+            if self.method == "standard":
+                std = params.get("std") or 1.0
+                df[column] = (values - params.get("mean", 0.0)) / std
+            else:
+                span = (params.get("max", 1.0) - params.get("min", 0.0)) or 1.0
+                df[column] = (values - params.get("min", 0.0)) / span
+        return df
+
+    def describe(self):
+        description = super().describe()
+        description["params"] = self.params
+        return description
+
+
+class OneHotOperator(Operator):
+    """Encodage one-hot avec un jeu de catégories stable entre les blocs"""
+
+    MAX_CATEGORIES = 1000
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.column = spec.get("column")
+        if not self.column:
+            raise TransformError("one_hot: 'column' is required")
+        self.prefix = spec.get("prefix", self.column)
+        self.drop_original = spec.get("drop_original", True)
+        self.categories = spec.get("categories")
+        self.needs_fit = self.categories is None
+        self._seen = set()
+
+    def observe(self, df):
+        self._require_columns(df, [self.column])
+        self._seen.update(df[self.column].dropna().astype(str).unique().tolist())
+        if len(self._seen) > self.MAX_CATEGORIES:
+            raise TransformError(f"one_hot: column '{self.column}' has more than {self.MAX_CATEGORIES} categories")
+
+    def finalize(self):
+        if self.categories is None:
+            self.categories = sorted(self._seen)
+        super().finalize()
+
+    def apply(self, df):
+        self._require_columns(df, [self.column])
+        values = df[self.column].astype(str)
+        encoded = pd.DataFrame(
+            {f"{self.prefix}_{category}": (values == str(category)).astype("int8") for category in self.categories},
+            index=df.index
+        )
+        if self.drop_original:
+            df = df.drop(columns=[self.column])
+        return pd.concat([df, encoded], axis=1)
+
+    def describe(self):
+        description = super().describe()
+        description["categories"] = self.categories
+        return description
+
+
+class DeriveOperator(Operator):
+    def __init__(self, spec):
+        super().__init__(spec)
+        if not spec.get("column") or not spec.get("expr"):
+            raise TransformError("derive: 'column' and 'expr' are required")
+        self.expr_columns = expression_columns(spec["expr"], "derive")
+
+    def apply(self, df):
+        self._require_columns(df, self.expr_columns)
+        df = df.copy()
+        try:
+            df[self.spec["column"]] = df.eval(self.spec["expr"])
+        except Exception as e:
+            raise TransformError(f"derive: cannot evaluate '{self.spec['expr']}': {str(e)}")
+        return df
+
+
+OPERATORS = {
+    "filter": FilterOperator,
+    "select": SelectOperator,
+    "cast": CastOperator,
+    "fillna": FillnaOperator,
+    "scale": ScaleOperator,
+    "one_hot": OneHotOperator,
+    "derive": DeriveOperator,
+}
+
+
+def compile_pipeline(transformations: List[Dict[str, Any]]) -> List[Operator]:
+    """Valide la liste de transformations déclarées et construit les opérateurs"""
+    if not isinstance(transformations, list):
+        raise TransformError("Transformations must be a list")
+    pipeline = []
+    for index, spec in enumerate(transformations):
+        if not isinstance(spec, dict) or spec.get("type") not in OPERATORS:
+            raise TransformError(
+                f"Transformation {index}: unsupported type {spec.get('type') if isinstance(spec, dict) else spec!r}"
+            )
+        pipeline.append(OPERATORS[spec["type"]](spec))
+    return pipeline
+
+
+# Types des colonnes
+NULLABLE_DTYPES = {"int64": "Int64", "bool": "boolean"}
+
+
+def pandas_dtypes(schema_json: Optional[List[Dict[str, Any]]]) -> Dict[str, str]:
+    """Types pandas imposés à la lecture du CSV, d'après le schéma Arrow stocké du dataset"""
+    dtypes = {}
+    for field in schema_json or []:
+        arrow_type = field.get("type") or ""
+        if re.match(r"u?int\d+$", arrow_type):
+            # Entiers nullables : une valeur manquante ne transforme pas la colonne en float
+            dtypes[field["name"]] = "Int64"
+        elif arrow_type in ("halffloat", "float", "double"):
+            dtypes[field["name"]] = "float64"
+        elif arrow_type == "bool":
+            dtypes[field["name"]] = "boolean"
+        elif arrow_type in ("string", "large_string") or arrow_type.startswith(("timestamp", "date", "time")):
+            # Texte (et dates) recopié tel quel
+            dtypes[field["name"]] = "object"
+    return dtypes
+
+
+# Flux d'entrée et de sortie
+class CountingReader(io.RawIOBase):
+    """Enveloppe un flux binaire et compte les octets lus (progression)"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.raw.read(len(buffer))
+        n = len(data)
+        buffer[:n] = data
+        self.bytes_read += n
+        return n
+
+
+class IteratorStream(io.RawIOBase):
+    """Expose un itérateur de blocs d'octets comme un flux lisible (upload multipart)"""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._buffer = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+        n = min(len(buffer), len(self._buffer))
+        buffer[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+    def read(self, size=-1):
+        # Minio lit par parts de taille fixe : lire jusqu'à `size` octets ou la fin
+        if size is None or size < 0:
+            return b"".join([self._buffer] + list(self._chunks))
+        parts = []
+        remaining = size
+        while remaining > 0:
+            chunk = super().read(remaining)
+            if not chunk:
+                break
+            parts.append(chunk)
+            remaining -= len(chunk)
+        return b"".join(parts)
+
+
+class TransformJob:
+    """Exécute un pipeline sur un objet MinIO et écrit le résultat dans un autre objet"""
+
+    def __init__(
+        self,
+        minio_client,
+        bucket: str,
+        source_path: Union[str, List[str]],
+        output_path: str,
+        pipeline: List[Operator],
+        source_size: int = 0,
+        chunk_rows: int = DEFAULT_CHUNK_ROWS,
+        part_size: int = DEFAULT_PART_SIZE,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+        progress_interval: float = 2.0,
+        columnar: Optional[Dict[str, Any]] = None,
+        dtypes: Optional[Dict[str, str]] = None
+    ):
+        self.minio_client = minio_client
+        self.bucket = bucket
+        # Un dataset versionné peut être composé de plusieurs partitions lues à la suite
+        self.source_paths = [source_path] if isinstance(source_path, str) else list(source_path)
+        self.output_path = output_path
+        self.pipeline = pipeline
+        self.source_size = source_size
+        self.chunk_rows = chunk_rows
+        self.part_size = part_size
+        self.progress_callback = progress_callback
+        self.progress_interval = progress_interval
+        # Copie colonnaire du dataset (Parquet/Arrow) lue à la place du CSV si disponible
+        self.columnar = columnar
+        if columnar:
+            self.source_size = columnar.get("file_size") or 0
+        # Types imposés à la lecture (schéma stocké), complétés par ceux du premier bloc
+        self.dtypes = dtypes or None
+        self._chunk_dtypes: Dict[str, str] = {}
+
+        self.fit_passes = sum(1 for op in pipeline if op.needs_fit)
+        self.total_passes = self.fit_passes + 1
+        self.progress = {
+            "pass": 0,
+            "total_passes": self.total_passes,
+            "bytes_read": 0,
+            "rows_in": 0,
+            "rows_out": 0,
+            "percent": 0.0
+        }
+        self._last_report = 0.0
+
+    def _report(self, bytes_read: int, force: bool = False):
+        self.progress["bytes_read"] = bytes_read
+        if self.source_size:
+            pass_fraction = min(bytes_read / self.source_size, 1.0)
+            self.progress["percent"] = round(
+                100.0 * ((self.progress["pass"] - 1) + pass_fraction) / self.total_passes, 1
+            )
+        now = time.time()
+        if self.progress_callback and (force or now - self._last_report >= self.progress_interval):
+            self._last_report = now
+            self.progress_callback(dict(self.progress))
+
+    def _read_chunks(self) -> Iterator[pd.DataFrame]:
+        if self.columnar:
+            yield from self._read_columnar_chunks()
+            return
+        bytes_before = 0
+        for source_path in self.source_paths:
+            response = self.minio_client.get_object(self.bucket, source_path)
+            reader = CountingReader(response)
+            try:
+                for chunk in pd.read_csv(io.BufferedReader(reader), chunksize=self.chunk_rows, dtype=self.dtypes):
+                    chunk = self._conform(chunk)
+                    self.progress["rows_in"] += len(chunk)
+                    yield chunk
+                    self._report(bytes_before + reader.bytes_read)
+                bytes_before += reader.bytes_read
+            finally:
+                response.close()
+                response.release_conn()
+        self._report(bytes_before, force=True)
+
+    def _conform(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """
+        Ramène chaque bloc CSV aux types du premier bloc où la colonne a des
+        valeurs : l'inférence de pandas, faite bloc par bloc, ne doit pas
+        changer le type d'une colonne en cours de fichier.
+        """
+        for column in chunk.columns:
+            target = self._chunk_dtypes.get(column)
+            if target is None:
+                if chunk[column].isna().all():
+                    continue
+                dtype = str(chunk[column].dtype)
+                target = self._chunk_dtypes[column] = NULLABLE_DTYPES.get(dtype, dtype)
+            if str(chunk[column].dtype) == target:
+                continue
+            try:
+                chunk[column] = chunk[column].astype(target)
+            except (TypeError, ValueError):
+                raise TransformError(
+                    f"Column '{column}' changes type from {target} to {chunk[column].dtype} "
+                    f"after row {self.progress['rows_in']}; wait for the dataset profile so its stored schema is used"
+                )
+        return chunk
+
+    def _read_columnar_chunks(self) -> Iterator[pd.DataFrame]:
+        bytes_read = 0
+        for batch, bytes_read in iter_columnar_batches(self.minio_client, self.bucket, self.columnar, self.chunk_rows):
+            chunk = batch.to_pandas()
+            self.progress["rows_in"] += len(chunk)
+            yield chunk
+            self._report(bytes_read)
+        self._report(bytes_read, force=True)
+
+    def _apply(self, df: pd.DataFrame, upto: Optional[int] = None) -> pd.DataFrame:
+        for op in self.pipeline[:upto]:
+            df = op.apply(df)
+        return df
+
+    def _fit(self):
+        """Une passe par opérateur à ajuster, en appliquant les opérateurs qui le précèdent"""
+        for index, op in enumerate(self.pipeline):
+            if not op.needs_fit:
+                continue
+            self.progress["pass"] += 1
+            self.progress["rows_in"] = 0
+            for chunk in self._read_chunks():
+                op.observe(self._apply(chunk, index))
+            op.finalize()
+
+    def _output_chunks(self) -> Iterator[bytes]:
+        header = True
+        for chunk in self._read_chunks():
+            transformed = self._apply(chunk)
+            self.progress["rows_out"] += len(transformed)
+            if len(transformed) == 0 and not header:
+                continue
+            yield transformed.to_csv(index=False, header=header).encode("utf-8")
+            header = False
+
+    def run(self) -> Dict[str, Any]:
+        self._fit()
+
+        self.progress["pass"] += 1
+        self.progress["rows_in"] = 0
+        self.progress["rows_out"] = 0
+        result = self.minio_client.put_object(
+            self.bucket,
+            self.output_path,
+            IteratorStream(self._output_chunks()),
+            length=-1,
+            part_size=self.part_size,
+            content_type="text/csv"
+        )
+        stat = self.minio_client.stat_object(self.bucket, self.output_path)
+
+        self.progress["percent"] = 100.0
+        return {
+            "file_size": stat.size,
+            "etag": getattr(result, "etag", None),
+            "rows_in": self.progress["rows_in"],
+            "rows_out": self.progress["rows_out"],
+            "pipeline": [op.describe() for op in self.pipeline]
+        }
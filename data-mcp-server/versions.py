@@ -0,0 +1,112 @@
+"""
+Versions immuables des datasets.
+
+Chaque upload, transformation ou ajout de données crée un instantané dans la
+collection `dataset_versions` : la liste des partitions (fichiers MinIO) qui
+composent le dataset à cette version. Une partition n'est jamais réécrite ; un
+ajout crée une version dont la liste reprend les partitions de la version
+parente plus la nouvelle. Le document du dataset pointe vers `current_version`.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+# Champs gérés par le serveur, ignorés par update_dataset
+PROTECTED_DATASET_FIELDS = {
+    "has_file", "file_path", "file_size", "file_name", "content_type", "content_digest",
+    "current_version", "version_seq", "row_count", "columnar", "profile",
+    "spark_schema", "schema", "source_dataset_id", "source_version", "transform_status", "transform_progress"
+}
+
+
+def version_id(dataset_id: str, version: int) -> str:
+    return f"{dataset_id}@{version}"
+
+
+def make_partition(file_path: str, file_size: int, version: int, content_digest: Optional[str] = None,
+                   row_count: Optional[int] = None, content_type: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "file_path": file_path,
+        "file_size": file_size,
+        "content_digest": content_digest,
+        "content_type": content_type,
+        "row_count": row_count,
+        "added_in_version": version
+    }
+
+
+def next_version_number(datasets_collection, dataset_id: str) -> int:
+    """Réserve atomiquement le prochain numéro de version du dataset"""
+    dataset = datasets_collection.find_one_and_update(
+        {"id": dataset_id},
+        {"$inc": {"version_seq": 1}},
+        projection={"version_seq": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if dataset is None:
+        raise KeyError(f"Dataset with ID {dataset_id} not found")
+    return dataset["version_seq"]
+
+
+def create_version(versions_collection, datasets_collection, dataset_id: str, kind: str,
+                   partitions: List[Dict[str, Any]], version: Optional[int] = None,
+                   parent_version: Optional[int] = None, **metadata) -> Dict[str, Any]:
+    """Enregistre un nouvel instantané ; les partitions doivent déjà être stockées"""
+    if version is None:
+        version = next_version_number(datasets_collection, dataset_id)
+    row_counts = [partition.get("row_count") for partition in partitions]
+    snapshot = {
+        "id": version_id(dataset_id, version),
+        "dataset_id": dataset_id,
+        "version": version,
+        "kind": kind,
+        "parent_version": parent_version,
+        "partitions": partitions,
+        "partition_count": len(partitions),
+        "file_size": sum(partition.get("file_size") or 0 for partition in partitions),
+        "row_count": sum(row_counts) if all(count is not None for count in row_counts) else None,
+        "created_at": datetime.now().isoformat()
+    }
+    snapshot.update(metadata)
+    versions_collection.insert_one(snapshot)
+    snapshot.pop("_id", None)
+    return snapshot
+
+
+def record_partition_rows(versions_collection, dataset_id: str, version: int, file_path: str, row_count: int):
+    """
+    Renseigne le nombre de lignes d'une partition une fois qu'il est connu
+    (profilage ou conversion). Seul un champ encore vide est complété : le
+    contenu de la version ne change pas.
+    """
+    versions_collection.update_many(
+        {"dataset_id": dataset_id, "version": {"$gte": version}},
+        {"$set": {"partitions.$[partition].row_count": row_count}},
+        array_filters=[{"partition.file_path": file_path, "partition.row_count": None}]
+    )
+    for snapshot in versions_collection.find({"dataset_id": dataset_id, "version": {"$gte": version}, "row_count": None}):
+        counts = [partition.get("row_count") for partition in snapshot["partitions"]]
+        if all(count is not None for count in counts):
+            versions_collection.update_one({"_id": snapshot["_id"]}, {"$set": {"row_count": sum(counts)}})
+
+
+def get_version(versions_collection, dataset_id: str, version: int) -> Optional[Dict[str, Any]]:
+    return versions_collection.find_one({"dataset_id": dataset_id, "version": version}, {"_id": 0})
+
+
+def snapshot_from_dataset(dataset: Dict[str, Any]) -> Dict[str, Any]:
+    """Instantané équivalent pour un dataset antérieur au versionnement"""
+    return {
+        "dataset_id": dataset.get("id"),
+        "version": None,
+        "partitions": [make_partition(
+            dataset.get("file_path"),
+            dataset.get("file_size") or 0,
+            None,
+            dataset.get("content_digest"),
+            dataset.get("row_count"),
+            dataset.get("content_type")
+        )]
+    }
@@ -0,0 +1,383 @@
+"""
+Signaux d'autoscaling et pools de processus de prédiction par déploiement.
+
+Pour chaque déploiement, le `LoadTracker` mesure sur une fenêtre glissante le
+débit de requêtes, le nombre de requêtes en cours (profondeur de file) et les
+percentiles de latence. `desired_replicas` en déduit un nombre de processus :
+
+- concurrence nécessaire = max(débit x latence moyenne, requêtes en cours)
+  (loi de Little), divisée par la concurrence cible par processus ;
+- tant que cette concurrence ne dépasse pas ce qu'un seul processus absorbe,
+  aucun processus n'est démarré : le modèle préchauffé du serveur répond sans
+  aller-retour entre processus ;
+- si le p95 dépasse la latence cible, le nombre courant est augmenté dans la
+  même proportion ;
+- le résultat est borné par min_replicas/max_replicas, et une baisse n'est
+  appliquée qu'une fois restée valable pendant toute la fenêtre de
+  stabilisation (pas d'oscillation lors d'un creux bref).
+
+Le `WorkerPoolSupervisor` applique ce nombre : chaque déploiement dispose d'un
+pool de processus (démarrés en mode "spawn") qui chargent le modèle depuis le
+cache disque local, en partageant ses pages projetées en mémoire, et se
+partagent une file de requêtes. Un processus est retiré en lui envoyant une
+pilule d'arrêt ; un processus mort est remplacé au passage suivant. Un
+processus qui échoue à charger le modèle n'est relancé qu'après un délai qui
+double à chaque échec, et le pool est déclaré en panne après
+WORKER_MAX_FAILURES échecs consécutifs (jusqu'au changement de modèle).
+"""
+
+import asyncio
+import math
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_SCALING_POLICY = {
+    "min_replicas": 0,
+    "max_replicas": os.cpu_count() or 1,
+    # Requêtes simultanées qu'un processus doit absorber
+    "target_concurrency": 4,
+    # Latence p95 visée (0 désactive ce critère)
+    "target_p95_ms": 0,
+    # Durée pendant laquelle une baisse doit rester valable avant d'être appliquée
+    "scale_down_window_seconds": 60
+}
+
+# Relance des processus qui échouent au chargement du modèle
+WORKER_RETRY_BASE_SECONDS = 5.0
+WORKER_RETRY_MAX_SECONDS = 300.0
+WORKER_MAX_FAILURES = 5
+
+
+def scaling_policy(deployment: Dict[str, Any]) -> Dict[str, Any]:
+    policy = dict(DEFAULT_SCALING_POLICY)
+    policy.update({key: value for key, value in (deployment.get("scaling") or {}).items() if key in policy})
+    return policy
+
+
+def validate_scaling(scaling: Any) -> Optional[str]:
+    """Message d'erreur si la configuration d'autoscaling est invalide"""
+    if scaling is None:
+        return None
+    if not isinstance(scaling, dict):
+        return "scaling must be an object"
+    unknown = sorted(set(scaling) - set(DEFAULT_SCALING_POLICY))
+    if unknown:
+        return f"Unknown scaling settings: {unknown}"
+    for key, value in scaling.items():
+        if not isinstance(value, (int, float)) or isinstance(value, bool) or value < 0:
+            return f"scaling.{key} must be a non-negative number"
+    policy = dict(DEFAULT_SCALING_POLICY, **scaling)
+    if policy["min_replicas"] > policy["max_replicas"]:
+        return "scaling.min_replicas cannot exceed scaling.max_replicas"
+    if policy["target_concurrency"] <= 0:
+        return "scaling.target_concurrency must be positive"
+    return None
+
+
+# Signaux
+
+class LoadTracker:
+    """Débit, requêtes en cours et latences par déploiement sur une fenêtre glissante"""
+
+    def __init__(self, window_seconds: float = 60.0, max_samples: int = 10000):
+        self.window_seconds = window_seconds
+        self.max_samples = max_samples
+        self._samples: Dict[str, deque] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def begin(self, deployment_id: str):
+        with self._lock:
+            self._in_flight[deployment_id] = self._in_flight.get(deployment_id, 0) + 1
+
+    def end(self, deployment_id: str, latency_ms: Optional[float]):
+        now = time.monotonic()
+        with self._lock:
+            self._in_flight[deployment_id] = max(0, self._in_flight.get(deployment_id, 0) - 1)
+            if latency_ms is not None:
+                samples = self._samples.setdefault(deployment_id, deque(maxlen=self.max_samples))
+                samples.append((now, latency_ms))
+
+    def deployments(self) -> List[str]:
+        with self._lock:
+            return list(set(self._samples) | {key for key, value in self._in_flight.items() if value})
+
+    def signals(self, deployment_id: str) -> Dict[str, Any]:
+        now = time.monotonic()
+        cutoff = now - self.window_seconds
+        with self._lock:
+            samples = self._samples.get(deployment_id)
+            while samples and samples[0][0] < cutoff:
+                samples.popleft()
+            latencies = np.array([latency for _, latency in samples] if samples else [], dtype=np.float64)
+            in_flight = self._in_flight.get(deployment_id, 0)
+            # Fenêtre réellement couverte (plus courte juste après le démarrage)
+            span = min(self.window_seconds, now - samples[0][0]) if samples else self.window_seconds
+        requests = len(latencies)
+        return {
+            "request_rate": requests / max(span, 1.0),
+            "in_flight": in_flight,
+            "window_requests": requests,
+            "latency_ms": {
+                "mean": float(latencies.mean()) if requests else 0.0,
+                "p50": float(np.percentile(latencies, 50)) if requests else 0.0,
+                "p95": float(np.percentile(latencies, 95)) if requests else 0.0,
+                "p99": float(np.percentile(latencies, 99)) if requests else 0.0
+            }
+        }
+
+
+def desired_replicas(signals: Dict[str, Any], policy: Dict[str, Any], current: int) -> int:
+    concurrency = max(signals["request_rate"] * signals["latency_ms"]["mean"] / 1000.0, signals["in_flight"])
+    if concurrency <= policy["target_concurrency"]:
+        # Un seul processus suffirait : le modèle préchauffé du serveur s'en charge
+        desired = 0
+    else:
+        desired = math.ceil(concurrency / policy["target_concurrency"])
+        p95 = signals["latency_ms"]["p95"]
+        if policy["target_p95_ms"] and p95 > policy["target_p95_ms"]:
+            desired = max(desired, math.ceil(max(current, 1) * p95 / policy["target_p95_ms"]))
+    return int(min(max(desired, policy["min_replicas"]), policy["max_replicas"]))
+
+
+class ReplicaController:
+    """Fenêtre de stabilisation : une baisse n'est appliquée que si elle reste valable toute la fenêtre"""
+
+    def __init__(self):
+        self._history: Dict[str, deque] = {}
+
+    def decide(self, deployment_id: str, desired: int, current: int, window_seconds: float) -> int:
+        now = time.monotonic()
+        history = self._history.setdefault(deployment_id, deque())
+        history.append((now, desired))
+        while history and history[0][0] < now - window_seconds:
+            history.popleft()
+        if desired >= current:
+            return desired
+        return max(value for _, value in history)
+
+    def forget(self, deployment_id: str):
+        self._history.pop(deployment_id, None)
+
+
+# Processus de prédiction
+
+def _worker_main(model_spec: Dict[str, Any], requests, results):
+    """Boucle d'un processus : charge le modèle une fois, puis score les requêtes de la file partagée"""
+    from artifact_cache import ArtifactCache
+    from minio import Minio
+    from model_registry import load_model
+    import pandas as pd
+
+    pid = os.getpid()
+    try:
+        # Repasser par le cache : le fichier du préchauffage a pu être évincé (retéléchargé alors depuis MinIO)
+        artifact = model_spec["artifact"]
+        minio = model_spec["minio"]
+        minio_client = Minio(minio["endpoint"], access_key=minio["access_key"], secret_key=minio["secret_key"], secure=minio["secure"])
+        path = ArtifactCache(model_spec["cache_dir"], model_spec["max_bytes"]).get(
+            minio_client, artifact["bucket"], artifact["object_name"], artifact["etag"], artifact["suffix"]
+        )
+        model = load_model(model_spec["format"], path, model_spec.get("input_schema"))
+    except Exception as e:
+        results.put(("failed", pid, str(e)))
+        return
+    results.put(("ready", pid, None))
+    while True:
+        request = requests.get()
+        if request is None:
+            # Pilule d'arrêt : ce processus est retiré du pool
+            results.put(("stopped", pid, None))
+            return
+        request_id, instances, feature_columns = request
+        try:
+            frame = pd.DataFrame.from_records(instances)
+            predictions = model.predict(frame, feature_columns or model.feature_columns or None)
+            results.put((request_id, True, predictions.tolist()))
+        except Exception as e:
+            results.put((request_id, False, str(e)))
+
+
+class WorkerPool:
+    """Processus d'un déploiement, partageant une file de requêtes et une file de résultats"""
+
+    def __init__(self, deployment_id: str, model_spec: Dict[str, Any]):
+        self.deployment_id = deployment_id
+        self.model_spec = model_spec
+        self._context = multiprocessing.get_context("spawn")
+        self._requests = self._context.Queue()
+        self._results = self._context.Queue()
+        self._processes: List[Any] = []
+        self._stopping = 0
+        self._ready_pids = set()
+        self._pending: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = {}
+        self._lock = threading.Lock()
+        self.last_error: Optional[str] = None
+        # Échecs consécutifs de chargement du modèle et date du dernier
+        self.failures = 0
+        self._failed_at = 0.0
+        self._reader = threading.Thread(target=self._read_results, name=f"pool-{deployment_id}", daemon=True)
+        self._reader.start()
+
+    @property
+    def replicas(self) -> int:
+        """Processus vivants qui ne sont pas en cours de retrait"""
+        return max(0, sum(1 for process in self._processes if process.is_alive()) - self._stopping)
+
+    @property
+    def ready(self) -> int:
+        return len(self._ready_pids)
+
+    def _read_results(self):
+        while True:
+            try:
+                item = self._results.get()
+            except (EOFError, OSError):
+                # File fermée à l'arrêt de l'interpréteur
+                return
+            if item is None:
+                return
+            key, first, second = item
+            if key == "ready":
+                self._ready_pids.add(first)
+                self.failures = 0
+            elif key in ("stopped", "failed"):
+                self._ready_pids.discard(first)
+                if key == "stopped":
+                    with self._lock:
+                        self._stopping = max(0, self._stopping - 1)
+                else:
+                    self.last_error = second
+                    self.failures += 1
+                    self._failed_at = time.monotonic()
+            else:
+                with self._lock:
+                    pending = self._pending.pop(key, None)
+                if pending is not None:
+                    loop, future = pending
+                    loop.call_soon_threadsafe(_resolve_future, future, first, second)
+
+    @property
+    def broken(self) -> bool:
+        """Le modèle n'a pas pu être chargé WORKER_MAX_FAILURES fois de suite"""
+        return self.failures >= WORKER_MAX_FAILURES
+
+    def retry_in(self) -> float:
+        """Secondes avant qu'un nouveau processus puisse être démarré après un échec"""
+        if not self.failures:
+            return 0.0
+        delay = min(WORKER_RETRY_BASE_SECONDS * 2 ** (self.failures - 1), WORKER_RETRY_MAX_SECONDS)
+        return max(0.0, self._failed_at + delay - time.monotonic())
+
+    def scale_to(self, replicas: int):
+        # Les processus morts (plantage) sont retirés puis remplacés
+        for process in [process for process in self._processes if not process.is_alive()]:
+            process.join(timeout=0)
+            self._ready_pids.discard(process.pid)
+            self._processes.remove(process)
+        current = self.replicas
+        if replicas > current and (self.broken or self.retry_in() > 0):
+            # Pas de relance en boucle d'un modèle qui ne se charge pas
+            replicas = current
+        for _ in range(replicas - current):
+            process = self._context.Process(
+                target=_worker_main,
+                args=(self.model_spec, self._requests, self._results),
+                daemon=True
+            )
+            process.start()
+            self._processes.append(process)
+        for _ in range(current - replicas):
+            with self._lock:
+                self._stopping += 1
+            self._requests.put(None)
+
+    async def predict(self, instances: List[Dict[str, Any]], feature_columns: Optional[List[str]],
+                      timeout: float) -> List[Any]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        request_id = str(uuid.uuid4())
+        with self._lock:
+            self._pending[request_id] = (loop, future)
+        self._requests.put((request_id, instances, feature_columns))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            with self._lock:
+                self._pending.pop(request_id, None)
+
+    def shutdown(self):
+        for _ in self._processes:
+            self._requests.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+        self._results.put(None)
+
+
+def _resolve_future(future: asyncio.Future, ok: bool, value: Any):
+    if future.done():
+        return
+    if ok:
+        future.set_result(value)
+    else:
+        future.set_exception(ValueError(value))
+
+
+class WorkerPoolSupervisor:
+    """Pools de processus par déploiement, recréés quand le modèle du déploiement change"""
+
+    def __init__(self):
+        self._pools: Dict[str, WorkerPool] = {}
+
+    def pool(self, deployment_id: str) -> Optional[WorkerPool]:
+        pool = self._pools.get(deployment_id)
+        return pool if pool is not None and pool.ready > 0 else None
+
+    def replicas(self, deployment_id: str) -> int:
+        pool = self._pools.get(deployment_id)
+        return pool.replicas if pool is not None else 0
+
+    def scale(self, deployment_id: str, replicas: int, model_spec: Optional[Dict[str, Any]]):
+        pool = self._pools.get(deployment_id)
+        if pool is not None and (model_spec is None or pool.model_spec["artifact"] != model_spec["artifact"]):
+            # Modèle remplacé ou déploiement retiré : l'ancien pool est arrêté
+            self.remove(deployment_id)
+            pool = None
+        if replicas <= 0 and pool is None:
+            return
+        if pool is None:
+            pool = WorkerPool(deployment_id, model_spec)
+            self._pools[deployment_id] = pool
+        pool.scale_to(replicas)
+
+    def remove(self, deployment_id: str):
+        pool = self._pools.pop(deployment_id, None)
+        if pool is not None:
+            threading.Thread(target=pool.shutdown, daemon=True).start()
+
+    def shutdown(self):
+        for deployment_id in list(self._pools):
+            pool = self._pools.pop(deployment_id)
+            pool.shutdown()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            deployment_id: {
+                "replicas": pool.replicas,
+                "ready": pool.ready,
+                "last_error": pool.last_error,
+                "failures": pool.failures,
+                "broken": pool.broken
+            }
+            for deployment_id, pool in self._pools.items()
+        }
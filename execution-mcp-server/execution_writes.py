@@ -0,0 +1,124 @@
+"""
+Écritures différées des transitions d'état des exécutions.
+
+Les transitions intermédiaires (pending -> running, ...) ne sont pas écrites
+une à une : elles sont fusionnées par exécution (un `$set` cumulé) puis
+envoyées en un seul `bulk_write` à intervalle borné. Un état terminal
+(completed, failed, cancelled) est fusionné avec ce qui reste en attente pour
+la même exécution et écrit immédiatement, avant que l'appelant ne réponde.
+
+Un verrou sérialise les vidages et les écritures terminales : une transition
+intermédiaire ne peut donc jamais être écrite après l'état terminal de la même
+exécution.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from pymongo import UpdateOne
+
+
+class ExecutionWriteBuffer:
+    def __init__(self, collection, flush_interval: float = 0.5, max_pending: int = 1000, window_seconds: float = 60.0):
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.window_seconds = window_seconds
+        # id d'exécution -> champs à écrire
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # (instant, transitions demandées jusque-là) à chaque aller-retour, pour le débit récent
+        self._round_trip_events: deque = deque()
+        self.updates = 0
+        self.documents_written = 0
+        self.round_trips = 0
+        self.errors = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    def update(self, execution_id: str, fields: Dict[str, Any]):
+        """Transition intermédiaire : fusionnée avec celles en attente, écrite au prochain vidage"""
+        self.updates += 1
+        self._pending.setdefault(execution_id, {}).update(fields)
+        if len(self._pending) >= self.max_pending:
+            self._wakeup.set()
+
+    async def complete(self, execution_id: str, fields: Dict[str, Any]):
+        """État terminal : écrit (avec les transitions en attente) avant de rendre la main"""
+        self.updates += 1
+        async with self._lock:
+            merged = self._pending.pop(execution_id, {})
+            merged.update(fields)
+            try:
+                await asyncio.to_thread(self.collection.update_one, {"id": execution_id}, {"$set": merged})
+            except Exception:
+                self.errors += 1
+                raise
+            self._record(1, 1)
+
+    async def flush(self):
+        async with self._lock:
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            operations = [UpdateOne({"id": execution_id}, {"$set": fields}) for execution_id, fields in pending.items()]
+            try:
+                await asyncio.to_thread(self.collection.bulk_write, operations, ordered=False)
+            except Exception as e:
+                self.errors += 1
+                print(f"Error flushing {len(operations)} execution updates: {str(e)}")
+                # Remettre en attente, sans écraser les transitions arrivées entre-temps
+                for execution_id, fields in pending.items():
+                    self._pending[execution_id] = {**fields, **self._pending.get(execution_id, {})}
+                return
+            self._record(len(operations), 1)
+
+    def _record(self, documents: int, round_trips: int):
+        self.documents_written += documents
+        self.round_trips += round_trips
+        now = time.monotonic()
+        self._round_trip_events.append((now, self.updates))
+        while self._round_trip_events and self._round_trip_events[0][0] < now - self.window_seconds:
+            self._round_trip_events.popleft()
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        # Écritures évitées = transitions demandées - allers-retours effectués vers MongoDB
+        saved = self.updates - len(self._pending) - self.round_trips
+        now = time.monotonic()
+        recent = [event for event in self._round_trip_events if event[0] >= now - self.window_seconds]
+        if len(recent) >= 2:
+            span = max(recent[-1][0] - recent[0][0], 1.0)
+            round_trips = len(recent) - 1
+            saved_per_second = max(0.0, (recent[-1][1] - recent[0][1] - round_trips) / span)
+        else:
+            saved_per_second = 0.0
+        return {
+            "updates": self.updates,
+            "pending": len(self._pending),
+            "documents_written": self.documents_written,
+            "round_trips": self.round_trips,
+            "writes_saved": max(0, saved),
+            "writes_saved_per_second": round(saved_per_second, 3),
+            "errors": self.errors
+        }
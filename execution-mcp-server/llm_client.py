@@ -0,0 +1,309 @@
+"""
+Accès au LLM (API Groq compatible OpenAI) pour les analyses sur input_data.
+
+Le client asynchrone est encadré par :
+
+- un sémaphore qui borne les appels simultanés au fournisseur ;
+- un seau à jetons (débit moyen et rafale) pour rester sous les quotas ;
+- un cache des réponses (LRU avec TTL), indexé par le modèle, le nombre
+  maximal de tokens et les messages normalisés (espaces superflus retirés) ;
+- la fusion des requêtes identiques simultanées : un seul appel est fait et
+  sa réponse est partagée par toutes les requêtes en attente.
+
+Une analyse déjà produite ne coûte ainsi plus ni tokens ni latence. Si la
+requête qui porte l'appel partagé est annulée, les requêtes en attente ne sont
+pas annulées avec elle : la suivante refait l'appel.
+`stream` produit la réponse fragment par fragment et mesure le délai avant le
+premier token et le débit de génération (tokens par seconde).
+
+Vérification contre le serveur factice (llm_stub.py) :
+
+    python llm_client.py http://localhost:8010
+"""
+
+import asyncio
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(text: str) -> str:
+    return WHITESPACE.sub(" ", text or "").strip()
+
+
+def prompt_key(model: str, messages: List[Dict[str, str]], max_tokens: int) -> str:
+    normalized = [{"role": message["role"], "content": normalize_prompt(message["content"])} for message in messages]
+    canonical = json.dumps({"model": model, "max_tokens": max_tokens, "messages": normalized}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LeaderCancelled(Exception):
+    """L'appel partagé a été annulé avec la requête qui le portait"""
+
+
+class TokenBucket:
+    """Limiteur de débit : `rate` requêtes par seconde en moyenne, jusqu'à `capacity` d'affilée"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> float:
+        """Attend un jeton ; retourne le temps d'attente en secondes"""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+
+class LLMClient:
+    def __init__(self, client, max_concurrency: int = 4, requests_per_second: float = 0.0, burst: float = 1.0,
+                 cache_ttl_seconds: float = 3600.0, cache_max_entries: int = 1000, timeout: float = 60.0):
+        # client : groq.AsyncGroq (ou tout client asynchrone compatible OpenAI)
+        self.client = client
+        self.timeout = timeout
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.cache_max_entries = cache_max_entries
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._bucket = TokenBucket(requests_per_second, burst)
+        self._cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.max_concurrency = max_concurrency
+        self.requests = 0
+        self.calls = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.tokens_saved = 0
+        self.waiting = 0
+
+    def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at <= time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return result
+
+    def _cache_put(self, key: str, result: Dict[str, Any]):
+        if self.cache_ttl_seconds <= 0 or self.cache_max_entries <= 0:
+            return
+        self._cache[key] = (time.monotonic() + self.cache_ttl_seconds, result)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_max_entries:
+            self._cache.popitem(last=False)
+
+    async def complete(self, model: str, messages: List[Dict[str, str]], max_tokens: int = 1024) -> Dict[str, Any]:
+        """Réponse du LLM : {text, model, completion_tokens, total_tokens, latency_ms, cached}"""
+        self.requests += 1
+        key = prompt_key(model, messages, max_tokens)
+        coalesced = False
+
+        while True:
+            cached = self._cache_get(key)
+            if cached is not None:
+                self.cache_hits += 1
+                self.tokens_saved += cached.get("total_tokens") or 0
+                return dict(cached, cached=True)
+
+            # Même requête déjà en cours : attendre sa réponse plutôt que refaire l'appel
+            pending = self._inflight.get(key)
+            if pending is None:
+                break
+            if not coalesced:
+                self.coalesced += 1
+                coalesced = True
+            try:
+                result = await asyncio.shield(pending)
+            except LeaderCancelled:
+                # La requête qui portait l'appel a été annulée : le refaire (ou rejoindre le suivant)
+                continue
+            self.tokens_saved += result.get("total_tokens") or 0
+            return dict(result, cached=True)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._call(model, messages, max_tokens)
+        except asyncio.CancelledError:
+            # Ne pas propager l'annulation aux requêtes fusionnées sur celle-ci
+            future.set_exception(LeaderCancelled())
+            future.exception()
+            raise
+        except BaseException as e:
+            self.errors += 1
+            future.set_exception(e)
+            # Évite l'avertissement « exception never retrieved » s'il n'y a pas d'autre attente
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        self._cache_put(key, result)
+        future.set_result(result)
+        return dict(result, cached=False)
+
+    async def _acquire_slot(self):
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+    async def _call(self, model: str, messages: List[Dict[str, str]], max_tokens: int) -> Dict[str, Any]:
+        await self._acquire_slot()
+        try:
+            throttled = await self._bucket.acquire()
+            start = time.perf_counter()
+            completion = await self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                timeout=self.timeout
+            )
+            elapsed = time.perf_counter() - start
+            self.calls += 1
+            return {
+                "text": completion.choices[0].message.content,
+                "model": completion.model,
+                "completion_tokens": completion.usage.completion_tokens,
+                "total_tokens": completion.usage.total_tokens,
+                "latency_ms": round(elapsed * 1000, 1),
+                "throttled_ms": round(throttled * 1000, 1),
+                "tokens_per_second": round(completion.usage.completion_tokens / elapsed, 1) if elapsed > 0 else None
+            }
+        finally:
+            self._semaphore.release()
+
+    async def stream(self, model: str, messages: List[Dict[str, str]], max_tokens: int = 1024) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Fragments {"type": "token", "content"} puis un événement final
+        {"type": "done", ...} portant le texte complet, les tokens, ttft_ms et
+        tokens_per_second. Une réponse en cache est rendue en un seul fragment.
+        Une génération interrompue (client déconnecté) n'est pas mise en cache.
+        """
+        self.requests += 1
+        key = prompt_key(model, messages, max_tokens)
+        cached = self._cache_get(key)
+        if cached is not None:
+            self.cache_hits += 1
+            self.tokens_saved += cached.get("total_tokens") or 0
+            yield {"type": "token", "content": cached["text"]}
+            yield dict(cached, type="done", cached=True, ttft_ms=0.0, throttled_ms=0.0)
+            return
+
+        await self._acquire_slot()
+        try:
+            throttled = await self._bucket.acquire()
+            start = time.perf_counter()
+            first_token_at = None
+            parts: List[str] = []
+            usage = None
+            model_name = model
+            response = await self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                stream=True,
+                timeout=self.timeout
+            )
+            async for chunk in response:
+                model_name = getattr(chunk, "model", None) or model_name
+                # Groq renvoie l'usage dans x_groq sur le dernier fragment, OpenAI dans usage
+                x_groq = getattr(chunk, "x_groq", None)
+                usage = getattr(x_groq, "usage", None) or getattr(chunk, "usage", None) or usage
+                content = chunk.choices[0].delta.content if chunk.choices else None
+                if content:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    parts.append(content)
+                    yield {"type": "token", "content": content}
+            end = time.perf_counter()
+            self.calls += 1
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self._semaphore.release()
+
+        # Sans usage renvoyé par le fournisseur, chaque fragment compte pour un token
+        completion_tokens = usage.completion_tokens if usage is not None else len(parts)
+        generation_seconds = end - first_token_at if first_token_at is not None else 0.0
+        result = {
+            "text": "".join(parts),
+            "model": model_name,
+            "completion_tokens": completion_tokens,
+            "total_tokens": usage.total_tokens if usage is not None else len(parts),
+            "latency_ms": round((end - start) * 1000, 1),
+            "throttled_ms": round(throttled * 1000, 1),
+            "ttft_ms": round((first_token_at - start) * 1000, 1) if first_token_at is not None else None,
+            "tokens_per_second": round(completion_tokens / generation_seconds, 1) if generation_seconds > 0 else None
+        }
+        self._cache_put(key, result)
+        yield dict(result, type="done", cached=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "calls": self.calls,
+            "cache_hits": self.cache_hits,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "tokens_saved": self.tokens_saved,
+            "cache_entries": len(self._cache),
+            "in_flight": len(self._inflight),
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency
+        }
+
+
+if __name__ == "__main__":
+    import sys
+
+    import groq
+
+    async def check(base_url: str):
+        """Fusion, cache, annulation de l'appel partagé et streaming contre llm_stub"""
+        client = LLMClient(groq.AsyncGroq(api_key="stub", base_url=base_url), max_concurrency=2)
+        messages = [{"role": "user", "content": f"check {time.time()}"}]
+
+        results = await asyncio.gather(*[client.complete("stub", messages) for _ in range(5)])
+        assert client.calls == 1 and client.coalesced == 4, client.stats()
+        assert (await client.complete("stub", messages))["cached"], client.stats()
+
+        # La requête qui porte l'appel est annulée : celle qui attendait obtient quand même une réponse
+        other = [{"role": "user", "content": f"cancel {time.time()}"}]
+        leader = asyncio.create_task(client.complete("stub", other))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(client.complete("stub", other))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        assert (await follower)["text"], client.stats()
+
+        events = [event async for event in client.stream("stub", [{"role": "user", "content": f"stream {time.time()}"}])]
+        done = events[-1]
+        assert done["type"] == "done" and done["ttft_ms"] is not None, done
+        print(f"LLM client checks passed: {client.stats()}, ttft_ms={done['ttft_ms']}, text={results[0]['text'][:40]!r}")
+        await client.client.close()
+
+    asyncio.run(check(sys.argv[1] if len(sys.argv) > 1 else "http://localhost:8010"))
@@ -0,0 +1,96 @@
+"""
+Serveur LLM factice, compatible avec l'API chat completions de Groq/OpenAI.
+
+Il permet de tester le chemin LLM de l'Execution MCP Server sans clé ni coût :
+
+    uvicorn llm_stub:app --port 8010
+    GROQ_API_KEY=stub GROQ_BASE_URL=http://localhost:8010 uvicorn main:app --port 8004
+
+La réponse est déterministe (dérivée du dernier message) et LLM_STUB_LATENCY_MS
+simule la latence du fournisseur. Le compteur /stats permet de vérifier que le
+cache et la fusion des requêtes évitent bien les appels.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+from typing import Any, Dict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+LLM_STUB_LATENCY_MS = float(os.getenv("LLM_STUB_LATENCY_MS", "200"))
+# Délai entre deux fragments d'une réponse en streaming
+LLM_STUB_TOKEN_INTERVAL_MS = float(os.getenv("LLM_STUB_TOKEN_INTERVAL_MS", "20"))
+
+app = FastAPI(title="LLM Stub")
+
+calls = {"count": 0}
+
+
+def stub_answer(prompt: str) -> str:
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+    return f"Stub analysis {digest}: the data looks consistent; no anomaly detected in {len(prompt)} characters of input."
+
+
+async def stream_chunks(completion_id: str, model: str, words, usage: Dict[str, int]):
+    """Fragments SSE au format chat.completion.chunk, usage dans x_groq sur le dernier"""
+    for index, word in enumerate(words):
+        if index:
+            await asyncio.sleep(LLM_STUB_TOKEN_INTERVAL_MS / 1000)
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+    final = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        "x_groq": {"id": completion_id, "usage": usage}
+    }
+    yield f"data: {json.dumps(final)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    calls["count"] += 1
+    await asyncio.sleep(LLM_STUB_LATENCY_MS / 1000)
+    messages = body.get("messages") or []
+    prompt = messages[-1]["content"] if messages else ""
+    answer = stub_answer(prompt)
+    prompt_tokens = sum(len((message.get("content") or "").split()) for message in messages)
+    completion_tokens = len(answer.split())
+    usage = {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens
+    }
+    if body.get("stream"):
+        return StreamingResponse(
+            stream_chunks(f"chatcmpl-{uuid.uuid4()}", body.get("model", "stub"), answer.split(), usage),
+            media_type="text/event-stream"
+        )
+    return {
+        "id": f"chatcmpl-{uuid.uuid4()}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+        "usage": usage
+    }
+
+
+@app.get("/stats")
+async def stats() -> Dict[str, Any]:
+    return {"calls": calls["count"]}
@@ -1,22 +1,37 @@
 from fastapi import FastAPI, HTTPException, Depends, Request, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 import httpx
 import uuid
 import json
 from datetime import datetime
 import os
+import re
 import time
 import io
 import base64
 import subprocess
 import asyncio
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import pymongo
 from pymongo import MongoClient
 from bson import ObjectId
 from minio import Minio
 from minio.error import S3Error
+import numpy as np
+import pandas as pd
+
+from storage_gc import ACTIVE_EXECUTION_STATUSES, StorageGarbageCollector
+from artifact_cache import ArtifactCache
+from model_registry import artifact_suffix
+from model_warmup import warm_up_model
+from online_predict import PredictionError, PredictionRecorder, instances_frame, parse_instances, predictions_to_json
+from traffic import ShadowMirror, choose_target, summarize_shadow_metrics, validate_routing
+from result_cache import ResultCache, result_cache_ttl, result_key, validate_result_cache
+from llm_client import LLMClient
+from execution_writes import ExecutionWriteBuffer
+from indexes import EXECUTION_TTL_FIELD, advise, ensure_indexes, now_date
+from autoscaler import LoadTracker, ReplicaController, WorkerPoolSupervisor, desired_replicas, scaling_policy, validate_scaling
 
 # Essayer d'importer groq
 try:
@@ -45,6 +60,9 @@ deployments_collection = db["deployments"]
 executions_collection = db["executions"]
 models_collection = db["models"]
 datasets_collection = db["datasets"]
+dataset_versions_collection = db["dataset_versions"]
+shadow_metrics_collection = db["shadow_metrics"]
+prediction_samples_collection = db["prediction_samples"]
 
 # Configuration MinIO
 MINIO_ENDPOINT = os.getenv("MINIO_ENDPOINT", "minio:9000")
@@ -59,11 +77,34 @@ minio_client = Minio(
     secure=MINIO_SECURE
 )
 
-# Configuration Groq
+# Client HTTP asynchrone (API REST du driver Spark)
+http_client = httpx.AsyncClient(timeout=10.0)
+
+# Configuration Groq (GROQ_BASE_URL permet de viser un serveur compatible, ex. llm_stub.py)
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "")
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama3-70b-8192")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_REQUESTS_PER_SECOND = float(os.getenv("LLM_REQUESTS_PER_SECOND", "0.5"))
+LLM_BURST = float(os.getenv("LLM_BURST", "5"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "1024"))
+
 groq_client = None
+llm_client = None
 if GROQ_AVAILABLE and GROQ_API_KEY:
-    groq_client = groq.Groq(api_key=GROQ_API_KEY)
+    groq_client = groq.AsyncGroq(api_key=GROQ_API_KEY, base_url=GROQ_BASE_URL or None)
+    llm_client = LLMClient(
+        groq_client,
+        max_concurrency=LLM_MAX_CONCURRENCY,
+        requests_per_second=LLM_REQUESTS_PER_SECOND,
+        burst=LLM_BURST,
+        cache_ttl_seconds=LLM_CACHE_TTL_SECONDS,
+        cache_max_entries=LLM_CACHE_MAX_ENTRIES,
+        timeout=LLM_TIMEOUT_SECONDS
+    )
     print("Groq client initialized")
 else:
     print("Groq client not initialized")
@@ -72,34 +113,50 @@ else:
 SPARK_MASTER_URL = os.getenv("SPARK_MASTER_URL", "spark://spark-master:7077")
 SPARK_ENABLED = os.getenv("SPARK_ENABLED", "False").lower() == "true"
 SPARK_APP_PATH = os.getenv("SPARK_APP_PATH", "/opt/spark-apps/model_execution.py")
+# Driver Spark persistant (SPARK_POOL_MASTER=local[*] pour les tests sans cluster)
+SPARK_POOL_ENABLED = os.getenv("SPARK_POOL_ENABLED", "True").lower() == "true"
+SPARK_POOL_MASTER = os.getenv("SPARK_POOL_MASTER", SPARK_MASTER_URL)
+SPARK_POOL_WORKERS = int(os.getenv("SPARK_POOL_WORKERS", "2"))
+SPARK_DATASET_CACHE_SIZE = int(os.getenv("SPARK_DATASET_CACHE_SIZE", "8"))
+SPARK_EXECUTOR_MEMORY = os.getenv("SPARK_EXECUTOR_MEMORY", "1g")
+SPARK_DRIVER_MEMORY = os.getenv("SPARK_DRIVER_MEMORY", "1g")
+# Journal d'événements Spark utilisé pour collecter les métriques des exécutions
+SPARK_EVENT_LOG_DIR = os.getenv("SPARK_EVENT_LOG_DIR", "/tmp/spark-events")
+SPARK_METRICS_ENABLED = os.getenv("SPARK_METRICS_ENABLED", "True").lower() == "true"
 
-print(f"Spark configuration: Enabled={SPARK_ENABLED}, Master URL={SPARK_MASTER_URL}")
+print(f"Spark configuration: Enabled={SPARK_ENABLED}, Master URL={SPARK_MASTER_URL}, Pool={SPARK_POOL_ENABLED}")
 
-# Essayer d'importer PySpark si Spark est activé
+# Vérifier que PySpark est disponible si Spark est activé
+spark_driver = None
 if SPARK_ENABLED:
     try:
-        from pyspark.sql import SparkSession
-        from pyspark.sql.functions import col, when, lit
-        
-        # Initialiser SparkSession
-        def get_spark_session():
-            return SparkSession.builder \
-                .appName("MCP ML Execution") \
-                .master(SPARK_MASTER_URL) \
-                .config("spark.executor.memory", "2g") \
-                .config("spark.driver.memory", "2g") \
-                .config("spark.jars.packages", "org.apache.hadoop:hadoop-aws:3.3.1") \
-                .config("spark.hadoop.fs.s3a.endpoint", f"http://{MINIO_ENDPOINT}") \
-                .config("spark.hadoop.fs.s3a.access.key", MINIO_ACCESS_KEY) \
-                .config("spark.hadoop.fs.s3a.secret.key", MINIO_SECRET_KEY) \
-                .config("spark.hadoop.fs.s3a.path.style.access", "true") \
-                .config("spark.hadoop.fs.s3a.impl", "org.apache.hadoop.fs.s3a.S3AFileSystem") \
-                .getOrCreate()
-        
-        # Tester une session Spark et la fermer immédiatement
-        test_spark = get_spark_session()
-        test_spark.stop()
-        print("Spark session test successful")
+        import pyspark
+        from spark_pool import SparkDriverService, SparkDriverUnavailable
+        from spark_metrics import harvest_from_rest_api, harvest_from_event_log
+        
+        os.makedirs(SPARK_EVENT_LOG_DIR, exist_ok=True)
+
+        if SPARK_POOL_ENABLED:
+            # La session est créée une seule fois au démarrage du serveur et réutilisée
+            # par toutes les exécutions (plus de spark-submit ni de session de test)
+            spark_driver = SparkDriverService(
+                master_url=SPARK_POOL_MASTER,
+                app_path=SPARK_APP_PATH,
+                workers=SPARK_POOL_WORKERS,
+                dataset_cache_size=SPARK_DATASET_CACHE_SIZE,
+                config={
+                    "spark.executor.memory": SPARK_EXECUTOR_MEMORY,
+                    "spark.driver.memory": SPARK_DRIVER_MEMORY,
+                    "spark.eventLog.enabled": "true",
+                    "spark.eventLog.dir": f"file://{SPARK_EVENT_LOG_DIR}",
+                    "spark.jars.packages": "org.apache.hadoop:hadoop-aws:3.3.1",
+                    "spark.hadoop.fs.s3a.endpoint": f"http://{MINIO_ENDPOINT}",
+                    "spark.hadoop.fs.s3a.access.key": MINIO_ACCESS_KEY,
+                    "spark.hadoop.fs.s3a.secret.key": MINIO_SECRET_KEY,
+                    "spark.hadoop.fs.s3a.path.style.access": "true",
+                    "spark.hadoop.fs.s3a.impl": "org.apache.hadoop.fs.s3a.S3AFileSystem"
+                }
+            )
     except Exception as e:
         print(f"Error initializing Spark: {str(e)}")
         SPARK_ENABLED = False
@@ -139,6 +196,83 @@ for bucket in [RESULTS_BUCKET, MODELS_BUCKET, DATASETS_BUCKET]:
     else:
         print(f"Bucket '{bucket}' existe déjà")
 
+# Cache disque local des artefacts, partagé par les processus de l'hôte
+ARTIFACT_CACHE_DIR = os.getenv("ARTIFACT_CACHE_DIR", "/var/cache/mcp-artifacts")
+ARTIFACT_CACHE_MAX_BYTES = int(os.getenv("ARTIFACT_CACHE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+ARTIFACT_CACHE_ETAG_TTL = float(os.getenv("ARTIFACT_CACHE_ETAG_TTL", "60"))
+
+artifact_cache = ArtifactCache(ARTIFACT_CACHE_DIR, ARTIFACT_CACHE_MAX_BYTES, ARTIFACT_CACHE_ETAG_TTL)
+
+# Préchauffage des modèles des déploiements actifs (taille du lot synthétique)
+WARMUP_BATCH_ROWS = int(os.getenv("WARMUP_BATCH_ROWS", "32"))
+# Modèles chargés par déploiement : {"model_id", "content_digest", "model", "warmed_at"}
+warm_models: Dict[str, Dict[str, Any]] = {}
+# Préchauffages en cours (références conservées jusqu'à la fin des tâches)
+warmup_tasks = set()
+warming_deployment_ids = set()
+# Champs gérés par le serveur (préparation, autoscaling), ignorés par update_deployment
+DEPLOYMENT_SERVER_FIELDS = {
+    "readiness", "warmup_id", "warmup_started_at", "warmup_duration_ms", "warmup_timings",
+    "warmed_at", "warmed_model_digest", "warmup_error", "autoscaling"
+}
+
+# Prédiction synchrone : échantillonnage des enregistrements et revalidation des déploiements
+PREDICT_SAMPLE_RATE = float(os.getenv("PREDICT_SAMPLE_RATE", "0.01"))
+PREDICT_INLINE_MAX_ROWS = int(os.getenv("PREDICT_INLINE_MAX_ROWS", "256"))
+DEPLOYMENT_CACHE_TTL = float(os.getenv("DEPLOYMENT_CACHE_TTL", "5"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "10000"))
+
+# Index MongoDB garantis au démarrage ; les exécutions terminées expirent après EXECUTION_TTL_DAYS (0 désactive)
+EXECUTION_TTL_DAYS = float(os.getenv("EXECUTION_TTL_DAYS", "90"))
+INDEX_ADVISOR_ON_STARTUP = os.getenv("INDEX_ADVISOR_ON_STARTUP", "False").lower() == "true"
+
+# Transitions d'état des exécutions fusionnées et écrites par lots (bulk_write)
+EXECUTION_WRITE_FLUSH_SECONDS = float(os.getenv("EXECUTION_WRITE_FLUSH_SECONDS", "0.5"))
+EXECUTION_WRITE_MAX_PENDING = int(os.getenv("EXECUTION_WRITE_MAX_PENDING", "1000"))
+
+execution_writes = ExecutionWriteBuffer(executions_collection, EXECUTION_WRITE_FLUSH_SECONDS, EXECUTION_WRITE_MAX_PENDING)
+
+prediction_recorder = PredictionRecorder(prediction_samples_collection, PREDICT_SAMPLE_RATE)
+
+# Cache des résultats sur input_data, activé par déploiement (champ result_cache)
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "300"))
+
+result_cache = ResultCache(RESULT_CACHE_MAX_BYTES)
+
+# Trafic miroir : file bornée et tâches de fond
+SHADOW_QUEUE_SIZE = int(os.getenv("SHADOW_QUEUE_SIZE", "1000"))
+SHADOW_WORKERS = int(os.getenv("SHADOW_WORKERS", "2"))
+SHADOW_METRICS_FLUSH_SECONDS = float(os.getenv("SHADOW_METRICS_FLUSH_SECONDS", "10"))
+
+# Autoscaling des processus de prédiction (0 désactive la boucle)
+AUTOSCALE_INTERVAL_SECONDS = float(os.getenv("AUTOSCALE_INTERVAL_SECONDS", "5"))
+AUTOSCALE_WINDOW_SECONDS = float(os.getenv("AUTOSCALE_WINDOW_SECONDS", "60"))
+PREDICT_WORKER_TIMEOUT = float(os.getenv("PREDICT_WORKER_TIMEOUT", "30"))
+
+load_tracker = LoadTracker(AUTOSCALE_WINDOW_SECONDS)
+replica_controller = ReplicaController()
+worker_supervisor = WorkerPoolSupervisor()
+autoscale_loop_task = None
+
+# Ramasse-miettes du stockage (0 désactive le passage périodique)
+GC_INTERVAL_SECONDS = int(os.getenv("GC_INTERVAL_SECONDS", "3600"))
+GC_GRACE_SECONDS = int(os.getenv("GC_GRACE_SECONDS", "3600"))
+GC_BATCH_SIZE = int(os.getenv("GC_BATCH_SIZE", "1000"))
+RESULTS_RETENTION_DAYS = int(os.getenv("RESULTS_RETENTION_DAYS", "30"))
+
+storage_gc = StorageGarbageCollector(
+    minio_client,
+    db,
+    {"datasets": DATASETS_BUCKET, "models": MODELS_BUCKET, "results": RESULTS_BUCKET},
+    retention_days=RESULTS_RETENTION_DAYS,
+    grace_seconds=GC_GRACE_SECONDS,
+    batch_size=GC_BATCH_SIZE
+)
+# Un seul passage à la fois (périodique ou demandé)
+gc_lock = asyncio.Lock()
+gc_loop_task = None
+
 # Middleware pour logger les requêtes
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
@@ -190,17 +324,579 @@ def create_mcp_error_response(request_message: Dict[str, Any], error_message: st
         "error"
     )
 
+# Démarrage et arrêt du driver Spark persistant
+@app.on_event("startup")
+async def start_spark_driver():
+    if spark_driver is not None:
+        spark_driver.start()
+
+@app.on_event("shutdown")
+async def stop_spark_driver():
+    if spark_driver is not None:
+        spark_driver.stop()
+
+# Ramasse-miettes périodique
+async def run_garbage_collection_pass(dry_run: bool = False, run_id: Optional[str] = None) -> Dict[str, Any]:
+    async with gc_lock:
+        report = await asyncio.to_thread(storage_gc.run, dry_run, run_id)
+    print(f"Garbage collection {report['id']} {report['status']}: "
+          f"{report.get('deleted_objects', 0)} objects, {report.get('reclaimed_bytes', 0)} bytes reclaimed")
+    return report
+
+async def garbage_collection_loop():
+    while True:
+        await asyncio.sleep(GC_INTERVAL_SECONDS)
+        try:
+            await run_garbage_collection_pass()
+        except Exception as e:
+            print(f"Error during periodic garbage collection: {str(e)}")
+
+@app.on_event("startup")
+async def start_garbage_collector():
+    global gc_loop_task
+    if GC_INTERVAL_SECONDS > 0:
+        gc_loop_task = asyncio.create_task(garbage_collection_loop())
+
+@app.on_event("shutdown")
+async def stop_garbage_collector():
+    if gc_loop_task is not None:
+        gc_loop_task.cancel()
+
+# Préchauffage des déploiements
+def begin_deployment_warmup(deployment_id: str, model_id: str) -> Dict[str, Any]:
+    """Marque le déploiement comme en préchauffage et lance le préchauffage en arrière-plan"""
+    warmup_id = str(uuid.uuid4())
+    fields = {
+        "readiness": "warming",
+        "warmup_id": warmup_id,
+        "warmup_started_at": datetime.now().isoformat()
+    }
+    deployments_collection.update_one({"id": deployment_id}, {"$set": fields, "$unset": {"warmup_error": ""}})
+    warming_deployment_ids.add(deployment_id)
+    task = asyncio.create_task(warm_up_deployment(deployment_id, model_id, warmup_id))
+    warmup_tasks.add(task)
+    task.add_done_callback(warmup_tasks.discard)
+    return fields
+
+async def warm_up_deployment(deployment_id: str, model_id: str, warmup_id: str):
+    """
+    Récupère, charge et exerce le modèle du déploiement. Le résultat n'est
+    enregistré que si aucun préchauffage plus récent n'a été lancé entre-temps.
+    """
+    current = {"id": deployment_id, "warmup_id": warmup_id}
+    try:
+        model_doc = models_collection.find_one({"id": model_id})
+        if not model_doc:
+            raise ValueError(f"Model with ID {model_id} not found")
+        if not model_doc.get("has_file") or not model_doc.get("file_path"):
+            raise ValueError(f"Model with ID {model_id} has no associated file")
+        
+        start = time.perf_counter()
+        model, timings, artifact = await asyncio.to_thread(
+            warm_up_model, artifact_cache, minio_client, MODELS_BUCKET, model_doc, WARMUP_BATCH_ROWS
+        )
+        duration_ms = round((time.perf_counter() - start) * 1000, 1)
+        warmed_at = datetime.now().isoformat()
+        
+        result = deployments_collection.update_one(current, {"$set": {
+            "readiness": "ready",
+            "warmup_duration_ms": duration_ms,
+            "warmup_timings": timings,
+            "warmed_at": warmed_at,
+            "warmed_model_digest": model_doc.get("content_digest")
+        }})
+        if result.matched_count == 0:
+            print(f"Warm-up {warmup_id} of deployment {deployment_id} superseded, discarding model")
+            return
+        warm_models[deployment_id] = {
+            "deployment_id": deployment_id,
+            "model_id": model_id,
+            "content_digest": model_doc.get("content_digest"),
+            "model": model,
+            # Ce qu'il faut aux processus du pool pour recharger le même artefact depuis le cache borné
+            "model_spec": {
+                "format": model.format,
+                "input_schema": model_doc.get("input_schema"),
+                "artifact": artifact,
+                "cache_dir": ARTIFACT_CACHE_DIR,
+                "max_bytes": ARTIFACT_CACHE_MAX_BYTES,
+                "minio": {"endpoint": MINIO_ENDPOINT, "access_key": MINIO_ACCESS_KEY, "secret_key": MINIO_SECRET_KEY, "secure": MINIO_SECURE}
+            },
+            "warmed_at": warmed_at,
+            # Relu à la première prédiction pour charger la configuration du trafic
+            "checked_at": 0.0
+        }
+        print(f"Deployment {deployment_id} ready: model {model_id} warmed in {duration_ms} ms {timings}")
+    except Exception as e:
+        print(f"Error warming up deployment {deployment_id}: {str(e)}")
+        deployments_collection.update_one(current, {"$set": {"readiness": "failed", "warmup_error": str(e)}})
+    finally:
+        warming_deployment_ids.discard(deployment_id)
+
+def release_deployment_model(deployment_id: str) -> Dict[str, Any]:
+    """Libère le modèle chargé d'un déploiement désactivé"""
+    warm_models.pop(deployment_id, None)
+    worker_supervisor.remove(deployment_id)
+    replica_controller.forget(deployment_id)
+    fields = {"readiness": "cold"}
+    deployments_collection.update_one({"id": deployment_id}, {"$set": fields, "$unset": {"warmup_id": ""}})
+    return fields
+
+@app.on_event("startup")
+async def start_prediction_recorder():
+    prediction_recorder.start()
+
+@app.on_event("shutdown")
+async def stop_prediction_recorder():
+    await prediction_recorder.stop()
+
+# Prédiction synchrone contre le modèle préchauffé
+def resolve_warm_deployment(deployment_id: str) -> Dict[str, Any]:
+    """
+    Modèle préchauffé du déploiement. Le document n'est relu qu'après
+    DEPLOYMENT_CACHE_TTL secondes, pour suivre les désactivations faites par
+    une autre instance sans interroger MongoDB à chaque prédiction.
+    """
+    entry = warm_models.get(deployment_id)
+    now = time.monotonic()
+    if entry is not None and now - entry["checked_at"] < DEPLOYMENT_CACHE_TTL:
+        return entry
+    
+    deployment = deployments_collection.find_one(
+        {"id": deployment_id},
+        {"status": 1, "model_id": 1, "traffic_split": 1, "shadow_deployments": 1}
+    )
+    if not deployment:
+        warm_models.pop(deployment_id, None)
+        raise PredictionError(f"Deployment with ID {deployment_id} not found", 404)
+    if deployment.get("status") != "active":
+        warm_models.pop(deployment_id, None)
+        raise PredictionError(f"Deployment {deployment_id} is not active", 409)
+    if entry is not None and entry["model_id"] == deployment.get("model_id"):
+        entry["checked_at"] = now
+        entry["traffic_split"] = deployment.get("traffic_split")
+        entry["shadow_deployments"] = deployment.get("shadow_deployments") or []
+        return entry
+    
+    # Modèle absent de ce processus (redémarrage, autre instance) ou remplacé : préchauffer
+    warm_models.pop(deployment_id, None)
+    if deployment_id not in warming_deployment_ids:
+        begin_deployment_warmup(deployment_id, deployment.get("model_id"))
+    raise PredictionError(f"Deployment {deployment_id} is warming up, retry shortly", 503)
+
+def score_instances(entry: Dict[str, Any], instances: List[Dict[str, Any]], requested_columns: Optional[List[str]]):
+    model = entry["model"]
+    feature_columns = requested_columns or model.feature_columns or None
+    frame = instances_frame(instances, feature_columns)
+    try:
+        return model.predict(frame, feature_columns)
+    except (ValueError, TypeError, KeyError) as e:
+        raise PredictionError(f"Prediction failed: {str(e)}", 400)
+
+async def score_on_replicas(entry: Dict[str, Any], instances: List[Dict[str, Any]],
+                            feature_columns: Optional[List[str]]):
+    """
+    Score sur le pool de processus du déploiement s'il en a, sinon dans ce
+    processus. Les requêtes en cours et les latences alimentent l'autoscaling.
+    """
+    deployment_id = entry["deployment_id"]
+    latency_ms = None
+    start = time.perf_counter()
+    load_tracker.begin(deployment_id)
+    try:
+        pool = worker_supervisor.pool(deployment_id)
+        if pool is not None:
+            try:
+                predictions = np.asarray(await pool.predict(instances, feature_columns, PREDICT_WORKER_TIMEOUT))
+            except asyncio.TimeoutError:
+                raise PredictionError(f"Prediction timed out after {PREDICT_WORKER_TIMEOUT} seconds", 504)
+            except ValueError as e:
+                raise PredictionError(f"Prediction failed: {str(e)}", 400)
+        # Les petits lots sont scorés sur la boucle : le passage par un thread coûterait plus que le calcul
+        elif len(instances) <= PREDICT_INLINE_MAX_ROWS:
+            predictions = score_instances(entry, instances, feature_columns)
+        else:
+            predictions = await asyncio.to_thread(score_instances, entry, instances, feature_columns)
+        latency_ms = (time.perf_counter() - start) * 1000
+        return predictions
+    finally:
+        load_tracker.end(deployment_id, latency_ms)
+
+async def run_prediction(deployment_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    start = time.perf_counter()
+    entry = resolve_warm_deployment(deployment_id)
+    instances = parse_instances(payload)
+    
+    # Répartition canary : la requête peut être servie par un déploiement cible
+    serving = entry
+    target_id = choose_target(deployment_id, entry.get("traffic_split"))
+    if target_id != deployment_id:
+        try:
+            serving = resolve_warm_deployment(target_id)
+        except PredictionError as e:
+            print(f"Canary deployment {target_id} unavailable, serving {deployment_id}: {str(e)}")
+    
+    predictions = await score_on_replicas(serving, instances, payload.get("feature_columns"))
+    
+    result = {
+        "deployment_id": deployment_id,
+        "served_by": serving["deployment_id"],
+        "model_id": serving["model_id"],
+        "predictions": predictions_to_json(predictions),
+        "latency_ms": round((time.perf_counter() - start) * 1000, 3)
+    }
+    prediction_recorder.record(serving, instances, result["predictions"], result["latency_ms"])
+    
+    # Copie miroir en arrière-plan, après le calcul de la réponse principale
+    if entry.get("shadow_deployments"):
+        shadow_mirror.submit(
+            deployment_id,
+            entry["shadow_deployments"],
+            {"instances": instances, "feature_columns": payload.get("feature_columns")},
+            result["predictions"],
+            result["latency_ms"]
+        )
+    return result
+
+async def shadow_predict(shadow_id: str, payload: Dict[str, Any]):
+    """Appel miroir : scoré dans un thread pour ne pas occuper la boucle des requêtes principales"""
+    start = time.perf_counter()
+    entry = resolve_warm_deployment(shadow_id)
+    predictions = await asyncio.to_thread(score_instances, entry, payload["instances"], payload.get("feature_columns"))
+    return predictions_to_json(predictions), round((time.perf_counter() - start) * 1000, 3)
+
+shadow_mirror = ShadowMirror(
+    shadow_predict,
+    shadow_metrics_collection,
+    queue_size=SHADOW_QUEUE_SIZE,
+    workers=SHADOW_WORKERS,
+    flush_interval=SHADOW_METRICS_FLUSH_SECONDS
+)
+
+@app.on_event("startup")
+async def start_shadow_mirror():
+    shadow_mirror.start()
+
+@app.on_event("shutdown")
+async def stop_shadow_mirror():
+    await shadow_mirror.stop()
+
+@app.post("/deployments/{deployment_id}/predict")
+async def predict_route(deployment_id: str, request: Request):
+    """Route directe (sans enveloppe MCP) utilisée par l'API Gateway"""
+    try:
+        payload = await request.json()
+        if not isinstance(payload, dict):
+            raise PredictionError("Request body must be a JSON object")
+        return await run_prediction(deployment_id, payload)
+    except PredictionError as e:
+        return JSONResponse(status_code=e.status_code, content={"detail": str(e)})
+    except json.JSONDecodeError:
+        return JSONResponse(status_code=400, content={"detail": "Request body must be valid JSON"})
+    except Exception as e:
+        print(f"Error predicting with deployment {deployment_id}: {str(e)}")
+        return JSONResponse(status_code=500, content={"detail": f"Error predicting: {str(e)}"})
+
+# Exécutions en streaming : l'analyse Groq est relayée au fil de la génération (SSE)
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, cls=MongoJSONEncoder)}\n\n"
+
+# Exécutions en streaming annulées via cancel_execution (leur statut est déjà écrit)
+cancelled_streams: set = set()
+
+@app.on_event("startup")
+async def fail_interrupted_streams():
+    """Un flux ne survit pas au processus : les exécutions restées en streaming ont été interrompues"""
+    interrupted_at = datetime.now().isoformat()
+    result = await asyncio.to_thread(executions_collection.update_many, {"status": "streaming"}, {"$set": {
+        "status": "failed",
+        "error": "Execution server restarted during streaming",
+        "updated_at": interrupted_at
+    }})
+    if result.modified_count:
+        print(f"Marked {result.modified_count} interrupted streaming execution(s) as failed")
+
+async def stream_execution_events(execution_data: Dict[str, Any], input_data: Any):
+    execution_id = execution_data["id"]
+    yield sse_event("execution", {
+        "execution_id": execution_id,
+        "deployment_id": execution_data["deployment_id"],
+        "model_id": execution_data["model_id"]
+    })
+    try:
+        completion = None
+        events = llm_client.stream(GROQ_MODEL, analysis_messages(input_data), max_tokens=LLM_MAX_TOKENS)
+        async for event in events:
+            if execution_id in cancelled_streams:
+                # Libère tout de suite la place de concurrence de l'appel Groq
+                await events.aclose()
+                break
+            if event["type"] == "token":
+                yield sse_event("token", {"content": event["content"]})
+            else:
+                completion = event
+        if execution_id in cancelled_streams:
+            cancelled_streams.discard(execution_id)
+            print(f"Streamed execution {execution_id} cancelled")
+            yield sse_event("cancelled", {"execution_id": execution_id})
+            return
+        
+        metrics = {
+            "processing_time_ms": int(time.time() * 1000) - int(datetime.fromisoformat(execution_data["started_at"]).timestamp() * 1000),
+            "ttft_ms": completion["ttft_ms"],
+            "tokens_per_second": completion["tokens_per_second"],
+            "tokens_generated": completion["completion_tokens"],
+            "total_tokens": completion["total_tokens"],
+            "llm_cached": completion["cached"]
+        }
+        execution_result = {
+            "execution_id": execution_id,
+            "predictions": [{"analysis": completion["text"]}],
+            "metrics": metrics,
+            "timestamp": datetime.now().isoformat()
+        }
+        result_path = await asyncio.to_thread(store_execution_result, execution_id, execution_result)
+        completed_at = datetime.now().isoformat()
+        await execution_writes.complete(execution_id, {
+            "status": "completed",
+            "result_path": result_path,
+            "groq_response": {
+                "model": completion["model"],
+                "status": "success",
+                "cached": completion["cached"],
+                "tokens_generated": completion["completion_tokens"],
+                "total_tokens": completion["total_tokens"],
+                "ttft_ms": completion["ttft_ms"],
+                "tokens_per_second": completion["tokens_per_second"]
+            },
+            "completed_at": completed_at,
+            "updated_at": completed_at
+        })
+        print(f"Streamed execution {execution_id} completed: ttft={completion['ttft_ms']} ms, {completion['tokens_per_second']} tokens/s")
+        yield sse_event("done", {"execution_id": execution_id, "result_path": result_path, "metrics": metrics})
+    
+    except (asyncio.CancelledError, GeneratorExit):
+        # Client déconnecté : la génération est abandonnée
+        cancelled_streams.discard(execution_id)
+        await execution_writes.complete(execution_id, {
+            "status": "cancelled",
+            "error": "Client disconnected during streaming",
+            "updated_at": datetime.now().isoformat()
+        })
+        raise
+    
+    except Exception as e:
+        print(f"Error streaming execution {execution_id}: {str(e)}")
+        cancelled_streams.discard(execution_id)
+        await execution_writes.complete(execution_id, {
+            "status": "failed",
+            "error": str(e),
+            "updated_at": datetime.now().isoformat()
+        })
+        yield sse_event("error", {"execution_id": execution_id, "detail": str(e)})
+
+@app.post("/executions/stream")
+async def stream_execution_route(request: Request):
+    """Route directe (sans enveloppe MCP) : crée l'exécution puis diffuse les tokens au fil de l'eau"""
+    try:
+        execution_data = await request.json()
+        if not isinstance(execution_data, dict):
+            return JSONResponse(status_code=400, content={"detail": "Request body must be a JSON object"})
+        
+        input_data = (execution_data.get("parameters") or {}).get("input_data")
+        if not input_data:
+            return JSONResponse(status_code=400, content={"detail": "Streaming executions require parameters.input_data"})
+        if llm_client is None:
+            return JSONResponse(status_code=503, content={"detail": "LLM streaming is not configured (GROQ_API_KEY)"})
+        
+        deployment_id = execution_data.get("deployment_id")
+        if not deployment_id:
+            return JSONResponse(status_code=400, content={"detail": "Deployment ID is required for execution"})
+        deployment = deployments_collection.find_one({"id": deployment_id})
+        if not deployment:
+            return JSONResponse(status_code=404, content={"detail": f"Deployment with ID {deployment_id} not found"})
+        if deployment.get("status") != "active":
+            return JSONResponse(status_code=400, content={"detail": f"Deployment with ID {deployment_id} is not active"})
+        model = models_collection.find_one({"id": deployment.get("model_id")})
+        if not model:
+            return JSONResponse(status_code=404, content={"detail": f"Model with ID {deployment.get('model_id')} not found"})
+        
+        execution_data["id"] = execution_data.get("id") or str(uuid.uuid4())
+        execution_data["model_id"] = model["id"]
+        execution_data["model_name"] = model.get("name", "Unknown Model")
+        execution_data["deployment_name"] = deployment.get("name", "Unknown Deployment")
+        execution_data["status"] = "streaming"
+        execution_data["stream"] = True
+        execution_data["started_at"] = datetime.now().isoformat()
+        execution_data["updated_at"] = execution_data["started_at"]
+        execution_data[EXECUTION_TTL_FIELD] = now_date()
+        executions_collection.insert_one(execution_data)
+        print(f"Streaming execution with ID: {execution_data['id']} for deployment: {deployment_id}")
+        
+        return StreamingResponse(
+            stream_execution_events(execution_data, input_data),
+            media_type="text/event-stream",
+            # X-Accel-Buffering : Nginx transmet chaque événement sans le mettre en tampon
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    except json.JSONDecodeError:
+        return JSONResponse(status_code=400, content={"detail": "Request body must be valid JSON"})
+    except pymongo.errors.DuplicateKeyError:
+        return JSONResponse(status_code=409, content={"detail": f"Execution with ID {execution_data.get('id')} already exists"})
+    except Exception as e:
+        print(f"Error starting streamed execution: {str(e)}")
+        return JSONResponse(status_code=500, content={"detail": f"Error starting streamed execution: {str(e)}"})
+
+# Autoscaling des processus de prédiction
+async def autoscale_pass():
+    """Calcule le nombre de processus voulu par déploiement et l'applique au pool"""
+    for deployment_id in set(load_tracker.deployments()) | set(warm_models):
+        entry = warm_models.get(deployment_id)
+        deployment = deployments_collection.find_one({"id": deployment_id}, {"status": 1, "scaling": 1})
+        if entry is None or not deployment or deployment.get("status") != "active":
+            worker_supervisor.scale(deployment_id, 0, None)
+            replica_controller.forget(deployment_id)
+            continue
+        
+        policy = scaling_policy(deployment)
+        signals = load_tracker.signals(deployment_id)
+        current = worker_supervisor.replicas(deployment_id)
+        desired = desired_replicas(signals, policy, current)
+        replicas = replica_controller.decide(deployment_id, desired, current, policy["scale_down_window_seconds"])
+        worker_supervisor.scale(deployment_id, replicas, entry["model_spec"])
+        if replicas != current:
+            print(f"Deployment {deployment_id} scaled from {current} to {replicas} worker processes "
+                  f"(rate={signals['request_rate']:.2f}/s, in_flight={signals['in_flight']}, p95={signals['latency_ms']['p95']:.1f} ms)")
+        
+        deployments_collection.update_one({"id": deployment_id}, {"$set": {"autoscaling": {
+            "replicas": replicas,
+            "desired_replicas": desired,
+            "request_rate": round(signals["request_rate"], 3),
+            "in_flight": signals["in_flight"],
+            "latency_ms": {name: round(value, 3) for name, value in signals["latency_ms"].items()},
+            "updated_at": datetime.now().isoformat()
+        }}})
+
+async def autoscale_loop():
+    while True:
+        await asyncio.sleep(AUTOSCALE_INTERVAL_SECONDS)
+        try:
+            await autoscale_pass()
+        except Exception as e:
+            print(f"Error during autoscaling pass: {str(e)}")
+
+@app.on_event("startup")
+async def start_autoscaler():
+    global autoscale_loop_task
+    if AUTOSCALE_INTERVAL_SECONDS > 0:
+        autoscale_loop_task = asyncio.create_task(autoscale_loop())
+
+@app.on_event("shutdown")
+async def stop_autoscaler():
+    if autoscale_loop_task is not None:
+        autoscale_loop_task.cancel()
+    worker_supervisor.shutdown()
+
+@app.on_event("startup")
+async def ensure_mongo_indexes():
+    try:
+        ensured = await asyncio.to_thread(ensure_indexes, db, EXECUTION_TTL_DAYS)
+        print(f"MongoDB indexes ensured: {ensured}")
+        if INDEX_ADVISOR_ON_STARTUP:
+            report = await asyncio.to_thread(advise, db)
+            for name in report["flagged"]:
+                print(f"Index advisor: query '{name}' scans the collection or sorts in memory")
+            for finding in report["redundant_indexes"]:
+                print(f"Index advisor: index {finding['index']} on {finding['collection']} is covered by {finding['covered_by']}")
+    except Exception as e:
+        print(f"Error ensuring MongoDB indexes: {str(e)}")
+
+@app.on_event("startup")
+async def start_execution_writes():
+    execution_writes.start()
+
+@app.on_event("shutdown")
+async def stop_execution_writes():
+    await execution_writes.stop()
+
+@app.on_event("shutdown")
+async def close_llm_client():
+    if groq_client is not None:
+        await groq_client.close()
+
+@app.on_event("startup")
+async def warm_active_deployments():
+    # Les modèles chargés ne survivent pas à un redémarrage : préchauffer à nouveau les déploiements actifs
+    try:
+        for deployment in deployments_collection.find({"status": "active"}, {"id": 1, "model_id": 1}):
+            if deployment.get("model_id"):
+                begin_deployment_warmup(deployment["id"], deployment["model_id"])
+    except Exception as e:
+        print(f"Error warming up active deployments: {str(e)}")
+
+# Fonction pour collecter les métriques Spark d'une exécution
+async def harvest_spark_metrics(execution_id: str, app_id: Optional[str], ui_url: Optional[str] = None):
+    """Stocke sur l'exécution un résumé des métriques Spark (API REST, sinon journal d'événements)"""
+    if not SPARK_METRICS_ENABLED or not app_id:
+        return None
+    try:
+        summary = None
+        if ui_url:
+            try:
+                summary = await harvest_from_rest_api(http_client, ui_url, app_id, execution_id)
+            except httpx.HTTPError as e:
+                print(f"Spark REST API unavailable for {app_id}: {str(e)}")
+        if summary is None:
+            summary = await asyncio.to_thread(harvest_from_event_log, SPARK_EVENT_LOG_DIR, app_id, execution_id)
+        if summary is None:
+            print(f"No Spark metrics found for execution {execution_id}")
+            return None
+        summary["app_id"] = app_id
+        executions_collection.update_one(
+            {"id": execution_id},
+            {"$set": {"spark_metrics": summary}}
+        )
+        return summary
+    except Exception as e:
+        print(f"Error harvesting Spark metrics for execution {execution_id}: {str(e)}")
+        return None
+
 # Fonction pour exécuter un job Spark
 async def run_spark_job(execution_id: str):
     """Exécute un job Spark pour l'exécution spécifiée"""
+    # Utiliser le driver persistant s'il est disponible
+    if spark_driver is not None and spark_driver.status in ("starting", "ready"):
+        try:
+            print(f"Submitting execution {execution_id} to the Spark driver service")
+            result = await spark_driver.run(execution_id)
+            spark_context = spark_driver.spark.sparkContext
+            await harvest_spark_metrics(execution_id, spark_context.applicationId, spark_context.uiWebUrl)
+            return result
+        except SparkDriverUnavailable as e:
+            print(f"Spark driver service unavailable, falling back to spark-submit: {str(e)}")
+        except Exception as e:
+            print(f"Error running Spark job on driver service: {str(e)}")
+            executions_collection.update_one(
+                {"id": execution_id},
+                {"$set": {
+                    "status": "failed",
+                    "error": f"Error running Spark job: {str(e)}",
+                    "updated_at": datetime.now().isoformat()
+                }}
+            )
+            return False
+
+    # Sinon (driver absent ou en échec), repli sur spark-submit
     try:
         # Construction de la commande spark-submit
         command = [
             "spark-submit",
             "--master", SPARK_MASTER_URL,
             "--deploy-mode", "client",
-            "--conf", "spark.driver.memory=1g",
-            "--conf", "spark.executor.memory=1g",
+            "--conf", f"spark.driver.memory={SPARK_DRIVER_MEMORY}",
+            "--conf", f"spark.executor.memory={SPARK_EXECUTOR_MEMORY}",
+            "--conf", "spark.eventLog.enabled=true",
+            "--conf", f"spark.eventLog.dir=file://{SPARK_EVENT_LOG_DIR}",
             SPARK_APP_PATH,
             execution_id
         ]
@@ -217,6 +913,11 @@ async def run_spark_job(execution_id: str):
         stdout, stderr = process.communicate()
         return_code = process.returncode
         
+        # Identifiant de l'application Spark, pour retrouver son journal d'événements
+        app_id_match = re.search(r"\b(app-\d{14}-\d{4}|local-\d+)\b", stderr.decode('utf-8', 'replace'))
+        app_id = app_id_match.group(1) if app_id_match else None
+        await harvest_spark_metrics(execution_id, app_id)
+        
         if return_code == 0:
             print(f"Spark job completed successfully for execution {execution_id}")
             print(f"Output: {stdout.decode('utf-8')}")
@@ -275,10 +976,26 @@ async def process_mcp_message(message: Dict[str, Any]):
             response = await get_execution(message)
         elif operation == "create_execution":
             response = await create_execution(message)
+        elif operation == "create_executions_batch":
+            response = await create_executions_batch(message)
         elif operation == "cancel_execution":
             response = await cancel_execution(message)
         elif operation == "get_execution_results":
             response = await get_execution_results(message)
+        elif operation == "predict":
+            response = await predict(message)
+        elif operation == "get_deployment_scaling":
+            response = await get_deployment_scaling(message)
+        elif operation == "get_result_cache_stats":
+            response = await get_result_cache_stats(message)
+        elif operation == "get_shadow_metrics":
+            response = await get_shadow_metrics(message)
+        elif operation == "analyze_indexes":
+            response = await analyze_indexes(message)
+        elif operation == "run_garbage_collection":
+            response = await run_garbage_collection(message)
+        elif operation == "get_gc_status":
+            response = await get_gc_status(message)
         else:
             response = create_mcp_error_response(message, f"Unsupported operation: {operation}", 400)
         
@@ -289,6 +1006,145 @@ async def process_mcp_message(message: Dict[str, Any]):
         print(f"Error processing message: {str(e)}")
         return create_mcp_error_response(message, f"Internal server error: {str(e)}", 500)
 
+# Opérations sur le stockage
+gc_tasks = set()
+
+async def predict(message: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        payload = message.get("payload", {})
+        deployment_id = payload.get("deployment_id")
+        if not deployment_id:
+            return create_mcp_error_response(message, "Deployment ID is required", 400)
+        
+        result = await run_prediction(deployment_id, payload)
+        return create_mcp_response(message, result)
+    
+    except PredictionError as e:
+        return create_mcp_error_response(message, str(e), e.status_code)
+    
+    except Exception as e:
+        print(f"Error predicting: {str(e)}")
+        return create_mcp_error_response(message, f"Error predicting: {str(e)}", 500)
+
+async def get_deployment_scaling(message: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        deployment_id = message.get("payload", {}).get("deployment_id")
+        if not deployment_id:
+            return create_mcp_error_response(message, "Deployment ID is required", 400)
+        
+        deployment = deployments_collection.find_one({"id": deployment_id}, {"scaling": 1, "autoscaling": 1})
+        if not deployment:
+            return create_mcp_error_response(message, f"Deployment with ID {deployment_id} not found", 404)
+        
+        # Signaux en direct de ce processus, en plus du dernier état enregistré
+        return create_mcp_response(message, {
+            "deployment_id": deployment_id,
+            "policy": scaling_policy(deployment),
+            "autoscaling": deployment.get("autoscaling"),
+            "signals": load_tracker.signals(deployment_id),
+            "workers": worker_supervisor.stats().get(deployment_id, {"replicas": 0, "ready": 0, "last_error": None, "failures": 0, "broken": False})
+        })
+    
+    except Exception as e:
+        print(f"Error getting deployment scaling: {str(e)}")
+        return create_mcp_error_response(message, f"Error getting deployment scaling: {str(e)}", 500)
+
+async def get_result_cache_stats(message: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        deployment_id = message.get("payload", {}).get("deployment_id")
+        if deployment_id:
+            deployment = deployments_collection.find_one({"id": deployment_id}, {"result_cache": 1})
+            if not deployment:
+                return create_mcp_error_response(message, f"Deployment with ID {deployment_id} not found", 404)
+            return create_mcp_response(message, {
+                "deployment_id": deployment_id,
+                "config": deployment.get("result_cache") or {"enabled": False},
+                "stats": result_cache.stats(deployment_id)
+            })
+        return create_mcp_response(message, {"stats": result_cache.stats()})
+    
+    except Exception as e:
+        print(f"Error getting result cache stats: {str(e)}")
+        return create_mcp_error_response(message, f"Error getting result cache stats: {str(e)}", 500)
+
+async def get_shadow_metrics(message: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        deployment_id = message.get("payload", {}).get("deployment_id")
+        if not deployment_id:
+            return create_mcp_error_response(message, "Deployment ID is required", 400)
+        
+        # Métriques des couples où le déploiement est principal ou miroir
+        metrics = [
+            summarize_shadow_metrics(document)
+            for document in shadow_metrics_collection.find(
+                {"$or": [{"deployment_id": deployment_id}, {"shadow_deployment_id": deployment_id}]}
+            )
+        ]
+        
+        return create_mcp_response(message, {"deployment_id": deployment_id, "shadow_metrics": metrics})
+    
+    except Exception as e:
+        print(f"Error getting shadow metrics: {str(e)}")
+        return create_mcp_error_response(message, f"Error getting shadow metrics: {str(e)}", 500)
+
+async def analyze_indexes(message: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        # Recréer d'abord les index manquants si demandé, puis analyser les plans
+        if message.get("payload", {}).get("ensure"):
+            await asyncio.to_thread(ensure_indexes, db, EXECUTION_TTL_DAYS)
+        report = await asyncio.to_thread(advise, db)
+        return create_mcp_response(message, report)
+    
+    except Exception as e:
+        print(f"Error analyzing indexes: {str(e)}")
+        return create_mcp_error_response(message, f"Error analyzing indexes: {str(e)}", 500)
+
+async def run_garbage_collection(message: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        dry_run = bool(message.get("payload", {}).get("dry_run", False))
+        if gc_lock.locked():
+            return create_mcp_error_response(message, "A garbage collection is already running", 409)
+        
+        # Le passage s'exécute en arrière-plan ; son rapport est suivi dans gc_runs
+        run_id = str(uuid.uuid4())
+        task = asyncio.create_task(run_garbage_collection_pass(dry_run, run_id))
+        gc_tasks.add(task)
+        task.add_done_callback(gc_tasks.discard)
+        
+        return create_mcp_response(message, {
+            "message": "Garbage collection started",
+            "run_id": run_id,
+            "dry_run": dry_run,
+            "retention_days": RESULTS_RETENTION_DAYS
+        })
+    
+    except Exception as e:
+        print(f"Error starting garbage collection: {str(e)}")
+        return create_mcp_error_response(message, f"Error starting garbage collection: {str(e)}", 500)
+
+async def get_gc_status(message: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        payload = message.get("payload", {})
+        run_id = payload.get("run_id")
+        if run_id:
+            run = db["gc_runs"].find_one({"id": run_id}, {"_id": 0})
+            if not run:
+                return create_mcp_error_response(message, f"Garbage collection run {run_id} not found", 404)
+            return create_mcp_response(message, {"run": mongo_to_json_serializable(run)})
+        
+        limit = int(payload.get("limit", 10))
+        runs = list(db["gc_runs"].find({}, {"_id": 0}).sort("started_at", pymongo.DESCENDING).limit(limit))
+        return create_mcp_response(message, {
+            "running": gc_lock.locked(),
+            "interval_seconds": GC_INTERVAL_SECONDS,
+            "retention_days": RESULTS_RETENTION_DAYS,
+            "runs": mongo_to_json_serializable(runs)
+        })
+    
+    except Exception as e:
+        print(f"Error getting garbage collection status: {str(e)}")
+        return create_mcp_error_response(message, f"Error getting garbage collection status: {str(e)}", 500)
+
 # Opérations sur les déploiements
 async def list_deployments(message: Dict[str, Any]) -> Dict[str, Any]:
     try:
@@ -344,6 +1200,15 @@ async def create_deployment(message: Dict[str, Any]) -> Dict[str, Any]:
         if "id" not in deployment_data:
             deployment_data["id"] = str(uuid.uuid4())
         
+        # Vérifier la répartition du trafic, les déploiements miroirs, l'autoscaling et le cache de résultats
+        routing_error = (
+            validate_routing(deployment_data["id"], deployment_data, deployments_collection)
+            or validate_scaling(deployment_data.get("scaling"))
+            or validate_result_cache(deployment_data.get("result_cache"))
+        )
+        if routing_error:
+            return create_mcp_error_response(message, routing_error, 400)
+        
         # Ajouter des timestamps et statut par défaut
         deployment_data["created_at"] = datetime.now().isoformat()
         deployment_data["updated_at"] = deployment_data["created_at"]
@@ -355,6 +1220,9 @@ async def create_deployment(message: Dict[str, Any]) -> Dict[str, Any]:
         # Insérer le déploiement dans la base de données
         deployments_collection.insert_one(deployment_data)
         
+        if deployment_data["status"] == "active":
+            deployment_data.update(begin_deployment_warmup(deployment_data["id"], model_id))
+        
         # Convertir le déploiement en objet sérialisable en JSON
         serializable_deployment = mongo_to_json_serializable(deployment_data)
         
@@ -383,6 +1251,19 @@ async def update_deployment(message: Dict[str, Any]) -> Dict[str, Any]:
         # Convertir l'objet existant pour accès compatible
         existing_deployment = mongo_to_json_serializable(existing_deployment)
         
+        # L'état de préparation et d'autoscaling ne peut être modifié que par le serveur
+        for field in DEPLOYMENT_SERVER_FIELDS:
+            deployment_data.pop(field, None)
+        
+        # Vérifier la répartition du trafic, les déploiements miroirs, l'autoscaling et le cache de résultats
+        routing_error = (
+            validate_routing(deployment_id, deployment_data, deployments_collection)
+            or validate_scaling(deployment_data.get("scaling"))
+            or validate_result_cache(deployment_data.get("result_cache"))
+        )
+        if routing_error:
+            return create_mcp_error_response(message, routing_error, 400)
+        
         # Mettre à jour le timestamp
         deployment_data["updated_at"] = datetime.now().isoformat()
         if "created_at" not in deployment_data:
@@ -394,6 +1275,22 @@ async def update_deployment(message: Dict[str, Any]) -> Dict[str, Any]:
         # Log la mise à jour
         print(f"Deployment updated with ID: {deployment_id}")
         
+        # Préchauffer le modèle à l'activation (ou au changement de modèle), le libérer à la désactivation
+        model_id = deployment_data.get("model_id", existing_deployment.get("model_id"))
+        is_active = deployment_data.get("status", existing_deployment.get("status")) == "active"
+        if is_active and (existing_deployment.get("status") != "active" or model_id != existing_deployment.get("model_id")):
+            deployment_data.update(begin_deployment_warmup(deployment_id, model_id))
+        elif not is_active and existing_deployment.get("status") == "active":
+            deployment_data.update(release_deployment_model(deployment_id))
+        elif deployment_id in warm_models:
+            # Relire la configuration du trafic à la prochaine prédiction
+            warm_models[deployment_id]["checked_at"] = 0.0
+        
+        # Les résultats en cache ne survivent ni à un changement de modèle ni à la désactivation du cache
+        cache_config = deployment_data.get("result_cache", existing_deployment.get("result_cache")) or {}
+        if model_id != existing_deployment.get("model_id") or not is_active or not cache_config.get("enabled"):
+            result_cache.invalidate(deployment_id)
+        
         # Convertir le déploiement en objet sérialisable en JSON
         serializable_deployment = mongo_to_json_serializable(deployment_data)
         
@@ -417,7 +1314,7 @@ async def delete_deployment(message: Dict[str, Any]) -> Dict[str, Any]:
         # Vérifier s'il y a des exécutions en cours pour ce déploiement
         active_executions = executions_collection.find_one({
             "deployment_id": deployment_id,
-            "status": {"$in": ["pending", "running", "processing_with_spark"]}
+            "status": {"$in": ACTIVE_EXECUTION_STATUSES}
         })
         if active_executions:
             return create_mcp_error_response(
@@ -428,6 +1325,10 @@ async def delete_deployment(message: Dict[str, Any]) -> Dict[str, Any]:
         
         # Supprimer le déploiement de la base de données
         deployments_collection.delete_one({"id": deployment_id})
+        warm_models.pop(deployment_id, None)
+        result_cache.invalidate(deployment_id)
+        worker_supervisor.remove(deployment_id)
+        replica_controller.forget(deployment_id)
         
         # Log la suppression
         print(f"Deployment deleted with ID: {deployment_id}")
@@ -439,6 +1340,31 @@ async def delete_deployment(message: Dict[str, Any]) -> Dict[str, Any]:
         return create_mcp_error_response(message, f"Error deleting deployment: {str(e)}", 500)
 
 # Opérations sur les exécutions
+def store_execution_result_object(result_path: str, result: Dict[str, Any]):
+    result_bytes = json.dumps(result, indent=2, cls=MongoJSONEncoder).encode('utf-8')
+    minio_client.put_object(
+        RESULTS_BUCKET,
+        result_path,
+        io.BytesIO(result_bytes),
+        len(result_bytes),
+        content_type="application/json"
+    )
+    print(f"Results stored in MinIO: {result_path}")
+
+def store_execution_result(execution_id: str, execution_result: Dict[str, Any]) -> str:
+    """Écrit le résultat d'une exécution dans MinIO et retourne son chemin"""
+    result_path = f"{execution_id}/results.json"
+    store_execution_result_object(result_path, execution_result)
+    return result_path
+
+def analysis_messages(input_data: Any) -> List[Dict[str, str]]:
+    """Messages d'analyse envoyés à Groq (clés triées : même prompt pour les mêmes données)"""
+    prompt = f"Analyze the following data and provide insights: {json.dumps(input_data, sort_keys=True)}"
+    return [
+        {"role": "system", "content": "You are a data analysis assistant. Analyze the data and provide insights."},
+        {"role": "user", "content": prompt}
+    ]
+
 async def list_executions(message: Dict[str, Any]) -> Dict[str, Any]:
     try:
         # Filtres optionnels
@@ -453,8 +1379,8 @@ async def list_executions(message: Dict[str, Any]) -> Dict[str, Any]:
         if status:
             filter_query["status"] = status
         
-        # Récupérer les exécutions de la base de données
-        executions = list(executions_collection.find(filter_query))
+        # Récupérer les exécutions, les plus récentes d'abord (index deployment_id, status, started_at)
+        executions = list(executions_collection.find(filter_query).sort("started_at", pymongo.DESCENDING))
         
         # Convertir les exécutions en objets sérialisables en JSON
         serializable_executions = mongo_to_json_serializable(executions)
@@ -508,6 +1434,15 @@ async def create_execution(message: Dict[str, Any]) -> Dict[str, Any]:
         if deployment.get("status") != "active":
             return create_mcp_error_response(message, f"Deployment with ID {deployment_id} is not active", 400)
         
+        # Répartition canary : l'exécution peut être confiée à un déploiement cible actif
+        target_id = choose_target(deployment_id, deployment.get("traffic_split"))
+        if target_id != deployment_id:
+            target = deployments_collection.find_one({"id": target_id, "status": "active"})
+            if target:
+                execution_data["routed_from"] = deployment_id
+                execution_data["deployment_id"] = deployment_id = target_id
+                deployment = mongo_to_json_serializable(target)
+        
         # Générer un ID unique si non fourni
         if "id" not in execution_data:
             execution_data["id"] = str(uuid.uuid4())
@@ -523,19 +1458,37 @@ async def create_execution(message: Dict[str, Any]) -> Dict[str, Any]:
         # Convertir le modèle en objet sérialisable en JSON
         model = mongo_to_json_serializable(model)
         
+        # Figer la version du dataset pour que l'exécution soit reproductible
+        parameters = execution_data.get("parameters") or {}
+        if parameters.get("dataset_id"):
+            dataset = datasets_collection.find_one({"id": parameters["dataset_id"]}, {"current_version": 1})
+            if not dataset:
+                return create_mcp_error_response(message, f"Dataset with ID {parameters['dataset_id']} not found", 404)
+            requested_version = parameters.get("dataset_version")
+            if requested_version is not None:
+                try:
+                    requested_version = int(requested_version)
+                except (TypeError, ValueError):
+                    return create_mcp_error_response(message, "Dataset version must be an integer", 400)
+                if not dataset_versions_collection.find_one({"dataset_id": parameters["dataset_id"], "version": requested_version}, {"_id": 1}):
+                    return create_mcp_error_response(message, f"Version {requested_version} of dataset {parameters['dataset_id']} not found", 404)
+            execution_data["dataset_id"] = parameters["dataset_id"]
+            execution_data["dataset_version"] = requested_version if requested_version is not None else dataset.get("current_version")
+            
+            # Scoring incrémental : seules les partitions ajoutées après since_version sont lues
+            if parameters.get("since_version") is not None:
+                try:
+                    execution_data["since_version"] = int(parameters["since_version"])
+                except (TypeError, ValueError):
+                    return create_mcp_error_response(message, "since_version must be an integer", 400)
+        
         # Ajouter des informations supplémentaires
         execution_data["model_id"] = model_id
         execution_data["model_name"] = model.get("name", "Unknown Model")
         execution_data["deployment_name"] = deployment.get("name", "Unknown Deployment")
-        execution_data["status"] = "pending"
         execution_data["started_at"] = datetime.now().isoformat()
         execution_data["updated_at"] = execution_data["started_at"]
-        
-        # Log la création de l'exécution
-        print(f"Creating execution with ID: {execution_data['id']} for deployment: {deployment_id}")
-        
-        # Insérer l'exécution dans la base de données
-        executions_collection.insert_one(execution_data)
+        execution_data[EXECUTION_TTL_FIELD] = now_date()
         
         # Récupération des données et paramètres
         parameters = execution_data.get("parameters", {})
@@ -543,37 +1496,33 @@ async def create_execution(message: Dict[str, Any]) -> Dict[str, Any]:
         input_data = parameters.get("input_data")
         use_spark = parameters.get("use_spark", False)
         
+        # Une exécution confiée à Spark est insérée directement avec son statut de traitement
+        if SPARK_ENABLED and use_spark:
+            execution_data["status"] = "processing_with_spark"
+            execution_data["spark_job_status"] = "submitted"
+        else:
+            execution_data["status"] = "pending"
+        
+        # Log la création de l'exécution
+        print(f"Creating execution with ID: {execution_data['id']} for deployment: {deployment_id}")
+        
+        # Insérer l'exécution dans la base de données
+        executions_collection.insert_one(execution_data)
+        
         # Vérifier si nous devons utiliser Spark pour cette exécution
         if SPARK_ENABLED and use_spark:
             print(f"Using Spark for execution {execution_id}")
             
-            # Mettre à jour le statut pour indiquer que le traitement Spark est en cours
-            executions_collection.update_one(
-                {"id": execution_id},
-                {"$set": {
-                    "status": "processing_with_spark",
-                    "updated_at": datetime.now().isoformat()
-                }}
-            )
-            
             # Lancer le job Spark en arrière-plan
             asyncio.create_task(run_spark_job(execution_id))
             
-            # Mettre à jour l'exécution avec les informations sur le job Spark
-            execution_data["status"] = "processing_with_spark"
-            execution_data["spark_job_status"] = "submitted"
-            execution_data["updated_at"] = datetime.now().isoformat()
-            
             # Retourner une réponse immédiate
             serializable_execution = mongo_to_json_serializable(execution_data)
             return create_mcp_response(message, {"execution": serializable_execution})
         
         # Si nous n'utilisons pas Spark, exécuter le traitement ici
-        # Mise à jour du statut en cours d'exécution
-        executions_collection.update_one(
-            {"id": execution_id},
-            {"$set": {"status": "running", "updated_at": datetime.now().isoformat()}}
-        )
+        # Mise à jour du statut en cours d'exécution (différée, fusionnée avec l'état final)
+        execution_writes.update(execution_id, {"status": "running", "updated_at": datetime.now().isoformat()})
         
         # Résultat d'exécution par défaut
         execution_result = {
@@ -611,44 +1560,50 @@ async def create_execution(message: Dict[str, Any]) -> Dict[str, Any]:
             # Traitement des données d'entrée directes
             print(f"Processing direct input data")
             
+            # Résultat déjà calculé pour ces entrées et cette version du modèle
+            cache_ttl = result_cache_ttl(deployment, RESULT_CACHE_TTL_SECONDS)
+            cache_key = result_key(deployment_id, model, input_data) if cache_ttl else None
+            cached_result = result_cache.get(cache_key) if cache_key else None
+            if cached_result is not None:
+                print(f"Serving execution {execution_id} from the result cache")
+                execution_result["predictions"] = cached_result["predictions"]
+                execution_result["metrics"] = cached_result["metrics"]
+                if cached_result.get("groq_response"):
+                    execution_data["groq_response"] = cached_result["groq_response"]
+                execution_data["cache_hit"] = True
+                execution_data["cached_from"] = cached_result["execution_id"]
+            
             # Si Groq est configuré, utiliser Groq pour le traitement
-            if groq_client and GROQ_API_KEY and GROQ_AVAILABLE:
+            if cached_result is None and llm_client is not None:
                 try:
-                    # Préparer les données pour Groq
-                    prompt = f"Analyze the following data and provide insights: {json.dumps(input_data)}"
-                    
-                    # Appeler l'API Groq
-                    completion = groq_client.chat.completions.create(
-                        model="llama3-70b-8192",  # ou un autre modèle disponible
-                        messages=[
-                            {"role": "system", "content": "You are a data analysis assistant. Analyze the data and provide insights."},
-                            {"role": "user", "content": prompt}
-                        ],
-                        max_tokens=1024
-                    )
-                    
-                    # Extraire la réponse
-                    response_text = completion.choices[0].message.content
+                    # Appeler l'API Groq (limité en concurrence et en débit, réponses en cache)
+                    completion = await llm_client.complete(GROQ_MODEL, analysis_messages(input_data), max_tokens=LLM_MAX_TOKENS)
                     
                     # Stocker la réponse de Groq
                     execution_data["groq_response"] = {
-                        "model": completion.model,
+                        "model": completion["model"],
                         "status": "success",
-                        "tokens_generated": completion.usage.completion_tokens,
-                        "total_tokens": completion.usage.total_tokens
+                        "cached": completion["cached"],
+                        "tokens_generated": completion["completion_tokens"],
+                        "total_tokens": completion["total_tokens"]
                     }
                     
                     # Traiter la réponse
                     execution_result["predictions"] = [
-                        {"analysis": response_text}
+                        {"analysis": completion["text"]}
                     ]
                     execution_result["metrics"] = {
                         "processing_time_ms": int(time.time() * 1000) - int(datetime.fromisoformat(execution_data["started_at"]).timestamp() * 1000),
-                        "tokens_generated": completion.usage.completion_tokens,
-                        "total_tokens": completion.usage.total_tokens
+                        "tokens_generated": completion["completion_tokens"],
+                        "total_tokens": completion["total_tokens"],
+                        "tokens_per_second": completion.get("tokens_per_second"),
+                        "llm_cached": completion["cached"]
                     }
                     
-                    print(f"Processed data with Groq, generated {completion.usage.completion_tokens} tokens")
+                    if completion["cached"]:
+                        print(f"Served Groq analysis from the LLM response cache")
+                    else:
+                        print(f"Processed data with Groq, generated {completion['completion_tokens']} tokens")
                 except Exception as e:
                     print(f"Error processing data with Groq: {str(e)}")
                     # Continuer avec la simulation si Groq échoue
@@ -685,6 +1640,15 @@ async def create_execution(message: Dict[str, Any]) -> Dict[str, Any]:
                     "recall": 0.94,
                     "f1_score": 0.91
                 }
+            
+            # Un résultat de repli après une erreur Groq n'est pas mis en cache
+            if cache_key is not None and cached_result is None and "groq_error" not in execution_data:
+                result_cache.put(cache_key, {
+                    "execution_id": execution_id,
+                    "predictions": execution_result["predictions"],
+                    "metrics": execution_result["metrics"],
+                    "groq_response": execution_data.get("groq_response")
+                }, cache_ttl)
         else:
             # Ni dataset ni input_data spécifiés, générer des résultats aléatoires
             print("No dataset_id or input_data provided, generating random results")
@@ -699,23 +1663,7 @@ async def create_execution(message: Dict[str, Any]) -> Dict[str, Any]:
             }
         
         # Stocker les résultats dans MinIO
-        result_path = f"{execution_id}/results.json"
-        
-        # Convertir les résultats en JSON
-        result_json = json.dumps(execution_result, indent=2, cls=MongoJSONEncoder)
-        result_bytes = result_json.encode('utf-8')
-        result_stream = io.BytesIO(result_bytes)
-        
-        minio_client.put_object(
-            RESULTS_BUCKET,
-            result_path,
-            result_stream,
-            len(result_bytes),
-            content_type="application/json"
-        )
-        
-        # Log le stockage des résultats
-        print(f"Results stored in MinIO: {result_path}")
+        result_path = store_execution_result(execution_id, execution_result)
         
         # Mettre à jour l'exécution avec le chemin des résultats et changer le statut
         execution_data["result_path"] = result_path
@@ -723,33 +1671,216 @@ async def create_execution(message: Dict[str, Any]) -> Dict[str, Any]:
         execution_data["completed_at"] = datetime.now().isoformat()
         execution_data["updated_at"] = execution_data["completed_at"]
         
-        # Mettre à jour l'exécution dans la base de données
-        executions_collection.update_one(
-            {"id": execution_id},
-            {"$set": execution_data}
-        )
+        # Mettre à jour l'exécution dans la base de données (écrit avant la réponse)
+        await execution_writes.complete(execution_id, execution_data)
         
         # Convertir l'exécution en objet sérialisable en JSON
         serializable_execution = mongo_to_json_serializable(execution_data)
         
         return create_mcp_response(message, {"execution": serializable_execution})
     
+    except asyncio.CancelledError:
+        # Requête interrompue (client déconnecté, arrêt) : ne pas laisser l'exécution en "running"
+        if 'execution_id' in locals():
+            await execution_writes.complete(execution_id, {
+                "status": "failed",
+                "error": "Execution was interrupted",
+                "updated_at": datetime.now().isoformat()
+            })
+        raise
     except Exception as e:
         print(f"Error creating execution: {str(e)}")
         
         # Mettre à jour le statut de l'exécution en cas d'erreur
         if 'execution_id' in locals():
-            executions_collection.update_one(
-                {"id": execution_id},
-                {"$set": {
-                    "status": "failed",
-                    "error": str(e),
-                    "updated_at": datetime.now().isoformat()
-                }}
-            )
+            await execution_writes.complete(execution_id, {
+                "status": "failed",
+                "error": str(e),
+                "updated_at": datetime.now().isoformat()
+            })
         
         return create_mcp_error_response(message, f"Error creating execution: {str(e)}", 500)
 
+def simulate_batch_predictions(inputs: List[Any]) -> List[Tuple[Optional[List[Dict[str, Any]]], Optional[str]]]:
+    """Résultats simulés (comme create_execution sans Groq), calculés en un passage vectorisé"""
+    outcomes = [([
+        {"label": "Class A", "probability": 0.85},
+        {"label": "Class B", "probability": 0.12},
+        {"label": "Class C", "probability": 0.03}
+    ], None)] * len(inputs)
+    salary_indexes = [index for index, input_data in enumerate(inputs) if isinstance(input_data, dict) and "experience" in input_data]
+    if salary_indexes:
+        experience = pd.to_numeric(pd.Series([inputs[index]["experience"] for index in salary_indexes]), errors="coerce").to_numpy()
+        salaries = 50000 + 1500 * experience
+        for index, salary in zip(salary_indexes, salaries):
+            if np.isnan(salary):
+                outcomes[index] = (None, "experience must be a number")
+            else:
+                outcomes[index] = ([{"label": "Predicted Salary", "value": float(salary)}], None)
+    return outcomes
+
+def score_execution_batch(entry: Optional[Dict[str, Any]], inputs: List[Any], requested_columns: Optional[List[str]]):
+    """
+    Prédictions par élément avec le modèle préchauffé du déploiement : un seul
+    DataFrame et un seul appel au modèle pour toutes les entrées valides. Sans
+    modèle chargé, les résultats sont simulés.
+    """
+    if entry is None:
+        return simulate_batch_predictions(inputs), "simulated"
+    
+    model = entry["model"]
+    columns = requested_columns or model.feature_columns or None
+    outcomes: List[Any] = [None] * len(inputs)
+    valid = []
+    for index, input_data in enumerate(inputs):
+        if not isinstance(input_data, dict):
+            outcomes[index] = (None, "input_data must be an object mapping feature names to values")
+            continue
+        missing = [column for column in columns or [] if column not in input_data]
+        if missing:
+            outcomes[index] = (None, f"input_data is missing model input columns: {missing}")
+            continue
+        valid.append(index)
+    if valid:
+        try:
+            frame = instances_frame([inputs[index] for index in valid], columns)
+            values = predictions_to_json(model.predict(frame, columns))
+            for index, value in zip(valid, values):
+                outcomes[index] = ([{"label": "Prediction", "value": value}], None)
+        except (ValueError, TypeError, KeyError) as e:
+            for index in valid:
+                outcomes[index] = (None, f"Prediction failed: {str(e)}")
+    return outcomes, "model"
+
+async def create_executions_batch(message: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        batch_data = message.get("payload", {}).get("batch", {})
+        items = batch_data.get("items")
+        if not isinstance(items, list) or not items:
+            return create_mcp_error_response(message, "Batch requires a non-empty 'items' list", 400)
+        if len(items) > BATCH_MAX_ITEMS:
+            return create_mcp_error_response(message, f"Batch exceeds the maximum of {BATCH_MAX_ITEMS} items", 400)
+        if not all(isinstance(item, dict) for item in items):
+            return create_mcp_error_response(message, "Each batch item must be an execution object", 400)
+        
+        # Déploiement et modèle vérifiés une seule fois pour tout le lot
+        deployment_id = batch_data.get("deployment_id")
+        if not deployment_id:
+            return create_mcp_error_response(message, "Deployment ID is required for execution", 400)
+        deployment = deployments_collection.find_one({"id": deployment_id})
+        if not deployment:
+            return create_mcp_error_response(message, f"Deployment with ID {deployment_id} not found", 404)
+        if deployment.get("status") != "active":
+            return create_mcp_error_response(message, f"Deployment with ID {deployment_id} is not active", 400)
+        model_id = deployment.get("model_id")
+        model = models_collection.find_one({"id": model_id}, {"id": 1, "name": 1})
+        if not model:
+            return create_mcp_error_response(message, f"Model with ID {model_id} not found", 404)
+        
+        batch_id = batch_data.get("id") or str(uuid.uuid4())
+        started_at = datetime.now().isoformat()
+        recorded_at = now_date()
+        print(f"Creating batch {batch_id} of {len(items)} executions for deployment: {deployment_id}")
+        
+        # Modèle préchauffé s'il est disponible (sinon le préchauffage est lancé pour les lots suivants)
+        try:
+            entry = resolve_warm_deployment(deployment_id)
+        except PredictionError as e:
+            print(f"Batch {batch_id} scored without a loaded model: {str(e)}")
+            entry = None
+        
+        inputs = [(item.get("parameters") or {}).get("input_data") for item in items]
+        start = time.perf_counter()
+        if entry is not None and len(inputs) > PREDICT_INLINE_MAX_ROWS:
+            outcomes, scoring = await asyncio.to_thread(score_execution_batch, entry, inputs, batch_data.get("feature_columns"))
+        else:
+            outcomes, scoring = score_execution_batch(entry, inputs, batch_data.get("feature_columns"))
+        scoring_ms = round((time.perf_counter() - start) * 1000, 3)
+        
+        # Un seul objet de résultats pour tout le lot, une partition par élément (result_index)
+        result_path = f"batches/{batch_id}/results.json"
+        execution_ids = [item.get("id") or str(uuid.uuid4()) for item in items]
+        completed_at = datetime.now().isoformat()
+        batch_result = {
+            "batch_id": batch_id,
+            "deployment_id": deployment_id,
+            "model_id": model_id,
+            "scoring": scoring,
+            "metrics": {"items": len(items), "scoring_ms": scoring_ms},
+            "timestamp": completed_at,
+            "results": [
+                {
+                    "execution_id": execution_id,
+                    "predictions": predictions or [],
+                    "metrics": {"record_count": 1 if predictions else 0},
+                    "error": error,
+                    "timestamp": completed_at
+                }
+                for execution_id, (predictions, error) in zip(execution_ids, outcomes)
+            ]
+        }
+        await asyncio.to_thread(store_execution_result_object, result_path, batch_result)
+        
+        executions = []
+        for index, (item, execution_id, (predictions, error)) in enumerate(zip(items, execution_ids, outcomes)):
+            execution = dict(item)
+            execution.update({
+                "id": execution_id,
+                "batch_id": batch_id,
+                "deployment_id": deployment_id,
+                "model_id": model_id,
+                "model_name": model.get("name", "Unknown Model"),
+                "deployment_name": deployment.get("name", "Unknown Deployment"),
+                "status": "failed" if error else "completed",
+                "result_path": result_path,
+                "result_index": index,
+                "started_at": started_at,
+                "completed_at": completed_at,
+                "updated_at": completed_at,
+                EXECUTION_TTL_FIELD: recorded_at
+            })
+            if error:
+                execution["error"] = error
+            executions.append(execution)
+        
+        # Une seule écriture MongoDB pour tout le lot
+        try:
+            executions_collection.insert_many(executions, ordered=False)
+        except pymongo.errors.BulkWriteError as e:
+            # Seuls les documents refusés sont rejetés : un id répété dans le lot a bien été inséré la première fois
+            write_errors = e.details.get("writeErrors", [])
+            if any(error.get("code") != 11000 for error in write_errors):
+                raise
+            for error in write_errors:
+                execution = executions[error["index"]]
+                execution["status"] = "rejected"
+                execution["error"] = f"Execution with ID {execution['id']} already exists"
+        
+        statuses = [execution["status"] for execution in executions]
+        print(f"Batch {batch_id} stored: {statuses.count('completed')} completed, {statuses.count('failed')} failed in {scoring_ms} ms ({scoring})")
+        
+        return create_mcp_response(message, {
+            "batch_id": batch_id,
+            "deployment_id": deployment_id,
+            "model_id": model_id,
+            "scoring": scoring,
+            "result_path": result_path,
+            "counts": {status: statuses.count(status) for status in ("completed", "failed", "rejected")},
+            "items": [
+                {
+                    "execution_id": execution["id"],
+                    "status": execution["status"],
+                    "result_index": execution["result_index"],
+                    "error": execution.get("error")
+                }
+                for execution in executions
+            ]
+        })
+    
+    except Exception as e:
+        print(f"Error creating execution batch: {str(e)}")
+        return create_mcp_error_response(message, f"Error creating execution batch: {str(e)}", 500)
+
 async def cancel_execution(message: Dict[str, Any]) -> Dict[str, Any]:
     try:
         execution_id = message.get("payload", {}).get("execution_id")
@@ -765,10 +1896,10 @@ async def cancel_execution(message: Dict[str, Any]) -> Dict[str, Any]:
         execution = mongo_to_json_serializable(execution)
         
         # Vérifier si l'exécution peut être annulée
-        if execution.get("status") not in ["pending", "running", "processing_with_spark"]:
+        if execution.get("status") not in ACTIVE_EXECUTION_STATUSES:
             return create_mcp_error_response(
                 message, 
-                f"Cannot cancel execution with status '{execution.get('status')}'. Only pending, running or processing executions can be cancelled.", 
+                f"Cannot cancel execution with status '{execution.get('status')}'. Only pending, running, processing or streaming executions can be cancelled.", 
                 400
             )
         
@@ -779,10 +1910,10 @@ async def cancel_execution(message: Dict[str, Any]) -> Dict[str, Any]:
             "updated_at": datetime.now().isoformat()
         }
         
-        executions_collection.update_one(
-            {"id": execution_id},
-            {"$set": updated_data}
-        )
+        await execution_writes.complete(execution_id, updated_data)
+        if execution.get("status") == "streaming":
+            # Le flux s'arrête au prochain token sans écraser l'annulation
+            cancelled_streams.add(execution_id)
         
         # Log l'annulation
         print(f"Execution cancelled with ID: {execution_id}")
@@ -839,6 +1970,10 @@ async def get_execution_results(message: Dict[str, Any]) -> Dict[str, Any]:
             response = minio_client.get_object(RESULTS_BUCKET, result_path)
             results_data = json.loads(response.read().decode('utf-8'))
             
+            # Exécution d'un lot : sa partition dans l'objet de résultats partagé
+            if execution.get("result_index") is not None:
+                results_data = results_data["results"][execution["result_index"]]
+            
             # Si les résultats contiennent des données binaires (comme des images), les convertir en base64
             if "binary_data" in results_data:
                 binary_data = results_data["binary_data"]
@@ -879,14 +2014,18 @@ async def get_model_file(model_id: str):
         if not file_path:
             raise ValueError(f"Model with ID {model_id} has no file path")
         
-        # Récupérer le fichier depuis MinIO
-        response = minio_client.get_object(MODELS_BUCKET, file_path)
-        file_data = response.read()
+        # Récupérer le fichier depuis le cache local (MinIO seulement en cas d'absence)
+        local_path = await asyncio.to_thread(
+            artifact_cache.get, minio_client, MODELS_BUCKET, file_path, None, artifact_suffix(model)
+        )
+        with open(local_path, "rb") as cached_file:
+            file_data = cached_file.read()
         
-        print(f"Model file retrieved from MinIO: {file_path}, size: {len(file_data)}")
+        print(f"Model file retrieved: {file_path}, size: {len(file_data)}")
         
         return {
             "file_data": file_data,
+            "local_path": local_path,
             "file_name": model.get("file_name"),
             "content_type": model.get("content_type")
         }
@@ -911,14 +2050,16 @@ async def get_dataset_file(dataset_id: str):
         if not file_path:
             raise ValueError(f"Dataset with ID {dataset_id} has no file path")
         
-        # Récupérer le fichier depuis MinIO
-        response = minio_client.get_object(DATASETS_BUCKET, file_path)
-        file_data = response.read()
+        # Récupérer le fichier depuis le cache local (MinIO seulement en cas d'absence)
+        local_path = await asyncio.to_thread(artifact_cache.get, minio_client, DATASETS_BUCKET, file_path)
+        with open(local_path, "rb") as cached_file:
+            file_data = cached_file.read()
         
-        print(f"Dataset file retrieved from MinIO: {file_path}, size: {len(file_data)}")
+        print(f"Dataset file retrieved: {file_path}, size: {len(file_data)}")
         
         return {
             "file_data": file_data,
+            "local_path": local_path,
             "file_name": dataset.get("file_name"),
             "content_type": dataset.get("content_type")
         }
@@ -938,10 +2079,12 @@ async def health_check():
         minio_status = "ok" if minio_client.bucket_exists(RESULTS_BUCKET) else "error"
         
         # Vérifier la connexion à Groq
-        groq_status = "ok" if groq_client and GROQ_API_KEY and GROQ_AVAILABLE else "not_configured"
+        groq_status = "ok" if llm_client is not None else "not_configured"
         
         # Vérifier la connexion à Spark
         spark_status = "ok" if SPARK_ENABLED else "not_configured"
+        if spark_driver is not None and spark_driver.status != "ready":
+            spark_status = spark_driver.status
         
         status = "ok" if mongo_status == "ok" and minio_status == "ok" else "error"
         
@@ -953,7 +2096,16 @@ async def health_check():
                 "minio": minio_status,
                 "groq": groq_status,
                 "spark": spark_status
-            }
+            },
+            "spark_driver": spark_driver.info() if spark_driver is not None else None,
+            "artifact_cache": artifact_cache.stats(),
+            "predictions": prediction_recorder.stats(),
+            "result_cache": result_cache.stats(),
+            "execution_writes": execution_writes.stats(),
+            "llm": llm_client.stats() if llm_client is not None else None,
+            "shadow_mirror": shadow_mirror.stats(),
+            "worker_pools": worker_supervisor.stats(),
+            "warm_deployments": list(warm_models.keys())
         }
     except Exception as e:
         return {
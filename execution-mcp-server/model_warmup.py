@@ -0,0 +1,77 @@
+"""
+Préchauffage des modèles à l'activation d'un déploiement.
+
+Le préchauffage récupère l'artefact (cache local), le charge avec le chargeur
+de son format puis score un lot synthétique : les imports paresseux, les
+compilations à la volée et les allocations de tampons des bibliothèques sont
+ainsi payés avant la première requête réelle. Chaque phase est chronométrée.
+"""
+
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from model_registry import LoadedModel, artifact_suffix, load_model, model_format
+
+# Types numériques entiers décrits par les schémas d'entrée (ONNX, XGBoost, NumPy)
+INTEGER_TYPES = ("int", "int8", "int16", "int32", "int64", "uint8", "uint16", "uint32", "uint64", "i")
+
+
+def synthetic_columns(model: LoadedModel) -> Optional[List[str]]:
+    """Colonnes du lot synthétique : celles du modèle, sinon des noms générés d'après n_features"""
+    if model.feature_columns:
+        return list(model.feature_columns)
+    if model.n_features:
+        return [f"feature_{index}" for index in range(model.n_features)]
+    return None
+
+
+def synthetic_batch(model: LoadedModel, rows: int) -> Optional[pd.DataFrame]:
+    """Lot de zéros aux types du schéma d'entrée, ou None si les entrées du modèle sont inconnues"""
+    columns = synthetic_columns(model)
+    if not columns:
+        return None
+    types = {feature["name"]: (feature.get("type") or "") for feature in model.input_schema.get("features") or []}
+    return pd.DataFrame({
+        column: np.zeros(rows, dtype=np.int64 if types.get(column, "").lower() in INTEGER_TYPES else np.float64)
+        for column in columns
+    })
+
+
+def warm_up_model(artifact_cache, minio_client, bucket: str, model_doc: Dict[str, Any],
+                  batch_rows: int = 32) -> Tuple[LoadedModel, Dict[str, Any], Dict[str, Any]]:
+    """
+    Récupère, charge et exerce le modèle ; retourne le modèle chargé, la durée
+    de chaque phase et l'artefact (bucket, objet, ETag, suffixe). Les processus
+    du pool repassent par le cache avec cet artefact : le fichier local peut
+    avoir été évincé entre-temps.
+    """
+    timings: Dict[str, Any] = {}
+
+    start = time.perf_counter()
+    artifact = {
+        "bucket": bucket,
+        "object_name": model_doc["file_path"],
+        "etag": artifact_cache.resolve_etag(minio_client, bucket, model_doc["file_path"]),
+        "suffix": artifact_suffix(model_doc)
+    }
+    local_path = artifact_cache.get(minio_client, bucket, artifact["object_name"], artifact["etag"], artifact["suffix"])
+    timings["fetch_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    start = time.perf_counter()
+    model = load_model(model_format(model_doc), local_path, model_doc.get("input_schema"))
+    timings["load_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    batch = synthetic_batch(model, batch_rows)
+    if batch is not None:
+        start = time.perf_counter()
+        model.predict(batch, list(batch.columns))
+        timings["predict_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        timings["batch_rows"] = batch_rows
+    else:
+        # Entrées inconnues : le modèle est chargé mais aucun lot n'a pu être construit
+        timings["batch_rows"] = 0
+
+    return model, timings, artifact
@@ -0,0 +1,144 @@
+"""
+Prédiction synchrone en mémoire contre le modèle préchauffé d'un déploiement.
+
+Une prédiction ne crée pas d'exécution : les entrées sont converties en
+DataFrame, scorées par le modèle déjà chargé et renvoyées directement. Seul un
+échantillon des requêtes (PREDICT_SAMPLE_RATE) est enregistré, en arrière-plan,
+dans la collection `prediction_samples` (à part des exécutions, qui ont des
+résultats dans MinIO) : les enregistrements sont placés dans une file bornée et
+insérés par lots (insert_many). Si la file est pleine, l'enregistrement est abandonné plutôt
+que de ralentir la requête.
+"""
+
+import asyncio
+import random
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from indexes import EXECUTION_TTL_FIELD, now_date
+
+
+class PredictionError(ValueError):
+    """Requête de prédiction invalide ou déploiement indisponible"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def parse_instances(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Accepte {"instances": [...]} ou une seule ligne {"input": {...}}"""
+    instances = payload.get("instances")
+    if instances is None and payload.get("input") is not None:
+        instances = [payload["input"]]
+    if not isinstance(instances, list) or not instances:
+        raise PredictionError("Prediction requires a non-empty 'instances' list or an 'input' object")
+    if not all(isinstance(instance, dict) for instance in instances):
+        raise PredictionError("Each instance must be an object mapping feature names to values")
+    return instances
+
+
+def instances_frame(instances: List[Dict[str, Any]], feature_columns: Optional[List[str]]) -> pd.DataFrame:
+    frame = pd.DataFrame.from_records(instances)
+    if feature_columns:
+        missing = [column for column in feature_columns if column not in frame.columns]
+        if missing:
+            raise PredictionError(f"Instances are missing model input columns: {missing}")
+    return frame
+
+
+def predictions_to_json(predictions: np.ndarray) -> List[Any]:
+    values = predictions.tolist()
+    # Les NaN ne sont pas sérialisables en JSON
+    return [None if isinstance(value, float) and value != value else value for value in values]
+
+
+class PredictionRecorder:
+    """Enregistrement échantillonné et asynchrone des prédictions (collection prediction_samples)"""
+
+    def __init__(self, collection, sample_rate: float, queue_size: int = 10000, batch_size: int = 100):
+        self.collection = collection
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self._queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=queue_size)
+        self._task: Optional[asyncio.Task] = None
+        self.requests = 0
+        self.rows = 0
+        self.sampled = 0
+        self.dropped = 0
+        self.persisted = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._writer_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        # Écrire ce qui reste dans la file avant l'arrêt
+        await self._flush(self._drain())
+
+    def record(self, deployment: Dict[str, Any], instances: List[Dict[str, Any]], predictions: List[Any],
+               latency_ms: float):
+        self.requests += 1
+        self.rows += len(instances)
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return
+        now = datetime.now().isoformat()
+        record = {
+            "id": str(uuid.uuid4()),
+            "mode": "predict",
+            "deployment_id": deployment["deployment_id"],
+            "model_id": deployment["model_id"],
+            "parameters": {"instances": instances},
+            "predictions": predictions,
+            "metrics": {"record_count": len(instances), "latency_ms": latency_ms},
+            "sample_rate": self.sample_rate,
+            "started_at": now,
+            EXECUTION_TTL_FIELD: now_date()
+        }
+        try:
+            self._queue.put_nowait(record)
+            self.sampled += 1
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        records = []
+        while len(records) < self.batch_size:
+            try:
+                records.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return records
+
+    async def _flush(self, records: List[Dict[str, Any]]):
+        if not records:
+            return
+        try:
+            await asyncio.to_thread(self.collection.insert_many, records, ordered=False)
+            self.persisted += len(records)
+        except Exception as e:
+            print(f"Error persisting {len(records)} sampled predictions: {str(e)}")
+
+    async def _writer_loop(self):
+        while True:
+            records = [await self._queue.get()]
+            records.extend(self._drain())
+            await self._flush(records)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "rows": self.rows,
+            "sample_rate": self.sample_rate,
+            "sampled": self.sampled,
+            "persisted": self.persisted,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize()
+        }
@@ -0,0 +1,139 @@
+"""
+Cache des résultats de prédiction sur données d'entrée directes (`input_data`).
+
+Un déploiement l'active avec `result_cache: {"enabled": true, "ttl_seconds": 300}`.
+La clé associe le déploiement, la version du modèle (son empreinte de contenu)
+et une empreinte canonique des entrées (JSON aux clés triées) : un modèle
+remplacé ou ré-uploadé change de clé, et les entrées de l'ancien modèle ne sont
+plus jamais servies. Les entrées expirent après leur TTL et le cache est borné
+en octets, l'entrée la moins récemment utilisée étant évincée la première.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+ResultKey = Tuple[str, str, str, str]
+
+
+def input_digest(input_data: Any) -> str:
+    """Empreinte indépendante de l'ordre des clés et des espaces du JSON d'entrée"""
+    canonical = json.dumps(input_data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def result_key(deployment_id: str, model: Dict[str, Any], input_data: Any) -> ResultKey:
+    model_version = model.get("content_digest") or model.get("updated_at") or ""
+    return (deployment_id, model.get("id") or "", model_version, input_digest(input_data))
+
+
+def result_cache_ttl(deployment: Dict[str, Any], default_ttl: float) -> Optional[float]:
+    """TTL du cache pour ce déploiement, ou None s'il n'est pas activé"""
+    config = deployment.get("result_cache") or {}
+    if not config.get("enabled"):
+        return None
+    return float(config.get("ttl_seconds") or default_ttl)
+
+
+def validate_result_cache(config: Any) -> Optional[str]:
+    """Message d'erreur si la configuration du cache de résultats est invalide"""
+    if config is None:
+        return None
+    if not isinstance(config, dict):
+        return "result_cache must be an object"
+    unknown = sorted(set(config) - {"enabled", "ttl_seconds"})
+    if unknown:
+        return f"Unknown result_cache settings: {unknown}"
+    if "enabled" in config and not isinstance(config["enabled"], bool):
+        return "result_cache.enabled must be a boolean"
+    ttl = config.get("ttl_seconds")
+    if ttl is not None and (not isinstance(ttl, (int, float)) or isinstance(ttl, bool) or ttl <= 0):
+        return "result_cache.ttl_seconds must be a positive number"
+    return None
+
+
+class ResultCache:
+    """LRU avec TTL par entrée, borné en octets (taille du résultat sérialisé)"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        # clé -> (expiration, taille, résultat)
+        self._entries: "OrderedDict[ResultKey, Tuple[float, int, Dict[str, Any]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _counters(self, deployment_id: str) -> Dict[str, int]:
+        if deployment_id not in self._stats:
+            self._stats[deployment_id] = {"hits": 0, "misses": 0, "expired": 0, "stores": 0, "evictions": 0, "invalidations": 0}
+        return self._stats[deployment_id]
+
+    def _remove(self, key: ResultKey):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key: ResultKey) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            counters = self._counters(key[0])
+            entry = self._entries.get(key)
+            if entry is None:
+                counters["misses"] += 1
+                return None
+            expires_at, _, value = entry
+            if expires_at <= now:
+                self._remove(key)
+                counters["expired"] += 1
+                counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            counters["hits"] += 1
+            return value
+
+    def put(self, key: ResultKey, value: Dict[str, Any], ttl_seconds: float):
+        size = len(json.dumps(value, default=str).encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl_seconds, size, value)
+            self._bytes += size
+            self._counters(key[0])["stores"] += 1
+            while self._bytes > self.max_bytes:
+                evicted_key = next(iter(self._entries))
+                self._remove(evicted_key)
+                self._counters(evicted_key[0])["evictions"] += 1
+
+    def invalidate(self, deployment_id: str) -> int:
+        """Supprime les résultats d'un déploiement (modèle changé, cache désactivé, suppression)"""
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == deployment_id]
+            for key in keys:
+                self._remove(key)
+            if keys:
+                self._counters(deployment_id)["invalidations"] += len(keys)
+            return len(keys)
+
+    def stats(self, deployment_id: Optional[str] = None) -> Dict[str, Any]:
+        with self._lock:
+            if deployment_id is not None:
+                counters = dict(self._counters(deployment_id))
+                counters["entries"] = sum(1 for key in self._entries if key[0] == deployment_id)
+                lookups = counters["hits"] + counters["misses"]
+                counters["hit_rate"] = counters["hits"] / lookups if lookups else None
+                return counters
+            hits = sum(counters["hits"] for counters in self._stats.values())
+            misses = sum(counters["misses"] for counters in self._stats.values())
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else None,
+                "deployments": {key: dict(value) for key, value in self._stats.items()}
+            }
@@ -0,0 +1,175 @@
+"""
+Collecte des métriques Spark d'une exécution.
+
+Les métriques de chaque stage (durée, octets de shuffle, spill, temps CPU des
+executors, temps de GC) sont lues depuis l'API REST du driver lorsqu'il est
+joignable (driver persistant), sinon depuis le journal d'événements Spark
+(spark.eventLog.dir). Seul un résumé compact est stocké sur l'exécution.
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+# Correspondance entre les accumulateurs du journal d'événements et nos champs
+EVENT_LOG_ACCUMULABLES = {
+    "internal.metrics.executorRunTime": "executor_run_time_ms",
+    "internal.metrics.executorCpuTime": "executor_cpu_time_ns",
+    "internal.metrics.jvmGCTime": "jvm_gc_time_ms",
+    "internal.metrics.input.bytesRead": "input_bytes",
+    "internal.metrics.output.bytesWritten": "output_bytes",
+    "internal.metrics.shuffle.read.remoteBytesRead": "shuffle_read_bytes",
+    "internal.metrics.shuffle.read.localBytesRead": "shuffle_read_bytes",
+    "internal.metrics.shuffle.write.bytesWritten": "shuffle_write_bytes",
+    "internal.metrics.memoryBytesSpilled": "memory_bytes_spilled",
+    "internal.metrics.diskBytesSpilled": "disk_bytes_spilled",
+}
+
+# Correspondance entre les champs de l'API REST /stages et nos champs
+REST_STAGE_FIELDS = {
+    "executorRunTime": "executor_run_time_ms",
+    "executorCpuTime": "executor_cpu_time_ns",
+    "jvmGcTime": "jvm_gc_time_ms",
+    "inputBytes": "input_bytes",
+    "outputBytes": "output_bytes",
+    "shuffleReadBytes": "shuffle_read_bytes",
+    "shuffleWriteBytes": "shuffle_write_bytes",
+    "memoryBytesSpilled": "memory_bytes_spilled",
+    "diskBytesSpilled": "disk_bytes_spilled",
+}
+
+METRIC_FIELDS = sorted(set(EVENT_LOG_ACCUMULABLES.values()))
+
+
+def _empty_stage(stage_id: int, name: str = "") -> Dict[str, Any]:
+    stage = {"stage_id": stage_id, "name": name, "num_tasks": 0, "duration_ms": None}
+    for field in METRIC_FIELDS:
+        stage[field] = 0
+    return stage
+
+
+def _parse_rest_time(value: Optional[str]) -> Optional[float]:
+    """Les dates de l'API REST sont au format 2024-01-01T10:00:00.000GMT"""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value.replace("GMT", ""), "%Y-%m-%dT%H:%M:%S.%f").timestamp() * 1000
+    except ValueError:
+        return None
+
+
+def summarize_stages(stages: List[Dict[str, Any]], source: str) -> Dict[str, Any]:
+    """Agrège les stages en un résumé compact stockable sur l'exécution"""
+    totals = {field: sum(stage.get(field) or 0 for stage in stages) for field in METRIC_FIELDS}
+    totals["executor_cpu_time_ms"] = round(totals.pop("executor_cpu_time_ns") / 1e6, 1)
+    durations = [stage["duration_ms"] for stage in stages if stage.get("duration_ms") is not None]
+    totals["stage_duration_ms"] = round(sum(durations), 1)
+    totals["gc_time_ratio"] = (
+        round(totals["jvm_gc_time_ms"] / totals["executor_run_time_ms"], 4)
+        if totals["executor_run_time_ms"] else 0.0
+    )
+
+    compact_stages = []
+    for stage in sorted(stages, key=lambda s: s["stage_id"]):
+        compact = {k: v for k, v in stage.items() if k != "executor_cpu_time_ns"}
+        compact["executor_cpu_time_ms"] = round((stage.get("executor_cpu_time_ns") or 0) / 1e6, 1)
+        compact_stages.append(compact)
+
+    return {
+        "source": source,
+        "stage_count": len(stages),
+        "task_count": sum(stage.get("num_tasks") or 0 for stage in stages),
+        "totals": totals,
+        "stages": compact_stages,
+        "harvested_at": datetime.now().isoformat()
+    }
+
+
+async def harvest_from_rest_api(
+    http_client: httpx.AsyncClient,
+    ui_url: str,
+    app_id: str,
+    job_group: str
+) -> Optional[Dict[str, Any]]:
+    """Lit les stages des jobs du groupe de l'exécution via l'API REST du driver"""
+    base_url = f"{ui_url.rstrip('/')}/api/v1/applications/{app_id}"
+    jobs_response = await http_client.get(f"{base_url}/jobs")
+    if jobs_response.status_code != 200:
+        return None
+
+    stage_ids = set()
+    for job in jobs_response.json():
+        if job.get("jobGroup") == job_group:
+            stage_ids.update(job.get("stageIds", []))
+    if not stage_ids:
+        return None
+
+    stages = []
+    for stage_id in sorted(stage_ids):
+        stage_response = await http_client.get(f"{base_url}/stages/{stage_id}")
+        if stage_response.status_code != 200:
+            continue
+        for attempt in stage_response.json():
+            # Les stages ignorés (déjà calculés) n'ont pas de métriques
+            if attempt.get("status") == "SKIPPED":
+                continue
+            stage = _empty_stage(stage_id, attempt.get("name", ""))
+            stage["num_tasks"] = attempt.get("numTasks", 0)
+            for rest_field, field in REST_STAGE_FIELDS.items():
+                stage[field] += attempt.get(rest_field) or 0
+            submitted = _parse_rest_time(attempt.get("submissionTime"))
+            completed = _parse_rest_time(attempt.get("completionTime"))
+            if submitted is not None and completed is not None:
+                stage["duration_ms"] = completed - submitted
+            stages.append(stage)
+
+    return summarize_stages(stages, "rest_api")
+
+
+def harvest_from_event_log(log_dir: str, app_id: str, job_group: str) -> Optional[Dict[str, Any]]:
+    """Parcourt le journal d'événements (JSON par ligne) de l'application Spark"""
+    log_path = None
+    for candidate in (app_id, f"{app_id}.inprogress"):
+        path = os.path.join(log_dir, candidate)
+        if os.path.exists(path):
+            log_path = path
+            break
+    if log_path is None:
+        return None
+
+    group_stage_ids = set()
+    stages: Dict[int, Dict[str, Any]] = {}
+    with open(log_path, "r", encoding="utf-8") as log_file:
+        for line in log_file:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            event_type = event.get("Event")
+            if event_type == "SparkListenerJobStart":
+                properties = event.get("Properties") or {}
+                if properties.get("spark.jobGroup.id") == job_group:
+                    group_stage_ids.update(event.get("Stage IDs", []))
+            elif event_type == "SparkListenerStageCompleted":
+                info = event.get("Stage Info", {})
+                stage_id = info.get("Stage ID")
+                stage = _empty_stage(stage_id, info.get("Stage Name", ""))
+                stage["num_tasks"] = info.get("Number of Tasks", 0)
+                if info.get("Submission Time") and info.get("Completion Time"):
+                    stage["duration_ms"] = info["Completion Time"] - info["Submission Time"]
+                for accumulable in info.get("Accumulables", []):
+                    field = EVENT_LOG_ACCUMULABLES.get(accumulable.get("Name"))
+                    if field:
+                        try:
+                            stage[field] += int(accumulable.get("Value") or 0)
+                        except (TypeError, ValueError):
+                            pass
+                stages[stage_id] = stage
+
+    selected = [stage for stage_id, stage in stages.items() if stage_id in group_stage_ids]
+    if not selected:
+        return None
+    return summarize_stages(selected, "event_log")
@@ -0,0 +1,287 @@
+"""
+Service driver Spark persistant pour l'Execution MCP Server.
+
+Au lieu de lancer un `spark-submit` (nouveau driver JVM, résolution des
+packages hadoop-aws, nouvelle SparkSession) pour chaque exécution, une
+SparkSession unique est démarrée au lancement du serveur et reste chaude.
+Les jobs sont déposés dans une file et exécutés par des threads du driver,
+qui réutilisent la session et un cache de DataFrames de datasets.
+
+`local_driver_service` crée le même service sur une session en mode local,
+sans cluster, pour les tests :
+
+    python spark_pool.py /opt/spark-apps/model_execution.py
+"""
+
+import asyncio
+import importlib.util
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Dict, Optional, Tuple
+
+
+class SparkDriverUnavailable(RuntimeError):
+    """Le driver n'a pas pu démarrer : l'appelant peut se replier sur spark-submit"""
+
+
+class DatasetFrameCache:
+    """Cache LRU borné de DataFrames persistés, partagé entre les jobs du driver"""
+
+    def __init__(self, max_entries: int = 8):
+        self.max_entries = max_entries
+        self._frames: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple):
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is None:
+                self.misses += 1
+                return None
+            self._frames.move_to_end(key)
+            self.hits += 1
+            return frame
+
+    def put(self, key: Tuple, frame: Any):
+        evicted = []
+        with self._lock:
+            self._frames[key] = frame
+            self._frames.move_to_end(key)
+            while len(self._frames) > self.max_entries:
+                _, old_frame = self._frames.popitem(last=False)
+                evicted.append(old_frame)
+        # Libérer la mémoire des executors en dehors du verrou
+        for old_frame in evicted:
+            try:
+                old_frame.unpersist()
+            except Exception as e:
+                print(f"Warning: could not unpersist cached dataset: {str(e)}")
+
+    def clear(self):
+        with self._lock:
+            frames = list(self._frames.values())
+            self._frames.clear()
+        for frame in frames:
+            try:
+                frame.unpersist()
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._frames),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+class SparkDriverService:
+    """Driver Spark longue durée qui consomme une file de jobs d'exécution"""
+
+    def __init__(
+        self,
+        master_url: str,
+        app_path: str,
+        config: Optional[Dict[str, str]] = None,
+        app_name: str = "MCP ML Execution",
+        workers: int = 2,
+        dataset_cache_size: int = 8,
+        ready_timeout: float = 300.0
+    ):
+        self.master_url = master_url
+        self.app_path = app_path
+        self.config = config or {}
+        self.app_name = app_name
+        self.workers = max(1, workers)
+        self.dataset_cache = DatasetFrameCache(dataset_cache_size)
+        self.ready_timeout = ready_timeout
+
+        self.spark = None
+        self.status = "stopped"
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.jobs_completed = 0
+        self.jobs_failed = 0
+
+        self._jobs: "queue.Queue" = queue.Queue()
+        self._ready = threading.Event()
+        self._threads = []
+        self._app_module = None
+
+    def start(self):
+        """Démarre la SparkSession et les threads de traitement en arrière-plan"""
+        if self.status in ("starting", "ready"):
+            return
+        self.status = "starting"
+        self.error = None
+        starter = threading.Thread(target=self._bootstrap, name="spark-driver-bootstrap", daemon=True)
+        starter.start()
+
+    def _bootstrap(self):
+        try:
+            from pyspark.sql import SparkSession
+
+            builder = SparkSession.builder.appName(self.app_name).master(self.master_url)
+            # Plusieurs jobs concurrents partagent le driver équitablement
+            builder = builder.config("spark.scheduler.mode", "FAIR")
+            for key, value in self.config.items():
+                builder = builder.config(key, value)
+
+            start = time.time()
+            self.spark = builder.getOrCreate()
+            self._app_module = self._load_app_module()
+            self.started_at = time.time()
+            print(f"Spark driver service ready in {self.started_at - start:.2f}s (master={self.master_url})")
+
+            for i in range(self.workers):
+                worker = threading.Thread(target=self._worker_loop, name=f"spark-driver-worker-{i}", daemon=True)
+                worker.start()
+                self._threads.append(worker)
+
+            self.status = "ready"
+        except Exception as e:
+            print(f"Error starting Spark driver service: {str(e)}")
+            self.status = "failed"
+            self.error = str(e)
+            # Aucun thread ne consommera la file : libérer les jobs déposés pendant le démarrage
+            self._fail_queued_jobs()
+        finally:
+            self._ready.set()
+
+    def _fail_queued_jobs(self):
+        while True:
+            try:
+                item = self._jobs.get_nowait()
+            except queue.Empty:
+                return
+            if item is None:
+                continue
+            execution_id, future = item
+            if future.set_running_or_notify_cancel():
+                future.set_exception(SparkDriverUnavailable(
+                    f"Spark driver service failed to start before execution {execution_id} ran: {self.error}"
+                ))
+
+    def _load_app_module(self):
+        """Charge l'application Spark (model_execution.py) une seule fois dans le driver"""
+        spec = importlib.util.spec_from_file_location("model_execution", self.app_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    def _worker_loop(self):
+        while True:
+            item = self._jobs.get()
+            if item is None:
+                break
+            execution_id, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            start = time.time()
+            try:
+                # Regrouper les jobs Spark de l'exécution (annulation, métriques)
+                self.spark.sparkContext.setJobGroup(execution_id, f"Execution {execution_id}")
+                result = self._app_module.process_model_execution(
+                    execution_id,
+                    spark=self.spark,
+                    dataset_cache=self.dataset_cache
+                )
+                if result:
+                    self.jobs_completed += 1
+                else:
+                    self.jobs_failed += 1
+                print(f"Spark driver job for execution {execution_id} finished in {time.time() - start:.2f}s")
+                future.set_result(result)
+            except Exception as e:
+                self.jobs_failed += 1
+                future.set_exception(e)
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        self._ready.wait(timeout)
+        return self.status == "ready"
+
+    def submit(self, execution_id: str) -> Future:
+        """Dépose un job dans la file du driver et retourne un Future"""
+        if self.status not in ("starting", "ready"):
+            raise SparkDriverUnavailable(f"Spark driver service is not available (status: {self.status})")
+        future: Future = Future()
+        self._jobs.put((execution_id, future))
+        # Le démarrage a pu échouer entre le test du statut et le dépôt dans la file
+        if self.status == "failed":
+            self._fail_queued_jobs()
+        return future
+
+    async def run(self, execution_id: str) -> bool:
+        """
+        Version asynchrone de submit() pour les handlers FastAPI. Attend la fin
+        du démarrage ; lève SparkDriverUnavailable si la session n'a pas démarré.
+        """
+        if not await asyncio.to_thread(self.wait_until_ready, self.ready_timeout):
+            raise SparkDriverUnavailable(f"Spark driver service is not available (status: {self.status})")
+        return await asyncio.wrap_future(self.submit(execution_id))
+
+    def queue_depth(self) -> int:
+        return self._jobs.qsize()
+
+    def stop(self):
+        for _ in self._threads:
+            self._jobs.put(None)
+        self.dataset_cache.clear()
+        if self.spark is not None:
+            try:
+                self.spark.stop()
+            except Exception as e:
+                print(f"Error stopping Spark driver service: {str(e)}")
+        self.spark = None
+        self._threads = []
+        self.status = "stopped"
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "master": self.master_url,
+            "error": self.error,
+            "uptime_seconds": round(time.time() - self.started_at, 1) if self.started_at else None,
+            "queue_depth": self.queue_depth(),
+            "jobs_completed": self.jobs_completed,
+            "jobs_failed": self.jobs_failed,
+            "dataset_cache": self.dataset_cache.stats()
+        }
+
+
+def local_driver_service(app_path: str, workers: int = 1, **config) -> SparkDriverService:
+    """Driver sur une session en mode local (deux threads, sans interface web), pour les tests"""
+    local_config = {"spark.ui.enabled": "false", "spark.sql.shuffle.partitions": "2"}
+    local_config.update(config)
+    return SparkDriverService(
+        master_url="local[2]",
+        app_path=app_path,
+        config=local_config,
+        app_name="MCP ML Execution (local)",
+        workers=workers,
+        dataset_cache_size=2
+    )
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Démarre un driver local et mesure un petit job sur la session chaude
+    service = local_driver_service(sys.argv[1] if len(sys.argv) > 1 else "/opt/spark-apps/model_execution.py")
+    service.start()
+    if not service.wait_until_ready(service.ready_timeout):
+        print(f"Local Spark driver failed to start: {service.error}")
+        sys.exit(1)
+    for attempt in range(3):
+        start = time.time()
+        count = service.spark.range(100000).count()
+        print(f"Job {attempt + 1}: counted {count} rows in {time.time() - start:.3f}s")
+    print(service.info())
+    service.stop()
@@ -0,0 +1,206 @@
+"""
+Ramasse-miettes du stockage MinIO (datasets, modèles, résultats).
+
+Les suppressions côté API ne retirent que les références (documents, compteurs
+de blobs). Le ramasse-miettes fonctionne en deux phases :
+
+- marquage : ensemble des objets et préfixes encore référencés par MongoDB
+  (partitions des versions de datasets, copies colonnaires, états de profil,
+  fichiers des modèles, blobs référencés, résultats des exécutions non
+  expirées) ;
+- balayage : liste de chaque bucket, suppression par lots avec
+  `remove_objects` des objets non référencés et plus vieux que le délai de
+  grâce (un upload en cours n'est pas encore référencé).
+
+La politique de rétention expire les résultats des exécutions terminées depuis
+plus de `retention_days` jours. Chaque passage est enregistré dans `gc_runs`
+avec le nombre d'objets et d'octets récupérés.
+"""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from minio.deleteobjects import DeleteObject
+
+TERMINAL_EXECUTION_STATUSES = ["completed", "success", "failed", "cancelled"]
+# Exécutions encore en cours (annulables, bloquent la suppression de leur déploiement)
+ACTIVE_EXECUTION_STATUSES = ["pending", "running", "processing_with_spark", "streaming"]
+# Transformations encore en cours : leur fichier de sortie n'est pas encore référencé
+ACTIVE_TRANSFORM_STATUSES = ["pending", "running"]
+
+
+class LiveSet:
+    """Objets et dossiers de premier niveau (identifiants) référencés dans un bucket"""
+
+    def __init__(self):
+        self.objects: Set[str] = set()
+        self.prefixes: Set[str] = set()
+
+    def add(self, object_name: Optional[str]):
+        if object_name:
+            self.objects.add(object_name)
+
+    def add_prefix(self, top_level: Optional[str]):
+        if top_level:
+            self.prefixes.add(top_level.strip("/"))
+
+    def __contains__(self, object_name: str) -> bool:
+        if object_name in self.objects:
+            return True
+        # Recherche en O(1) sur le premier segment du chemin
+        return "/" in object_name and object_name.split("/", 1)[0] in self.prefixes
+
+    def __len__(self):
+        return len(self.objects) + len(self.prefixes)
+
+
+class StorageGarbageCollector:
+    def __init__(self, minio_client, db, buckets: Dict[str, str], retention_days: int = 30,
+                 grace_seconds: int = 3600, batch_size: int = 1000):
+        self.minio_client = minio_client
+        self.db = db
+        # Rôle -> nom du bucket ("datasets", "models", "results")
+        self.buckets = buckets
+        self.retention_days = retention_days
+        self.grace_seconds = grace_seconds
+        self.batch_size = batch_size
+        self.runs_collection = db["gc_runs"]
+
+    # Marquage
+
+    def expire_results(self, now: datetime, dry_run: bool) -> List[str]:
+        """Applique la rétention : les résultats des exécutions terminées trop anciennes ne sont plus référencés"""
+        if not self.retention_days:
+            return []
+        cutoff = (now - timedelta(days=self.retention_days)).isoformat()
+        query = {
+            "status": {"$in": TERMINAL_EXECUTION_STATUSES},
+            "updated_at": {"$lt": cutoff},
+            "results_expired_at": {"$exists": False}
+        }
+        expired = [execution["id"] for execution in self.db["executions"].find(query, {"id": 1})]
+        if expired and not dry_run:
+            self.db["executions"].update_many(
+                {"id": {"$in": expired}},
+                {"$set": {"results_expired_at": now.isoformat()}, "$unset": {"result_path": "", "predictions_path": ""}}
+            )
+        return expired
+
+    def mark(self, expired_executions: Iterable[str]) -> Dict[str, LiveSet]:
+        live = {role: LiveSet() for role in self.buckets}
+        expired = set(expired_executions)
+
+        datasets = live["datasets"]
+        for snapshot in self.db["dataset_versions"].find({}, {"partitions.file_path": 1}):
+            for partition in snapshot.get("partitions", []):
+                datasets.add(partition.get("file_path"))
+        projection = {"id": 1, "file_path": 1, "columnar": 1, "profile.state_path": 1, "transform_status": 1}
+        for dataset in self.db["datasets"].find({}, projection):
+            datasets.add(dataset.get("file_path"))
+            datasets.add((dataset.get("columnar") or {}).get("file_path"))
+            datasets.add((dataset.get("profile") or {}).get("state_path"))
+            if dataset.get("transform_status") in ACTIVE_TRANSFORM_STATUSES:
+                datasets.add_prefix(dataset.get("id"))
+
+        models = live["models"]
+        for model in self.db["models"].find({}, {"file_path": 1}):
+            models.add(model.get("file_path"))
+
+        # Blobs adressés par contenu encore référencés, ou libérés depuis moins que le délai de grâce
+        # (un upload identique peut encore les réutiliser)
+        grace_cutoff = (datetime.now() - timedelta(seconds=self.grace_seconds)).isoformat()
+        blob_query = {"$or": [{"refcount": {"$gt": 0}}, {"last_referenced_at": {"$gte": grace_cutoff}}]}
+        for blob in self.db["blobs"].find(blob_query, {"bucket": 1, "object_name": 1}):
+            for role, bucket in self.buckets.items():
+                if blob.get("bucket") == bucket:
+                    live[role].add(blob.get("object_name"))
+
+        # Tous les objets d'une exécution sont rangés sous "<execution_id>/", sauf le
+        # résultat partagé d'un lot ("batches/<batch_id>/"), référencé par result_path
+        results = live["results"]
+        for execution in self.db["executions"].find({"results_expired_at": {"$exists": False}}, {"id": 1, "result_path": 1}):
+            if execution["id"] not in expired:
+                results.add_prefix(execution["id"])
+                results.add(execution.get("result_path"))
+
+        return live
+
+    # Balayage
+
+    def _remove_batch(self, bucket: str, names: List[str]) -> List[str]:
+        errors = self.minio_client.remove_objects(bucket, [DeleteObject(name) for name in names])
+        # remove_objects est paresseux : les erreurs doivent être parcourues pour exécuter la suppression
+        return [f"{error.object_name}: {error.message}" for error in errors]
+
+    def sweep(self, role: str, live: LiveSet, now: datetime, dry_run: bool) -> Dict[str, Any]:
+        bucket = self.buckets[role]
+        grace_cutoff = now.astimezone(timezone.utc) - timedelta(seconds=self.grace_seconds)
+        stats = {"bucket": bucket, "scanned": 0, "live": 0, "deleted": 0, "reclaimed_bytes": 0, "errors": []}
+        batch: List[Tuple[str, int]] = []
+
+        def flush():
+            if not batch:
+                return
+            names = [name for name, _ in batch]
+            errors = [] if dry_run else self._remove_batch(bucket, names)
+            failed = {error.split(":", 1)[0] for error in errors}
+            stats["errors"].extend(errors[:max(0, 100 - len(stats["errors"]))])
+            for name, size in batch:
+                if name not in failed:
+                    stats["deleted"] += 1
+                    stats["reclaimed_bytes"] += size
+            batch.clear()
+
+        for obj in self.minio_client.list_objects(bucket, recursive=True):
+            stats["scanned"] += 1
+            if obj.object_name in live:
+                stats["live"] += 1
+                continue
+            if obj.last_modified is not None and obj.last_modified > grace_cutoff:
+                stats["live"] += 1
+                continue
+            batch.append((obj.object_name, obj.size or 0))
+            if len(batch) >= self.batch_size:
+                flush()
+        flush()
+        return stats
+
+    def purge_blob_documents(self, dry_run: bool) -> int:
+        """Supprime les documents des blobs sans référence (leurs objets viennent d'être balayés)"""
+        cutoff = (datetime.now() - timedelta(seconds=self.grace_seconds)).isoformat()
+        query = {"refcount": {"$lte": 0}, "last_referenced_at": {"$lt": cutoff}}
+        if dry_run:
+            return self.db["blobs"].count_documents(query)
+        return self.db["blobs"].delete_many(query).deleted_count
+
+    # Exécution complète
+
+    def run(self, dry_run: bool = False, run_id: Optional[str] = None) -> Dict[str, Any]:
+        run_id = run_id or str(uuid.uuid4())
+        now = datetime.now().astimezone()
+        report = {
+            "id": run_id,
+            "status": "running",
+            "dry_run": dry_run,
+            "retention_days": self.retention_days,
+            "started_at": now.replace(tzinfo=None).isoformat()
+        }
+        self.runs_collection.update_one({"id": run_id}, {"$set": report}, upsert=True)
+        try:
+            expired = self.expire_results(now.replace(tzinfo=None), dry_run)
+            live = self.mark(expired)
+            buckets = {role: self.sweep(role, live[role], now, dry_run) for role in self.buckets}
+            report.update({
+                "status": "completed",
+                "expired_executions": len(expired),
+                "purged_blob_documents": self.purge_blob_documents(dry_run),
+                "buckets": buckets,
+                "deleted_objects": sum(stats["deleted"] for stats in buckets.values()),
+                "reclaimed_bytes": sum(stats["reclaimed_bytes"] for stats in buckets.values()),
+                "completed_at": datetime.now().isoformat()
+            })
+        except Exception as e:
+            report.update({"status": "failed", "error": str(e), "completed_at": datetime.now().isoformat()})
+        self.runs_collection.update_one({"id": run_id}, {"$set": report})
+        return report
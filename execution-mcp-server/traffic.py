@@ -0,0 +1,199 @@
+"""
+Répartition du trafic entre déploiements (canary) et trafic miroir (shadow).
+
+Un déploiement peut déclarer :
+
+- `traffic_split` : {"<deployment_id>": poids} ; chaque requête est servie par
+  un déploiement cible avec la probabilité de son poids, le reste du trafic
+  par le déploiement lui-même ;
+- `shadow_deployments` : déploiements qui reçoivent une copie des requêtes.
+  Leur réponse n'est jamais renvoyée au client.
+
+Les appels miroir sont placés dans une file bornée (abandonnés si elle est
+pleine) et traités par des tâches de fond : ils n'ajoutent aucune latence à
+la réponse principale. Les latences et les écarts de prédiction sont agrégés
+en mémoire puis ajoutés périodiquement à la collection `shadow_metrics`, par
+couple (déploiement principal, déploiement miroir).
+"""
+
+import asyncio
+import random
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def validate_routing(deployment_id: str, deployment_data: Dict[str, Any], deployments_collection) -> Optional[str]:
+    """Message d'erreur si la répartition ou les miroirs déclarés sont invalides"""
+    traffic_split = deployment_data.get("traffic_split")
+    shadows = deployment_data.get("shadow_deployments")
+    targets: List[str] = []
+    if traffic_split is not None:
+        if not isinstance(traffic_split, dict):
+            return "traffic_split must map deployment IDs to weights"
+        try:
+            weights = {target: float(weight) for target, weight in traffic_split.items()}
+        except (TypeError, ValueError):
+            return "traffic_split weights must be numbers"
+        if any(weight < 0 for weight in weights.values()) or sum(weights.values()) > 1:
+            return "traffic_split weights must be non-negative and sum to at most 1"
+        targets.extend(weights)
+    if shadows is not None:
+        if not isinstance(shadows, list) or not all(isinstance(shadow, str) for shadow in shadows):
+            return "shadow_deployments must be a list of deployment IDs"
+        targets.extend(shadows)
+    if deployment_id in targets:
+        return "A deployment cannot split or mirror traffic to itself"
+    if targets:
+        found = {deployment["id"] for deployment in deployments_collection.find({"id": {"$in": targets}}, {"id": 1})}
+        missing = sorted(set(targets) - found)
+        if missing:
+            return f"Unknown deployments in traffic configuration: {missing}"
+    return None
+
+
+def choose_target(deployment_id: str, traffic_split: Optional[Dict[str, float]]) -> str:
+    """Déploiement qui sert la requête, tiré selon les poids de traffic_split"""
+    if not traffic_split:
+        return deployment_id
+    draw = random.random()
+    cumulative = 0.0
+    for target, weight in traffic_split.items():
+        cumulative += float(weight)
+        if draw < cumulative:
+            return target
+    return deployment_id
+
+
+def prediction_diff(primary: List[Any], shadow: List[Any]) -> Dict[str, Any]:
+    """Écart entre deux listes de prédictions : numérique (écart absolu) ou par désaccord"""
+    if len(primary) != len(shadow):
+        return {"rows": 0, "mismatches": max(len(primary), len(shadow)), "abs_diff_sum": 0.0, "abs_diff_max": 0.0}
+    try:
+        primary_values = np.asarray(primary, dtype=np.float64)
+        shadow_values = np.asarray(shadow, dtype=np.float64)
+    except (TypeError, ValueError):
+        mismatches = sum(1 for left, right in zip(primary, shadow) if left != right)
+        return {"rows": len(primary), "mismatches": mismatches, "abs_diff_sum": 0.0, "abs_diff_max": 0.0}
+    diff = np.abs(primary_values - shadow_values)
+    diff = diff[np.isfinite(diff)]
+    return {
+        "rows": len(primary),
+        "mismatches": int(np.count_nonzero(diff)),
+        "abs_diff_sum": float(diff.sum()),
+        "abs_diff_max": float(diff.max()) if diff.size else 0.0
+    }
+
+
+class ShadowMirror:
+    """File bornée d'appels miroir, traités en arrière-plan, et agrégation de leurs métriques"""
+
+    def __init__(self, predict_fn: Callable[[str, Dict[str, Any]], Awaitable[Tuple[List[Any], float]]],
+                 metrics_collection, queue_size: int = 1000, workers: int = 2, flush_interval: float = 10.0):
+        # predict_fn(shadow_id, payload) -> (prédictions, latence en ms)
+        self.predict_fn = predict_fn
+        self.metrics_collection = metrics_collection
+        self.workers = workers
+        self.flush_interval = flush_interval
+        self._queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=queue_size)
+        self._tasks: List[asyncio.Task] = []
+        # (déploiement principal, déploiement miroir) -> compteurs à ajouter au prochain flush
+        self._pending: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.submitted = 0
+        self.dropped = 0
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+            self._tasks.append(asyncio.create_task(self._flush_loop()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        await self.flush()
+
+    def submit(self, deployment_id: str, shadow_ids: List[str], payload: Dict[str, Any],
+               predictions: List[Any], latency_ms: float):
+        """Ne bloque jamais : un appel miroir est abandonné si la file est pleine"""
+        for shadow_id in shadow_ids:
+            try:
+                self._queue.put_nowait({
+                    "deployment_id": deployment_id,
+                    "shadow_id": shadow_id,
+                    "payload": payload,
+                    "predictions": predictions,
+                    "latency_ms": latency_ms
+                })
+                self.submitted += 1
+            except asyncio.QueueFull:
+                self.dropped += 1
+                self._counters(deployment_id, shadow_id)["dropped"] += 1
+
+    def _counters(self, deployment_id: str, shadow_id: str) -> Dict[str, Any]:
+        key = (deployment_id, shadow_id)
+        if key not in self._pending:
+            self._pending[key] = {
+                "requests": 0, "errors": 0, "dropped": 0, "rows": 0, "mismatches": 0,
+                "abs_diff_sum": 0.0, "abs_diff_max": 0.0,
+                "primary_latency_ms_sum": 0.0, "shadow_latency_ms_sum": 0.0,
+                "primary_latency_ms_max": 0.0, "shadow_latency_ms_max": 0.0
+            }
+        return self._pending[key]
+
+    async def _worker(self):
+        while True:
+            call = await self._queue.get()
+            try:
+                predictions, latency_ms = await self.predict_fn(call["shadow_id"], call["payload"])
+                diff = prediction_diff(call["predictions"], predictions)
+                counters = self._counters(call["deployment_id"], call["shadow_id"])
+                counters["requests"] += 1
+                counters["rows"] += diff["rows"]
+                counters["mismatches"] += diff["mismatches"]
+                counters["abs_diff_sum"] += diff["abs_diff_sum"]
+                counters["abs_diff_max"] = max(counters["abs_diff_max"], diff["abs_diff_max"])
+                counters["primary_latency_ms_sum"] += call["latency_ms"]
+                counters["shadow_latency_ms_sum"] += latency_ms
+                counters["primary_latency_ms_max"] = max(counters["primary_latency_ms_max"], call["latency_ms"])
+                counters["shadow_latency_ms_max"] = max(counters["shadow_latency_ms_max"], latency_ms)
+            except Exception as e:
+                self._counters(call["deployment_id"], call["shadow_id"])["errors"] += 1
+                print(f"Shadow call to deployment {call['shadow_id']} failed: {str(e)}")
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        pending, self._pending = self._pending, {}
+        for (deployment_id, shadow_id), counters in pending.items():
+            increments = {name: value for name, value in counters.items() if not name.endswith("_max")}
+            maximums = {name: value for name, value in counters.items() if name.endswith("_max")}
+            try:
+                await asyncio.to_thread(
+                    self.metrics_collection.update_one,
+                    {"deployment_id": deployment_id, "shadow_deployment_id": shadow_id},
+                    {"$inc": increments, "$max": maximums, "$set": {"updated_at": datetime.now().isoformat()}},
+                    upsert=True
+                )
+            except Exception as e:
+                print(f"Error storing shadow metrics for {deployment_id} -> {shadow_id}: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"submitted": self.submitted, "dropped": self.dropped, "queued": self._queue.qsize()}
+
+
+def summarize_shadow_metrics(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Ajoute les moyennes aux compteurs cumulés d'un couple principal/miroir"""
+    requests = document.get("requests") or 0
+    rows = document.get("rows") or 0
+    summary = dict(document)
+    summary.pop("_id", None)
+    summary["mean_abs_diff"] = document.get("abs_diff_sum", 0.0) / rows if rows else None
+    summary["mismatch_rate"] = document.get("mismatches", 0) / rows if rows else None
+    summary["primary_latency_ms_mean"] = document.get("primary_latency_ms_sum", 0.0) / requests if requests else None
+    summary["shadow_latency_ms_mean"] = document.get("shadow_latency_ms_sum", 0.0) / requests if requests else None
+    return summary
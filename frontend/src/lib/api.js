@@ -83,6 +83,22 @@ export const deploymentsApi = {
     const response = await api.delete(`/deployments/${id}`);
     return response.data;
   },
+  predict: async (id, instances) => {
+    const response = await api.post(`/deployments/${id}/predict`, { instances });
+    return response.data;
+  },
+  getShadowMetrics: async (id) => {
+    const response = await api.get(`/deployments/${id}/shadow-metrics`);
+    return response.data;
+  },
+  getScaling: async (id) => {
+    const response = await api.get(`/deployments/${id}/scaling`);
+    return response.data;
+  },
+  getResultCache: async (id) => {
+    const response = await api.get(`/deployments/${id}/result-cache`);
+    return response.data;
+  },
 };
 
 // API pour les exécutions
@@ -99,6 +115,42 @@ export const executionsApi = {
     const response = await api.post('/executions', executionData);
     return response.data;
   },
+  createBatch: async (batchData) => {
+    const response = await api.post('/executions/batch', batchData);
+    return response.data;
+  },
+  // Exécution sur input_data dont l'analyse arrive token par token (SSE)
+  stream: async (executionData, onEvent) => {
+    const response = await fetch(`${API_URL}/executions/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(executionData),
+    });
+    if (!response.ok) {
+      const error = await response.json().catch(() => ({}));
+      throw new Error(error.detail || `HTTP ${response.status}`);
+    }
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let done = null;
+    for (;;) {
+      const { value, done: finished } = await reader.read();
+      if (finished) break;
+      buffer += decoder.decode(value, { stream: true });
+      const events = buffer.split('\n\n');
+      buffer = events.pop();
+      for (const raw of events) {
+        const event = (raw.match(/^event: (.*)$/m) || [])[1];
+        const data = (raw.match(/^data: (.*)$/m) || [])[1];
+        if (!event || data === undefined) continue;
+        const payload = JSON.parse(data);
+        if (event === 'done') done = payload;
+        if (onEvent) onEvent(event, payload);
+      }
+    }
+    return done;
+  },
   cancel: async (id) => {
     const response = await api.post(`/executions/${id}/cancel`);
     return response.data;
@@ -141,6 +193,10 @@ export const datasetsApi = {
     const response = await api.delete(`/datasets/${id}`);
     return response.data;
   },
+  preview: async (id, rows = 20) => {
+    const response = await api.get(`/datasets/${id}/preview`, { params: { rows } });
+    return response.data;
+  },
   upload: async (id, file) => {
     const formData = new FormData();
     formData.append('file', file);
@@ -44,6 +44,10 @@ class MCPHub:
             "upload_data": "data-mcp-server",
             "download_data": "data-mcp-server",
             "transform_data": "data-mcp-server",
+            "preview_data": "data-mcp-server",
+            "append_data": "data-mcp-server",
+            "list_dataset_versions": "data-mcp-server",
+            "get_dataset_version": "data-mcp-server",
             
             # Opérations de l'Execution MCP Server
             "list_deployments": "execution-mcp-server",
@@ -54,8 +58,16 @@ class MCPHub:
             "list_executions": "execution-mcp-server",
             "get_execution": "execution-mcp-server",
             "create_execution": "execution-mcp-server",
+            "create_executions_batch": "execution-mcp-server",
             "cancel_execution": "execution-mcp-server",
             "get_execution_results": "execution-mcp-server",
+            "predict": "execution-mcp-server",
+            "get_shadow_metrics": "execution-mcp-server",
+            "get_deployment_scaling": "execution-mcp-server",
+            "get_result_cache_stats": "execution-mcp-server",
+            "run_garbage_collection": "execution-mcp-server",
+            "get_gc_status": "execution-mcp-server",
+            "analyze_indexes": "execution-mcp-server",
             
             # Opérations complexes gérées par le MCP Hub
             "chain_operations": None,
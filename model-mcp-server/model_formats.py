@@ -0,0 +1,188 @@
+"""
+Détection du format des artefacts de modèles à l'upload.
+
+Le format est reconnu à partir des premiers octets et de l'extension du
+fichier : joblib/pickle (scikit-learn), ONNX, XGBoost (JSON ou UBJ) et
+archives de poids NumPy `.npz`. Le schéma d'entrée est extrait quand le format
+le décrit sans exécuter de code (un pickle n'est jamais désérialisé ici) :
+il est alors enregistré sur le document du modèle avec le format, et utilisé
+par les chargeurs de l'Execution MCP Server.
+"""
+
+import io
+import json
+import os
+import zipfile
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Formats et extensions définis par le registre partagé avec l'Execution MCP Server
+from model_registry import FORMAT_EXTENSIONS
+
+MODEL_FORMATS = tuple(FORMAT_EXTENSIONS)
+
+PICKLE_PROTOCOL_MARKER = b"\x80"
+# En-têtes des compressions utilisées par joblib.dump(..., compress=...)
+JOBLIB_COMPRESSED_MAGICS = (b"\x78", b"\x1f\x8b", b"BZh", b"\xfd7zXZ", b"\x5d\x00\x00", b"\x04\x22\x4d\x18")
+ZIP_MAGIC = b"PK\x03\x04"
+
+
+class ModelFormatError(ValueError):
+    """Artefact dont le format n'est pas reconnu ou est incohérent"""
+
+
+def detect_format(content: bytes, file_name: str) -> str:
+    """Reconnaît le format d'un artefact à partir de son contenu, puis de son extension"""
+    extension = os.path.splitext(file_name or "")[1].lower()
+    head = content[:16]
+
+    if head.startswith(ZIP_MAGIC):
+        if extension == ".npz" or _is_npz(content):
+            return "npz"
+        raise ModelFormatError("Zip archives are only supported as NumPy .npz weight bundles")
+    if extension == ".onnx":
+        return "onnx"
+    if extension == ".ubj":
+        return "xgboost_ubj"
+    if head.lstrip().startswith(b"{"):
+        if b'"learner"' in content[:4096] or extension == ".json":
+            return "xgboost_json"
+    if head.startswith(PICKLE_PROTOCOL_MARKER) or head.startswith(JOBLIB_COMPRESSED_MAGICS):
+        return "joblib"
+    if extension in (".pkl", ".pickle", ".joblib"):
+        return "joblib"
+    raise ModelFormatError(f"Unrecognized model format for {file_name}")
+
+
+def _is_npz(content: bytes) -> bool:
+    try:
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            names = archive.namelist()
+    except zipfile.BadZipFile:
+        return False
+    return bool(names) and all(name.endswith(".npy") for name in names)
+
+
+def _feature(name: str, dtype: Optional[str] = None) -> Dict[str, Any]:
+    return {"name": str(name), "type": dtype}
+
+
+def _schema(features: List[Dict[str, Any]], n_features: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    if not features and n_features is None:
+        return None
+    return {
+        "features": features,
+        "n_features": len(features) if features else n_features
+    }
+
+
+def _xgboost_json_schema(content: bytes) -> Optional[Dict[str, Any]]:
+    learner = json.loads(content).get("learner", {})
+    names = learner.get("feature_names") or []
+    types = learner.get("feature_types") or []
+    num_feature = learner.get("learner_model_param", {}).get("num_feature")
+    features = [_feature(name, types[index] if index < len(types) else None) for index, name in enumerate(names)]
+    return _schema(features, int(num_feature) if num_feature is not None else None)
+
+
+def _npz_schema(content: bytes) -> Optional[Dict[str, Any]]:
+    # allow_pickle=False : seuls des tableaux numériques ou de chaînes sont lus
+    with np.load(io.BytesIO(content), allow_pickle=False) as bundle:
+        if "coef" not in bundle.files:
+            raise ModelFormatError("NumPy weight bundles must contain a 'coef' array")
+        coef = bundle["coef"]
+        n_features = int(coef.shape[-1])
+        names = [str(name) for name in bundle["feature_names"]] if "feature_names" in bundle.files else []
+        dtype = str(coef.dtype)
+    if names and len(names) != n_features:
+        raise ModelFormatError(f"feature_names has {len(names)} entries but coef expects {n_features} features")
+    return _schema([_feature(name, dtype) for name in names], n_features)
+
+
+def _onnx_schema(content: bytes) -> Optional[Dict[str, Any]]:
+    try:
+        import onnx
+    except ImportError:
+        # Le paquet onnx est facultatif : le schéma sera lu au chargement du modèle
+        return None
+    model = onnx.load_model_from_string(content)
+    initializers = {initializer.name for initializer in model.graph.initializer}
+    features = []
+    n_features = None
+    for graph_input in model.graph.input:
+        if graph_input.name in initializers:
+            continue
+        tensor_type = graph_input.type.tensor_type
+        dtype = onnx.TensorProto.DataType.Name(tensor_type.elem_type).lower()
+        features.append(_feature(graph_input.name, dtype))
+        dims = tensor_type.shape.dim
+        if len(dims) == 2 and dims[1].dim_value:
+            n_features = dims[1].dim_value
+    # Une seule entrée matricielle : les colonnes ne sont connues que par leur nombre
+    if len(features) == 1 and n_features:
+        return {"input_name": features[0]["name"], "features": [], "n_features": n_features}
+    return _schema(features)
+
+
+def extract_input_schema(content: bytes, model_format: str) -> Optional[Dict[str, Any]]:
+    """Schéma d'entrée décrit par l'artefact lui-même, ou None s'il ne le décrit pas"""
+    if model_format == "xgboost_json":
+        return _xgboost_json_schema(content)
+    if model_format == "npz":
+        return _npz_schema(content)
+    if model_format == "onnx":
+        return _onnx_schema(content)
+    # joblib/pickle et UBJ : schéma fourni par le client ou résolu au chargement
+    return None
+
+
+def normalize_input_schema(input_schema: Any) -> Optional[Dict[str, Any]]:
+    """Accepte une liste de noms, une liste de {name, type} ou un schéma complet"""
+    if input_schema is None:
+        return None
+    if isinstance(input_schema, dict):
+        features = input_schema.get("features") or []
+    elif isinstance(input_schema, list):
+        features = input_schema
+    else:
+        raise ModelFormatError("input_schema must be a list of feature names or an object with 'features'")
+    normalized = [
+        _feature(feature) if isinstance(feature, str) else _feature(feature["name"], feature.get("type"))
+        for feature in features
+    ]
+    schema = dict(input_schema) if isinstance(input_schema, dict) else {}
+    schema.update(_schema(normalized, schema.get("n_features")) or {})
+    return schema or None
+
+
+def inspect_artifact(content: bytes, file_name: str, declared_format: Optional[str] = None,
+                     declared_schema: Any = None) -> Dict[str, Any]:
+    """Format et schéma d'entrée à enregistrer sur le document du modèle"""
+    if declared_format:
+        if declared_format not in MODEL_FORMATS:
+            raise ModelFormatError(f"Unsupported model format {declared_format}; expected one of {list(MODEL_FORMATS)}")
+        model_format = declared_format
+    else:
+        model_format = detect_format(content, file_name)
+
+    try:
+        embedded_schema = extract_input_schema(content, model_format)
+    except ModelFormatError:
+        raise
+    except Exception as e:
+        raise ModelFormatError(f"Cannot read {model_format} artifact {file_name}: {str(e)}")
+
+    # Le schéma fourni par le client complète celui de l'artefact sans le contredire
+    input_schema = normalize_input_schema(declared_schema) or embedded_schema
+    if declared_schema is not None and embedded_schema and embedded_schema.get("n_features") and input_schema:
+        if input_schema.get("n_features") not in (None, embedded_schema["n_features"]):
+            raise ModelFormatError(
+                f"input_schema declares {input_schema['n_features']} features but the artifact expects {embedded_schema['n_features']}"
+            )
+
+    return {
+        "format": model_format,
+        "file_extension": FORMAT_EXTENSIONS[model_format],
+        "input_schema": input_schema
+    }
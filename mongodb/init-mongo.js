@@ -9,6 +9,11 @@ db.createCollection('datasets');
 db.createCollection('deployments');
 db.createCollection('executions');
 db.createCollection('users');
+db.createCollection('blobs');
+db.createCollection('dataset_versions');
+db.createCollection('gc_runs');
+db.createCollection('shadow_metrics');
+db.createCollection('prediction_samples');
 
 // Création des index
 db.models.createIndex({ "id": 1 }, { unique: true });
@@ -17,10 +22,21 @@ db.datasets.createIndex({ "id": 1 }, { unique: true });
 db.datasets.createIndex({ "name": 1 });
 db.deployments.createIndex({ "id": 1 }, { unique: true });
 db.deployments.createIndex({ "model_id": 1 });
+db.deployments.createIndex({ "status": 1 }, { name: "status" });
 db.executions.createIndex({ "id": 1 }, { unique: true });
-db.executions.createIndex({ "deployment_id": 1 });
-db.executions.createIndex({ "status": 1 });
+// Index composés des chemins de requête (égalité, puis tri) ; l'Execution MCP Server
+// les garantit aussi au démarrage (indexes.py), avec l'index TTL des exécutions terminées
+db.executions.createIndex({ "deployment_id": 1, "status": 1, "started_at": -1 }, { name: "deployment_status_started" });
+db.executions.createIndex({ "status": 1, "started_at": -1 }, { name: "status_started" });
+db.executions.createIndex({ "started_at": -1 }, { name: "started" });
+db.executions.createIndex({ "status": 1, "updated_at": 1 }, { name: "status_updated" });
+db.executions.createIndex({ "batch_id": 1 }, { name: "batch", sparse: true });
 db.users.createIndex({ "email": 1 }, { unique: true });
+db.blobs.createIndex({ "bucket": 1, "digest": 1 }, { unique: true });
+db.dataset_versions.createIndex({ "dataset_id": 1, "version": 1 }, { unique: true });
+db.gc_runs.createIndex({ "started_at": -1 });
+db.shadow_metrics.createIndex({ "deployment_id": 1, "shadow_deployment_id": 1 }, { unique: true });
+db.prediction_samples.createIndex({ "deployment_id": 1, "started_at": -1 }, { name: "deployment_started" });
 
 // Insertion d'un utilisateur administrateur par défaut
 db.users.insertOne({
@@ -0,0 +1,192 @@
+"""
+Cache disque local des artefacts MinIO (modèles, fichiers de datasets).
+
+Les objets sont recopiés dans un répertoire du nœud, sous une clé dérivée du
+bucket, du chemin de l'objet et de son ETag : un objet réécrit sous le même
+chemin change d'ETag et donc d'entrée. Le répertoire est partagé par tous les
+processus de l'hôte :
+
+- un verrou fcntl par entrée évite que deux processus téléchargent le même
+  objet en même temps ; le fichier est écrit à côté puis renommé atomiquement ;
+- la date de modification des fichiers sert de date de dernier accès, et
+  l'éviction LRU (sous un verrou global) supprime les plus anciens tant que la
+  taille totale dépasse la limite. Un fichier supprimé reste lisible par les
+  processus qui l'ont déjà ouvert ou projeté en mémoire.
+
+Les relectures deviennent ainsi des lectures disque locales, le plus souvent
+servies par le cache de pages du système. Le même répertoire borné sert au
+serveur d'exécution (préchargement, préchauffage, prédictions) et au driver
+Spark ; les executors y écrivent l'artefact diffusé par le driver (`materialize`)
+sous le même nom d'entrée.
+"""
+
+import fcntl
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Objets adressés par leur contenu : leur ETag ne change jamais pour un chemin donné
+IMMUTABLE_PREFIXES = ("sha256/",)
+ENTRY_SUFFIX = ".artifact"
+
+
+class ArtifactCache:
+    def __init__(self, cache_dir: str, max_bytes: int, etag_ttl_seconds: float = 60.0):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        # Durée pendant laquelle l'ETag d'un objet modifiable n'est pas revérifié
+        self.etag_ttl_seconds = etag_ttl_seconds
+        self._etags: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_downloaded = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @contextmanager
+    def _file_lock(self, name: str):
+        """Verrou exclusif entre processus (et entre threads : un descripteur par acquisition)"""
+        with open(os.path.join(self.cache_dir, name), "a+") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _entry_name(self, bucket: str, object_name: str, etag: str, suffix: str = "") -> str:
+        key = hashlib.sha256(f"{bucket}/{object_name}@{etag}".encode("utf-8")).hexdigest()
+        # Le suffixe conserve l'extension attendue par certains chargeurs (XGBoost)
+        return f"{key}{suffix}{ENTRY_SUFFIX}"
+
+    def resolve_etag(self, minio_client, bucket: str, object_name: str) -> str:
+        """ETag courant de l'objet (revérifié au plus toutes les etag_ttl_seconds)"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._etags.get((bucket, object_name))
+        if cached is not None:
+            etag, checked_at = cached
+            if object_name.startswith(IMMUTABLE_PREFIXES) or now - checked_at < self.etag_ttl_seconds:
+                return etag
+        etag = minio_client.stat_object(bucket, object_name).etag.strip('"')
+        with self._lock:
+            self._etags[(bucket, object_name)] = (etag, now)
+        return etag
+
+    def get(self, minio_client, bucket: str, object_name: str, etag: Optional[str] = None, suffix: str = "") -> str:
+        """Chemin local de l'objet, téléchargé seulement s'il n'est pas déjà en cache"""
+        if etag is None:
+            etag = self.resolve_etag(minio_client, bucket, object_name)
+        entry_name = self._entry_name(bucket, object_name, etag, suffix)
+        return self._fill(entry_name, lambda temp_path: minio_client.fget_object(bucket, object_name, temp_path))
+
+    def materialize(self, entry_name: str, read_bytes: Callable[[], bytes]) -> str:
+        """
+        Chemin local d'une entrée dont les octets sont fournis par l'appelant
+        (variable diffusée par le driver Spark) ; read_bytes n'est appelé
+        qu'en cas d'absence. entry_name est le nom de fichier retourné par get().
+        """
+        def write(temp_path: str):
+            with open(temp_path, "wb") as temp_file:
+                temp_file.write(read_bytes())
+        return self._fill(entry_name, write)
+
+    def _fill(self, entry_name: str, write: Callable[[str], None]) -> str:
+        path = os.path.join(self.cache_dir, entry_name)
+
+        if self._touch(path):
+            with self._lock:
+                self.hits += 1
+            return path
+
+        with self._file_lock(f".{entry_name}.lock"):
+            # Un autre processus a pu le télécharger pendant l'attente du verrou
+            if self._touch(path):
+                with self._lock:
+                    self.hits += 1
+                return path
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=".partial-")
+            os.close(fd)
+            try:
+                write(temp_path)
+                size = os.path.getsize(temp_path)
+                os.replace(temp_path, path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+                raise
+        try:
+            os.unlink(os.path.join(self.cache_dir, f".{entry_name}.lock"))
+        except OSError:
+            pass
+
+        with self._lock:
+            self.misses += 1
+            self.bytes_downloaded += size
+        self.evict(keep=path)
+        return path
+
+    def read(self, minio_client, bucket: str, object_name: str, etag: Optional[str] = None, suffix: str = "") -> bytes:
+        with open(self.get(minio_client, bucket, object_name, etag, suffix), "rb") as cached_file:
+            return cached_file.read()
+
+    @staticmethod
+    def _touch(path: str) -> bool:
+        """Marque l'entrée comme récemment utilisée ; False si elle n'existe pas"""
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _entries(self):
+        entries = []
+        with os.scandir(self.cache_dir) as scan:
+            for entry in scan:
+                if not entry.name.endswith(ENTRY_SUFFIX) or entry.name.startswith("."):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """Supprime les entrées les moins récemment utilisées au-delà de max_bytes"""
+        evicted = 0
+        with self._file_lock(".evict.lock"):
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                evicted += 1
+        with self._lock:
+            self.evictions += evicted
+        return evicted
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self._entries()
+        with self._lock:
+            return {
+                "cache_dir": self.cache_dir,
+                "entries": len(entries),
+                "bytes": sum(size for _, size, _ in entries),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "bytes_downloaded": self.bytes_downloaded
+            }
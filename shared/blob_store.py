@@ -0,0 +1,105 @@
+"""
+Stockage adressé par contenu des fichiers uploadés.
+
+Le contenu est haché (SHA-256) pendant sa lecture, puis stocké une seule fois
+sous `sha256/<2 premiers caractères>/<empreinte>`. La collection `blobs` tient un
+compteur de références par empreinte : un upload dont l'empreinte existe déjà
+n'envoie aucun octet à MinIO. Les blobs qui ne sont plus référencés sont
+supprimés par le ramasse-miettes de l'Execution MCP Server.
+"""
+
+import hashlib
+import tempfile
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Optional
+
+from pymongo import ReturnDocument
+from minio.error import S3Error
+
+HASH_CHUNK_SIZE = 1024 * 1024
+SPOOL_MAX_MEMORY = 32 * 1024 * 1024
+BLOB_PREFIX = "sha256"
+
+
+def blob_object_name(digest: str) -> str:
+    return f"{BLOB_PREFIX}/{digest[:2]}/{digest}"
+
+
+class BlobStore:
+    """Objets MinIO dédupliqués par empreinte, avec comptage des références"""
+
+    def __init__(self, minio_client, blobs_collection, bucket: str):
+        self.minio_client = minio_client
+        self.blobs_collection = blobs_collection
+        self.bucket = bucket
+
+    def ensure_indexes(self):
+        self.blobs_collection.create_index([("bucket", 1), ("digest", 1)], unique=True)
+
+    def _exists(self, object_name: str) -> bool:
+        try:
+            self.minio_client.stat_object(self.bucket, object_name)
+            return True
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchObject", "ResourceNotFound"):
+                return False
+            raise
+
+    def store(self, stream: BinaryIO, content_type: str = "application/octet-stream") -> Dict[str, Any]:
+        """
+        Hache le flux en le recopiant dans un fichier temporaire (en mémoire tant
+        qu'il est petit), puis acquiert une référence sur le blob correspondant.
+        Les octets ne sont envoyés à MinIO que si le blob n'existe pas encore.
+        """
+        hasher = hashlib.sha256()
+        size = 0
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) as spool:
+            while True:
+                chunk = stream.read(HASH_CHUNK_SIZE)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                spool.write(chunk)
+                size += len(chunk)
+            digest = hasher.hexdigest()
+            object_name = blob_object_name(digest)
+
+            # Le blob est réutilisé si son document existe et que l'objet est bien présent
+            blob = self.blobs_collection.find_one_and_update(
+                {"bucket": self.bucket, "digest": digest},
+                {"$inc": {"refcount": 1}, "$set": {"last_referenced_at": datetime.now().isoformat()}},
+                return_document=ReturnDocument.AFTER
+            )
+            if blob is not None and self._exists(object_name):
+                return {"digest": digest, "object_name": object_name, "size": size, "deduplicated": True}
+
+            spool.seek(0)
+            self.minio_client.put_object(self.bucket, object_name, spool, size, content_type=content_type)
+
+        if blob is None:
+            self.blobs_collection.update_one(
+                {"bucket": self.bucket, "digest": digest},
+                {
+                    "$inc": {"refcount": 1},
+                    "$set": {"last_referenced_at": datetime.now().isoformat()},
+                    "$setOnInsert": {
+                        "object_name": object_name,
+                        "size": size,
+                        "content_type": content_type,
+                        "created_at": datetime.now().isoformat()
+                    }
+                },
+                upsert=True
+            )
+        return {"digest": digest, "object_name": object_name, "size": size, "deduplicated": False}
+
+    def release(self, digest: Optional[str]) -> bool:
+        """Libère une référence ; l'objet reste en place jusqu'au passage du ramasse-miettes"""
+        if not digest:
+            return False
+        # La date de libération ouvre le délai de grâce pendant lequel le blob peut être réutilisé
+        result = self.blobs_collection.update_one(
+            {"bucket": self.bucket, "digest": digest},
+            {"$inc": {"refcount": -1}, "$set": {"last_referenced_at": datetime.now().isoformat()}}
+        )
+        return result.modified_count > 0
@@ -0,0 +1,186 @@
+"""
+Registre des formats de modèles et chargeurs associés.
+
+Chaque format enregistré par le Model MCP Server à l'upload (`format` et
+`input_schema` sur le document du modèle) a son chargeur. Les artefacts sont
+d'abord recopiés sur le disque local par le cache des artefacts
+(artifact_cache.py), puis chargés depuis ce fichier : les poids volumineux
+sont projetés en mémoire (mmap) au lieu d'être lus dans des bytes Python. Les
+processus d'un même hôte qui chargent le même modèle partagent ainsi ses pages
+via le cache de pages du système.
+"""
+
+import zipfile
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+# Modèles uploadés avant l'enregistrement du format : pickles scikit-learn
+DEFAULT_MODEL_FORMAT = "joblib"
+
+# Formats reconnus à l'upload par le Model MCP Server et extension attendue
+# (XGBoost choisit son décodeur d'après l'extension)
+FORMAT_EXTENSIONS = {
+    "joblib": ".joblib",
+    "onnx": ".onnx",
+    "xgboost_json": ".json",
+    "xgboost_ubj": ".ubj",
+    "npz": ".npz"
+}
+
+
+def model_format(model_doc: Dict[str, Any]) -> str:
+    return model_doc.get("format") or DEFAULT_MODEL_FORMAT
+
+
+def artifact_suffix(model_doc: Dict[str, Any]) -> str:
+    """Extension de la copie locale (cache des artefacts), attendue par certains chargeurs (XGBoost)"""
+    return model_doc.get("file_extension") or FORMAT_EXTENSIONS.get(model_format(model_doc), "")
+
+
+# Modèle chargé
+
+class LoadedModel:
+    """Interface commune aux formats : predict(DataFrame pandas) -> tableau NumPy"""
+
+    def __init__(self, model_format: str, model: Any, input_schema: Optional[Dict[str, Any]],
+                 predict_fn: Callable[[Any, Any, List[str]], np.ndarray], feature_names: Optional[List[str]] = None):
+        self.format = model_format
+        self.model = model
+        self.input_schema = input_schema or {}
+        self._predict_fn = predict_fn
+        schema_names = [feature["name"] for feature in self.input_schema.get("features") or []]
+        self.feature_columns = schema_names or list(feature_names or [])
+
+    @property
+    def n_features(self) -> Optional[int]:
+        return self.input_schema.get("n_features") or (len(self.feature_columns) or None)
+
+    def predict(self, frame, feature_columns: Optional[List[str]] = None) -> np.ndarray:
+        columns = list(feature_columns or self.feature_columns or frame.columns)
+        predictions = np.asarray(self._predict_fn(self.model, frame, columns))
+        # Une seule sortie par ligne : tableau à une dimension
+        return predictions.ravel() if predictions.ndim == 2 and predictions.shape[1] == 1 else predictions
+
+
+# Chargeurs par format
+
+def _load_joblib(path: str, input_schema: Optional[Dict[str, Any]]) -> LoadedModel:
+    import joblib
+    # mmap_mode : les tableaux NumPy d'un dump joblib non compressé restent sur disque
+    model = joblib.load(path, mmap_mode="r")
+    feature_names = [str(name) for name in getattr(model, "feature_names_in_", [])]
+    return LoadedModel("joblib", model, input_schema,
+                       lambda model, frame, columns: model.predict(frame[columns]), feature_names)
+
+
+def _npz_member_offset(archive_file, info: zipfile.ZipInfo) -> int:
+    """Position des données d'un membre non compressé (après l'en-tête local du zip)"""
+    archive_file.seek(info.header_offset)
+    local_header = archive_file.read(30)
+    name_length = int.from_bytes(local_header[26:28], "little")
+    extra_length = int.from_bytes(local_header[28:30], "little")
+    return info.header_offset + 30 + name_length + extra_length
+
+
+NPY_HEADER_READERS = {
+    (1, 0): np.lib.format.read_array_header_1_0,
+    (2, 0): np.lib.format.read_array_header_2_0
+}
+
+
+def load_npz_arrays(path: str) -> Dict[str, np.ndarray]:
+    """
+    Ouvre les tableaux d'une archive .npz : les membres stockés sans compression
+    (np.savez) sont projetés en mémoire, les autres (np.savez_compressed) lus.
+    """
+    arrays = {}
+    with open(path, "rb") as archive_file, zipfile.ZipFile(archive_file) as archive:
+        for info in archive.infolist():
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if info.compress_type == zipfile.ZIP_STORED:
+                archive_file.seek(_npz_member_offset(archive_file, info))
+                version = np.lib.format.read_magic(archive_file)
+                read_header = NPY_HEADER_READERS.get(version)
+                shape, fortran_order, dtype = read_header(archive_file) if read_header else (None, False, None)
+                if dtype is not None and not dtype.hasobject:
+                    arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=archive_file.tell(),
+                                             shape=shape, order="F" if fortran_order else "C")
+                    continue
+            with archive.open(info) as member:
+                arrays[name] = np.lib.format.read_array(member, allow_pickle=False)
+    return arrays
+
+
+def _predict_linear(bundle: Dict[str, np.ndarray], frame, columns: List[str]) -> np.ndarray:
+    coef = bundle["coef"]
+    features = frame[columns].to_numpy(dtype=coef.dtype)
+    scores = features @ coef.T
+    if "intercept" in bundle:
+        scores = scores + bundle["intercept"]
+    if "classes" not in bundle:
+        return scores
+    classes = bundle["classes"]
+    # Classification : signe du score (binaire) ou score maximal (multiclasse)
+    if scores.ndim == 1:
+        return classes[(scores > 0).astype(int)]
+    return classes[np.argmax(scores, axis=1)]
+
+
+def _load_npz(path: str, input_schema: Optional[Dict[str, Any]]) -> LoadedModel:
+    bundle = load_npz_arrays(path)
+    feature_names = [str(name) for name in bundle["feature_names"]] if "feature_names" in bundle else []
+    return LoadedModel("npz", bundle, input_schema, _predict_linear, feature_names)
+
+
+def _predict_onnx(session, frame, columns: List[str]) -> np.ndarray:
+    inputs = session.get_inputs()
+    dtypes = {"tensor(double)": np.float64, "tensor(int64)": np.int64, "tensor(float)": np.float32}
+    if len(inputs) == 1:
+        feed = {inputs[0].name: frame[columns].to_numpy(dtype=dtypes.get(inputs[0].type, np.float32))}
+    else:
+        # Une entrée par colonne (modèles convertis avec des entrées nommées)
+        feed = {
+            graph_input.name: frame[[graph_input.name]].to_numpy(dtype=dtypes.get(graph_input.type, np.float32))
+            for graph_input in inputs
+        }
+    output = session.run(None, feed)[0]
+    return output.ravel() if output.ndim == 2 and output.shape[1] == 1 else output
+
+
+def _load_onnx(path: str, input_schema: Optional[Dict[str, Any]]) -> LoadedModel:
+    import onnxruntime
+    # La session lit le graphe depuis le fichier local plutôt que depuis des bytes Python
+    session = onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"])
+    inputs = session.get_inputs()
+    feature_names = [graph_input.name for graph_input in inputs] if len(inputs) > 1 else []
+    return LoadedModel("onnx", session, input_schema, _predict_onnx, feature_names)
+
+
+def _load_xgboost(model_format: str) -> Callable[[str, Optional[Dict[str, Any]]], LoadedModel]:
+    def load(path: str, input_schema: Optional[Dict[str, Any]]) -> LoadedModel:
+        import xgboost
+        # L'extension du fichier (.json ou .ubj) détermine le décodeur utilisé
+        booster = xgboost.Booster(model_file=path)
+
+        def predict(booster, frame, columns):
+            return booster.predict(xgboost.DMatrix(frame[columns]))
+
+        return LoadedModel(model_format, booster, input_schema, predict, booster.feature_names or [])
+    return load
+
+
+MODEL_LOADERS: Dict[str, Callable[[str, Optional[Dict[str, Any]]], LoadedModel]] = {
+    "joblib": _load_joblib,
+    "npz": _load_npz,
+    "onnx": _load_onnx,
+    "xgboost_json": _load_xgboost("xgboost_json"),
+    "xgboost_ubj": _load_xgboost("xgboost_ubj")
+}
+
+
+def load_model(model_format: str, path: str, input_schema: Optional[Dict[str, Any]] = None) -> LoadedModel:
+    loader = MODEL_LOADERS.get(model_format)
+    if loader is None:
+        raise ValueError(f"No loader registered for model format {model_format}")
+    return loader(path, input_schema)